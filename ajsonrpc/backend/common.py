@@ -1,14 +1,71 @@
 import json
+from typing import Iterable, Mapping, Optional
+
+from ..codec import Codec, FunctionCodec, get_available_codecs, get_json_codec, get_mime_type
 from ..dispatcher import Dispatcher
-from ..manager import AsyncJSONRPCResponseManager
+from ..manager import AsyncJSONRPCResponseManager, request_timeout
+
 
 class CommonBackend:
-    def __init__(self, serialize=json.dumps, deserialize=json.loads):
-        self.manager = AsyncJSONRPCResponseManager(
-            Dispatcher(),
-            serialize=serialize,
-            deserialize=deserialize
-        )
+
+    """Backend boilerplate: dispatcher, manager and codec negotiation.
+
+    Args:
+        serialize, deserialize: legacy str based serializers, wrapped into
+            a codec if given.
+        codec (:obj:Codec, optional): default codec, used if request
+            Content-Type is missing or unknown. Fastest available JSON codec
+            by default.
+        codecs (iterable, optional): codecs selectable by request
+            Content-Type. All available codecs by default.
+        is_batch_response_streamed (bool): write batch responses as they
+            complete using chunked transfer encoding, see
+            :meth:`AsyncJSONRPCResponseManager.iter_payload_for_payload`.
+        timeout_header (str, optional): name of request header with request
+            timeout in seconds, e.g. "X-Request-Timeout". Calls not completed
+            in time are cancelled.
+
+    """
+
+    def __init__(self, serialize=None, deserialize=None, codec: Optional[Codec] = None,
+                 codecs: Optional[Iterable[Codec]] = None, is_batch_response_streamed: bool = False,
+                 timeout_header: Optional[str] = None):
+        self.is_batch_response_streamed = is_batch_response_streamed
+        self.timeout_header = timeout_header
+
+        if codec is None:
+            if serialize is not None or deserialize is not None:
+                codec = FunctionCodec(serialize or json.dumps, deserialize or json.loads)
+            else:
+                codec = get_json_codec()
+
+        if codecs is None:
+            self.codecs = get_available_codecs()
+        else:
+            self.codecs = {
+                content_type: c
+                for c in codecs
+                for content_type in c.content_types
+            }
+        for content_type in codec.content_types:
+            self.codecs[content_type] = codec
+
+        self.manager = AsyncJSONRPCResponseManager(Dispatcher(), codec=codec)
+
+    def get_codec(self, content_type: Optional[str]) -> Codec:
+        """Get codec for request Content-Type header value."""
+        return self.codecs.get(get_mime_type(content_type), self.manager.codec)
+
+    def request_timeout(self, headers: Mapping[str, str]):
+        """Get context limiting request time by timeout header, if any."""
+        timeout = None
+        if self.timeout_header is not None:
+            try:
+                timeout = float(headers.get(self.timeout_header))
+            except (TypeError, ValueError):
+                pass
+
+        return request_timeout(timeout)
 
     def add_class(self, *args, **kwargs):
         return self.manager.dispatcher.add_class(*args, **kwargs)
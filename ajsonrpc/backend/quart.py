@@ -1,5 +1,3 @@
-import json
-
 from quart import Response, request
 from .common import CommonBackend
 
@@ -10,8 +8,10 @@ class JSONRPCQuart(CommonBackend):
         """Get Quart Handler"""
 
         async def handle():
-            request_body = await request.body
-            response = await self.manager.get_response_for_payload(request_body)
-            return Response(json.dumps(response.body), mimetype="application/json")
+            codec = self.get_codec(request.headers.get("Content-Type"))
+            request_body = await request.get_data()
+            with self.request_timeout(request.headers):
+                payload = await self.manager.get_payload_for_payload(request_body, codec=codec)
+            return Response(payload, content_type=codec.content_type)
 
         return handle
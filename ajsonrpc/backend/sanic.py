@@ -1,4 +1,4 @@
-from sanic.response import json as json_response
+from sanic.response import raw
 from .common import CommonBackend
 
 class JSONRPCSanic(CommonBackend):    
@@ -6,7 +6,16 @@ class JSONRPCSanic(CommonBackend):
     def handler(self):
         """Get Sanic Handler"""
         async def handle(request):
-            response = await self.manager.get_response_for_payload(request.body)
-            return json_response(response.body, dumps=self.manager.serialize)
+            codec = self.get_codec(request.headers.get("Content-Type"))
+            with self.request_timeout(request.headers):
+                if self.is_batch_response_streamed:
+                    response = await request.respond(content_type=codec.content_type)
+                    async for chunk in self.manager.iter_payload_for_payload(request.body, codec=codec):
+                        await response.send(chunk)
+                    await response.eof()
+                    return
+
+                payload = await self.manager.get_payload_for_payload(request.body, codec=codec)
+            return raw(payload, content_type=codec.content_type)
 
         return handle
@@ -6,13 +6,22 @@ class JSONRPCTornado(CommonBackend):
     @property
     def handler(self):
         """Get Tornado Handler"""
+        backend = self
         manager = self.manager
 
         class JSONRPCTornadoHandler(tornado.web.RequestHandler):
             async def post(self):
-                self.set_header("Content-Type", "application/json")
-                payload = await manager.get_payload_for_payload(self.request.body)
+                codec = backend.get_codec(self.request.headers.get("Content-Type"))
+                self.set_header("Content-Type", codec.content_type)
+                with backend.request_timeout(self.request.headers):
+                    if backend.is_batch_response_streamed:
+                        # flush before finish makes tornado use chunked encoding
+                        async for chunk in manager.iter_payload_for_payload(self.request.body, codec=codec):
+                            self.write(chunk)
+                            await self.flush()
+                        return
+
+                    payload = await manager.get_payload_for_payload(self.request.body, codec=codec)
                 self.write(payload)
         
         return JSONRPCTornadoHandler
-
@@ -0,0 +1,153 @@
+"""Result cache for pure methods.
+
+Read-only methods that are called with the same params over and over could
+be marked as cached in dispatcher, manager then returns stored results for
+repeated calls without running the method:
+
+>>> @dispatcher.add_function(cache=60)
+... def get_country(code):
+...     return db.get_country(code)
+
+Only successful results are cached. Entries are keyed by method name and
+canonical JSON encoding of params, see :meth:`ResultCache.make_key`. If
+manager uses a JSON codec, results are stored already encoded (as
+:class:`~ajsonrpc.codec.RawJSON`), so cache hits are not encoded again.
+
+"""
+import json
+import time
+from collections import OrderedDict
+from typing import Any, Callable, Dict, Optional
+
+from .codec import RawJSON
+
+
+class ResultCache:
+
+    """LRU cache of method results with optional TTL.
+
+    Args:
+        max_size (int, optional): maximum number of entries, least recently
+            used entries are evicted first. None means unlimited.
+        max_bytes (int, optional): maximum total size of encoded results in
+            bytes. Results stored unencoded are not counted.
+        ttl (float, optional): default time to live of entries in seconds,
+            None means entries expire only by eviction.
+        clock (callable): monotonic time function.
+
+    Attributes:
+        hits (int): number of lookups that found a valid entry.
+        misses (int): number of lookups that did not.
+        evictions (int): number of entries evicted by size limits.
+        expirations (int): number of entries dropped because of TTL.
+
+    """
+
+    def __init__(self, max_size: Optional[int] = 1024, max_bytes: Optional[int] = None,
+                 ttl: Optional[float] = None, clock: Callable[[], float] = time.monotonic):
+        self.max_size = max_size
+        self.max_bytes = max_bytes
+        self.ttl = ttl
+        self.clock = clock
+        self.hits = self.misses = self.evictions = self.expirations = 0
+        self.bytes = 0
+        # key -> (expiration time or None, value, size)
+        self._entries: "OrderedDict[str, tuple]" = OrderedDict()
+
+    @staticmethod
+    def make_key(method_name: str, args: list, kwargs: dict) -> Optional[str]:
+        """Get cache key for a call, None if params could not be encoded.
+
+        Key is method name and compact JSON of params with sorted keys,
+        separated by space, e.g. ``'get_user {"id":1}'``.
+
+        """
+        try:
+            params = json.dumps(
+                kwargs if kwargs else list(args),
+                sort_keys=True, separators=(",", ":"), ensure_ascii=False)
+        except (TypeError, ValueError):
+            return None
+        return method_name + " " + params
+
+    def __len__(self):
+        return len(self._entries)
+
+    def __contains__(self, key: str):
+        return key in self._entries
+
+    def get(self, key: str) -> Any:
+        """Get cached result and mark it as recently used.
+
+        Raises:
+            KeyError: result is not cached or expired.
+
+        """
+        entry = self._entries.get(key)
+        if entry is not None and entry[0] is not None and entry[0] <= self.clock():
+            self._remove(key)
+            self.expirations += 1
+            entry = None
+
+        if entry is None:
+            self.misses += 1
+            raise KeyError(key)
+
+        self.hits += 1
+        self._entries.move_to_end(key)
+        return entry[1]
+
+    def set(self, key: str, value: Any, ttl: Optional[float] = None) -> None:
+        """Store result, ttl overrides cache default."""
+        ttl = ttl if ttl is not None else self.ttl
+        size = len(value.payload) if isinstance(value, RawJSON) else 0
+        if self.max_bytes is not None and size > self.max_bytes:
+            return
+
+        if key in self._entries:
+            self._remove(key)
+
+        expires = self.clock() + ttl if ttl is not None else None
+        self._entries[key] = (expires, value, size)
+        self.bytes += size
+
+        while (self.max_size is not None and len(self._entries) > self.max_size) \
+                or (self.max_bytes is not None and self.bytes > self.max_bytes):
+            self._remove(next(iter(self._entries)))
+            self.evictions += 1
+
+    def _remove(self, key: str) -> None:
+        self.bytes -= self._entries.pop(key)[2]
+
+    def invalidate(self, key: str) -> bool:
+        """Drop entry by key, return whether it existed."""
+        if key not in self._entries:
+            return False
+        self._remove(key)
+        return True
+
+    def invalidate_prefix(self, prefix: str) -> int:
+        """Drop entries with keys starting with prefix, return their number."""
+        keys = [key for key in self._entries if key.startswith(prefix)]
+        for key in keys:
+            self._remove(key)
+        return len(keys)
+
+    def invalidate_method(self, method_name: str) -> int:
+        """Drop all entries of a method, return their number."""
+        return self.invalidate_prefix(method_name + " ")
+
+    def clear(self) -> None:
+        self._entries.clear()
+        self.bytes = 0
+
+    def get_stats(self) -> Dict[str, int]:
+        """Get hit/miss counters and current size."""
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "evictions": self.evictions,
+            "expirations": self.expirations,
+            "size": len(self._entries),
+            "bytes": self.bytes,
+        }
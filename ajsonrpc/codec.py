@@ -0,0 +1,511 @@
+"""Payload encoding and decoding.
+
+Codec converts JSON-RPC bodies (dicts and lists) to bytes and back. The
+stdlib :mod:`json` is always available, faster or binary encodings are
+available if their packages are installed:
+
+* orjson, ujson: drop-in JSON replacements.
+* msgpack: MessagePack, ``application/msgpack``.
+* cbor2: CBOR, ``application/cbor``.
+
+Decoding errors are raised as ``ValueError`` (or its subclass) so manager
+reports them as parse errors regardless of the codec.
+
+Methods could return :class:`RawJSON` to send already encoded JSON as is:
+JSON codecs splice it into the response without parsing, other codecs
+decode it first.
+
+"""
+import codecs
+import json
+import re
+from typing import Any, Callable, Dict, Iterator, List, Optional, Tuple, Union
+
+try:
+    import orjson
+except ImportError:  # pragma: no cover
+    orjson = None
+
+try:
+    import ujson
+except ImportError:  # pragma: no cover
+    ujson = None
+
+try:
+    import msgpack
+except ImportError:  # pragma: no cover
+    msgpack = None
+
+try:
+    import cbor2
+except ImportError:  # pragma: no cover
+    cbor2 = None
+
+
+class RawJSON:
+
+    """Pre-encoded JSON value to be used as a method result as is.
+
+    Use it for data that is already JSON, e.g. stored in a cache or database,
+    to avoid decoding it only to encode it back. Payload is trusted: it is
+    neither parsed nor validated.
+
+    >>> dispatcher["get_profile"] = lambda: RawJSON(cache.get("profile"))
+
+    """
+
+    __slots__ = ("payload",)
+
+    def __init__(self, payload: Union[bytes, str]):
+        self.payload = payload.encode("utf-8") if isinstance(payload, str) else payload
+
+    def __eq__(self, other):
+        return isinstance(other, RawJSON) and self.payload == other.payload
+
+    def __repr__(self):
+        return "RawJSON({!r})".format(self.payload)
+
+    def decode(self) -> Any:
+        return json.loads(self.payload)
+
+
+def has_raw_json(body: Union[dict, list]) -> bool:
+    """Check whether response or batch response body has RawJSON results."""
+    if isinstance(body, list):
+        return any(isinstance(item.get("result"), RawJSON) for item in body)
+    return isinstance(body.get("result"), RawJSON)
+
+
+def decode_raw_json(body: Union[dict, list]) -> Union[dict, list]:
+    """Replace RawJSON results with decoded values.
+
+    Fallback for serializers that can not splice pre-encoded JSON.
+
+    """
+    if isinstance(body, list):
+        return [decode_raw_json(item) for item in body]
+    result = body.get("result")
+    if isinstance(result, RawJSON):
+        return dict(body, result=result.decode())
+    return body
+
+
+class Codec:
+
+    """Base codec: bytes in, bytes out.
+
+    Attributes:
+        content_types (tuple): MIME types handled by the codec, the first one
+            is used in responses.
+        is_json (bool): codec produces JSON text, so RawJSON results could be
+            spliced into the output without decoding.
+
+    """
+
+    content_types: Tuple[str, ...] = ("application/json",)
+    is_json = False
+
+    @property
+    def content_type(self) -> str:
+        return self.content_types[0]
+
+    def encode(self, value: Any) -> bytes:
+        raise NotImplementedError
+
+    def decode(self, payload: Union[bytes, str]) -> Any:
+        raise NotImplementedError
+
+    def encode_body(self, body: Union[dict, list]) -> bytes:
+        """Encode response or batch response body, RawJSON results aware."""
+        if not has_raw_json(body):
+            return self.encode(body)
+
+        if not self.is_json:
+            return self.encode(decode_raw_json(body))
+
+        if isinstance(body, list):
+            return b"[" + b",".join(self.encode_body(item) for item in body) + b"]"
+
+        envelope = {key: value for key, value in body.items() if key != "result"}
+        # JSON object always ends with "}", append result as the last member.
+        return b"".join((
+            self.encode(envelope)[:-1], b',"result":', body["result"].payload, b"}"
+        ))
+
+    def __repr__(self):
+        return "{}()".format(self.__class__.__name__)
+
+
+class FunctionCodec(Codec):
+
+    """Adapter for a pair of serialize and deserialize functions.
+
+    Keeps compatibility with str based serializers, e.g. json.dumps, result
+    is encoded to utf-8 if needed.
+
+    """
+
+    def __init__(self,
+                 serialize: Callable[[Any], Union[bytes, str]] = json.dumps,
+                 deserialize: Callable[[Union[bytes, str]], Any] = json.loads,
+                 content_types: Optional[Tuple[str, ...]] = None):
+        self.serialize = serialize
+        self.deserialize = deserialize
+        if content_types is not None:
+            self.content_types = content_types
+
+    def encode(self, value: Any) -> bytes:
+        payload = self.serialize(value)
+        return payload.encode("utf-8") if isinstance(payload, str) else payload
+
+    def decode(self, payload: Union[bytes, str]) -> Any:
+        return self.deserialize(payload)
+
+
+class JSONCodec(Codec):
+
+    """Stdlib json codec."""
+
+    is_json = True
+
+    def __init__(self):
+        self._encoder = json.JSONEncoder(separators=(",", ":"))
+
+    def encode(self, value: Any) -> bytes:
+        return self._encoder.encode(value).encode("utf-8")
+
+    def decode(self, payload: Union[bytes, str]) -> Any:
+        return json.loads(payload)
+
+
+class OrjsonCodec(Codec):
+
+    """orjson codec, requires orjson package."""
+
+    is_json = True
+
+    def __init__(self):
+        if orjson is None:
+            raise ImportError("orjson is not installed")
+
+    def encode(self, value: Any) -> bytes:
+        return orjson.dumps(value)
+
+    def decode(self, payload: Union[bytes, str]) -> Any:
+        return orjson.loads(payload)
+
+
+class UjsonCodec(Codec):
+
+    """ujson codec, requires ujson package."""
+
+    is_json = True
+
+    def __init__(self):
+        if ujson is None:
+            raise ImportError("ujson is not installed")
+
+    def encode(self, value: Any) -> bytes:
+        return ujson.dumps(value).encode("utf-8")
+
+    def decode(self, payload: Union[bytes, str]) -> Any:
+        return ujson.loads(payload)
+
+
+class MsgpackCodec(Codec):
+
+    """MessagePack codec, requires msgpack package."""
+
+    content_types = (
+        "application/msgpack", "application/x-msgpack",
+        "application/vnd.msgpack",
+    )
+
+    def __init__(self):
+        if msgpack is None:
+            raise ImportError("msgpack is not installed")
+
+    def encode(self, value: Any) -> bytes:
+        return msgpack.packb(value, use_bin_type=True)
+
+    def decode(self, payload: Union[bytes, str]) -> Any:
+        if isinstance(payload, str):
+            raise ValueError("MessagePack payload has to be bytes")
+        return msgpack.unpackb(payload, raw=False)
+
+
+class CBORCodec(Codec):
+
+    """CBOR codec, requires cbor2 package."""
+
+    content_types = ("application/cbor",)
+
+    def __init__(self):
+        if cbor2 is None:
+            raise ImportError("cbor2 is not installed")
+
+    def encode(self, value: Any) -> bytes:
+        return cbor2.dumps(value)
+
+    def decode(self, payload: Union[bytes, str]) -> Any:
+        if isinstance(payload, str):
+            raise ValueError("CBOR payload has to be bytes")
+        return cbor2.loads(payload)
+
+
+def get_json_codec() -> Codec:
+    """Get the fastest available JSON codec, fall back to stdlib json."""
+    if orjson is not None:
+        return OrjsonCodec()
+    if ujson is not None:
+        return UjsonCodec()
+    return JSONCodec()
+
+
+def get_available_codecs() -> Dict[str, Codec]:
+    """Get available codecs by content type.
+
+    JSON is always present, binary codecs are added if their packages are
+    installed.
+
+    """
+    codecs = [get_json_codec()]
+    if msgpack is not None:
+        codecs.append(MsgpackCodec())
+    if cbor2 is not None:
+        codecs.append(CBORCodec())
+
+    return {
+        content_type: codec
+        for codec in codecs
+        for content_type in codec.content_types
+    }
+
+
+def get_mime_type(content_type: Optional[str]) -> str:
+    """Strip parameters from Content-Type header value.
+
+    >>> get_mime_type("application/json; charset=utf-8")
+    'application/json'
+
+    """
+    if not content_type:
+        return ""
+    return content_type.split(";", 1)[0].strip().lower()
+
+
+class IncrementalJSONParser:
+
+    """Incremental JSON parser, yields batch elements one by one.
+
+    Payload is fed in chunks of bytes. If it is an array (batch request),
+    :meth:`feed` returns elements as soon as they are complete, so they could
+    be processed while the rest of the payload is still being received;
+    :meth:`iter_feed` parses them lazily, one by one. Any other value is
+    returned once the payload is complete.
+
+    Element complete in the buffer is decoded directly. Otherwise it is
+    scanned for its end, keeping track of strings and nesting: chunks are
+    collected and scanned once, element is decoded once it is complete, so
+    parsing time is linear in payload size regardless of chunk size.
+
+    Raises ValueError for invalid JSON: for invalid separators or starts of
+    elements as soon as they are received, for invalid element once it is
+    complete, and for incomplete payload at the end.
+
+    Attributes:
+        is_batch (bool): whether payload is an array, None until known.
+        count (int): number of parsed array elements.
+
+    """
+
+    WHITESPACE = " \t\n\r"
+    # First characters of numbers, true, false and null
+    SCALAR_START = "-0123456789tfn"
+    SCALAR_END = re.compile(r'[\s,\]]')
+    # Brackets and strings, group is None if string is not terminated yet
+    TOKEN = re.compile(r'[\[\]{}]|"[^"\\]*(?:\\.[^"\\]*)*(")?', re.DOTALL)
+    # Rest of string started in previous chunk
+    STRING_REST = re.compile(r'[^"\\]*(?:\\.[^"\\]*)*(")?', re.DOTALL)
+
+    def __init__(self):
+        self._decoder = codecs.getincrementaldecoder("utf-8")()
+        self._json_decoder = json.JSONDecoder()
+        self._buffer = ""
+        self._position = 0
+        self._is_separator_expected = False
+        self._is_done = False
+        # Chunks of incomplete element and its scanner state
+        self._pieces = None
+        self._depth = 0
+        self._is_in_string = False
+        self._is_escaped = False
+        self.is_batch = None
+        self.count = 0
+
+    def _skip_whitespace(self) -> None:
+        buffer, position = self._buffer, self._position
+        while position < len(buffer) and buffer[position] in self.WHITESPACE:
+            position += 1
+        self._position = position
+
+    def feed(self, data: bytes, eof: bool = False) -> List[Any]:
+        """Feed a chunk of payload, get list of completed values.
+
+        Args:
+            data: next chunk of payload.
+            eof: whether it is the last chunk.
+
+        """
+        return list(self.iter_feed(data, eof))
+
+    def iter_feed(self, data: bytes, eof: bool = False) -> Iterator[Any]:
+        """Feed a chunk of payload, iterate over completed values.
+
+        Values are parsed one per iteration, so consumer could stop early,
+        e.g. once batch is too large, without parsing the rest of the chunk.
+        Iterator has to be exhausted before the next chunk is fed.
+
+        """
+        text = self._decoder.decode(data, final=eof)
+        if self._pieces is not None:
+            # Scan only new text of incomplete element
+            self._pieces.append(text)
+            if self._scan(text, 0) is None:
+                if eof:
+                    raise ValueError("Unexpected end of payload")
+                return
+            self._buffer, self._pieces = "".join(self._pieces), None
+        else:
+            self._buffer += text
+
+        if self.is_batch is None:
+            self._skip_whitespace()
+            if self._position == len(self._buffer):
+                if eof:
+                    raise ValueError("Empty payload")
+                return
+            self.is_batch = self._buffer[self._position] == "["
+            if self.is_batch:
+                self._position += 1
+
+        if not self.is_batch:
+            if eof:
+                yield json.loads(self._buffer)
+            return
+
+        yield from self._iter_elements(eof)
+        if self._position:
+            # Drop consumed part of the buffer
+            self._buffer = self._buffer[self._position:]
+            self._position = 0
+
+        if eof and not self._is_done:
+            raise ValueError("Unexpected end of payload")
+
+    def _iter_elements(self, eof: bool) -> Iterator[Any]:
+        while True:
+            self._skip_whitespace()
+            if self._position == len(self._buffer):
+                return
+
+            char = self._buffer[self._position]
+            if self._is_done:
+                raise ValueError("Extra data after the end of array")
+
+            if self._is_separator_expected:
+                if char == ",":
+                    self._position += 1
+                    self._is_separator_expected = False
+                elif char == "]":
+                    self._position += 1
+                    self._is_done = True
+                else:
+                    raise ValueError("Expecting ',' delimiter")
+                continue
+
+            if char == "]" and self.count == 0:
+                # Empty array
+                self._position += 1
+                self._is_done = True
+                continue
+
+            if char in self.SCALAR_START and not eof \
+                    and self.SCALAR_END.search(self._buffer, self._position) is None:
+                # Number or literal might be truncated, wait for delimiter
+                return
+
+            try:
+                value, end = self._json_decoder.raw_decode(self._buffer, self._position)
+            except ValueError:
+                if eof or not self._is_incomplete(char):
+                    raise
+                return
+
+            self.count += 1
+            self._position = end
+            self._is_separator_expected = True
+            yield value
+
+    def _is_incomplete(self, char: str) -> bool:
+        """Check whether element at current position is incomplete.
+
+        Incomplete array, object or string is moved to pieces to be scanned
+        chunk by chunk. Complete element is invalid.
+
+        Raises:
+            ValueError: element does not start as JSON value.
+
+        """
+        if char not in "{[\"":
+            # Scalar with delimiter is complete
+            if char not in self.SCALAR_START:
+                raise ValueError("Expecting value at {}".format(self._position))
+            return False
+
+        self._depth, self._is_in_string, self._is_escaped = 0, False, False
+        if self._scan(self._buffer, self._position) is not None:
+            return False
+
+        self._pieces = [self._buffer[self._position:]]
+        self._buffer, self._position = "", 0
+        return True
+
+    def _scan(self, text: str, position: int) -> Optional[int]:
+        """Scan text of element, get its end or None if it continues."""
+        if self._is_escaped:
+            if position == len(text):
+                return None
+            position += 1
+            self._is_escaped = False
+
+        depth = self._depth
+        if self._is_in_string:
+            match = self.STRING_REST.match(text, position)
+            if match.group(1) is None:
+                # Trailing backslash escapes first character of next chunk
+                self._is_escaped = match.end() < len(text)
+                return None
+            self._is_in_string = False
+            position = match.end()
+            if depth == 0:
+                return position
+
+        for match in self.TOKEN.finditer(text, position):
+            token = match.group()
+            if token[0] == '"':
+                if match.group(1) is None:
+                    self._is_in_string = True
+                    self._is_escaped = match.end() < len(text)
+                    self._depth = depth
+                    return None
+            elif token in "[{":
+                depth += 1
+            else:
+                depth -= 1
+
+            if depth == 0:
+                return match.end()
+
+        self._depth = depth
+        return None
@@ -92,11 +92,18 @@ class JSONRPC20Request:
     Attributes:
         _body (dict): body of the request. It should always contain valid data and
         should be modified via setters to ensure validity.
+        _args (list): cached positional arguments, derived from params.
+        _kwargs (dict): cached named arguments, derived from params.
 
     Examples:
         modification via self.body["method"] vs self.method
         modifications via self._body
     """
+
+    __slots__ = ("_body", "_args", "_kwargs")
+
+    BODY_KEYS = frozenset(("jsonrpc", "method", "params", "id"))
+
     def __init__(self,
                 method: str,
                 params: Optional[Union[Mapping[str, Any], Iterable[Any]]] = None,
@@ -128,9 +135,10 @@ class JSONRPC20Request:
         if not isinstance(value, Mapping):
             raise ValueError("request body has to be of type Mapping")
 
-        extra_keys = set(value.keys()) - {"jsonrpc", "method", "params", "id"}
-        if len(extra_keys) > 0:
-            raise ValueError("unexpected keys {}".format(extra_keys))
+        for key in value:
+            if key not in self.BODY_KEYS:
+                raise ValueError("unexpected keys {}".format(
+                    set(value.keys()) - self.BODY_KEYS))
 
         if value.get("jsonrpc") != "2.0":
             raise ValueError("value of key 'jsonrpc' has to be '2.0'")
@@ -144,6 +152,7 @@ class JSONRPC20Request:
             self.validate_id(value["id"])
 
         self._body = value
+        self._args = self._kwargs = None
 
     @property
     def method(self) -> str:
@@ -184,10 +193,12 @@ class JSONRPC20Request:
     def params(self, value: Optional[Union[Mapping[str, Any], Iterable[Any]]]) -> None:
         self.validate_params(value)
         self._body["params"] = value
+        self._args = self._kwargs = None
 
     @params.deleter
     def params(self):
         del self._body["params"]
+        self._args = self._kwargs = None
 
     @property
     def id(self):
@@ -239,21 +250,40 @@ class JSONRPC20Request:
         """ Method position arguments.
         :return list args: method position arguments.
         note: dict is also iterable, so exclude it from args.
+        note: value is computed once and shared between calls, list params
+            are returned as is. Do not modify it, use params setter instead.
         """
-        # if not none and not mapping
-        return list(self.params) if isinstance(self.params, Iterable) and not isinstance(self.params, Mapping) else []
+        if self._args is None:
+            params = self.params
+            if type(params) is list:
+                self._args = params
+            elif isinstance(params, Iterable) and not isinstance(params, Mapping):
+                self._args = list(params)
+            else:
+                self._args = []
+        return self._args
 
     @property
     def kwargs(self) -> Dict:
         """ Method named arguments.
         :return dict kwargs: method named arguments.
+        note: value is computed once and shared between calls, dict params
+            are returned as is. Do not modify it, use params setter instead.
         """
-        # if mapping
-        return dict(self.params) if isinstance(self.params, Mapping) else {}
+        if self._kwargs is None:
+            params = self.params
+            if type(params) is dict:
+                self._kwargs = params
+            elif isinstance(params, Mapping):
+                self._kwargs = dict(params)
+            else:
+                self._kwargs = {}
+        return self._kwargs
 
     @staticmethod
     def from_body(body: Mapping):
-        request = JSONRPC20Request(method="", id=0)
+        """Create request from body, validating it in a single pass."""
+        request = JSONRPC20Request.__new__(JSONRPC20Request)
         request.body = body
         return request
 
@@ -335,6 +365,18 @@ class JSONRPC20Error:
         self._body = {}  # init body
         self.body = error_body
 
+    @classmethod
+    def _from_trusted_body(cls, body: dict) -> "JSONRPC20Error":
+        """Create error from a body that is known to be valid.
+
+        Internal constructor for bodies built by the library itself: the body
+        is neither validated nor copied. Use public constructor otherwise.
+
+        """
+        error = cls.__new__(cls)
+        object.__setattr__(error, "_body", body)
+        return error
+
     def __eq__(self, other):
         return self.code == other.code \
             and self.message == other.message \
@@ -483,6 +525,37 @@ class JSONRPC20ServerError(JSONRPC20SpecificError):
     MESSAGE = "Server error"
 
 
+class JSONRPC20BatchTooLarge(JSONRPC20SpecificError):
+
+    """Batch too large.
+    Batch request has more elements than the server accepts.
+    """
+
+    CODE = -32001
+    MESSAGE = "Batch too large"
+
+
+class JSONRPC20ServerOverloaded(JSONRPC20SpecificError):
+
+    """Server overloaded.
+    Server is at capacity and rejected the request, retry later.
+    """
+
+    CODE = -32002
+    MESSAGE = "Server overloaded"
+
+
+class JSONRPC20RequestTimeout(JSONRPC20SpecificError):
+
+    """Request timeout.
+    Method did not complete in time and was cancelled, or request deadline
+    expired before the method was started.
+    """
+
+    CODE = -32003
+    MESSAGE = "Request timeout"
+
+
 class JSONRPC20Response:
     def __init__(self,
                 result: Optional[Any] = None,
@@ -503,6 +576,18 @@ class JSONRPC20Response:
         self._body = {}  # init body
         self.body = response_body
 
+    @classmethod
+    def _from_trusted_body(cls, body: dict) -> "JSONRPC20Response":
+        """Create response from a body that is known to be valid.
+
+        Internal constructor for bodies built by the library itself: the body
+        is neither validated nor copied. Use public constructor otherwise.
+
+        """
+        response = cls.__new__(cls)
+        response._body = body
+        return response
+
     @property
     def body(self):
         return self._body
@@ -607,3 +692,7 @@ class JSONRPC20DispatchException(JSONRPC20Exception):
     def __init__(self, code=None, message=None, data=None, *args, **kwargs):
         super(JSONRPC20DispatchException, self).__init__(args, kwargs)
         self.error = JSONRPC20Error(code=code, data=data, message=message)
+
+    def __reduce__(self):
+        # Keep exception picklable, e.g. when raised in a worker process
+        return (self.__class__, (self.error.code, self.error.message, self.error.data))
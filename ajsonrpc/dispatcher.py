@@ -3,11 +3,26 @@
 Dispatcher is a dict-like object which maps method_name to method.
 For usage examples see :meth:`~Dispatcher.add_function`
 
+Dispatcher also keeps execution policy of synchronous methods, it defines
+where manager runs a method:
+
+* "inline": call on the event loop, fine for fast non-blocking methods.
+* "thread": run in a thread pool, for blocking I/O.
+* "process": run in a process pool, for CPU-bound methods, see
+  :mod:`ajsonrpc.pool`.
+* any other name: run in an executor registered in manager under that name.
+
+Per-method timeout (seconds) overrides manager default timeout.
+
+Pure methods could be cached: manager stores their results and returns them
+for repeated calls with the same params, see :mod:`ajsonrpc.cache`.
+
 """
 import functools
 import inspect
 import types
-from typing import Any, Optional, Mapping
+from typing import Any, Optional, Mapping, Union
+from concurrent.futures import Executor
 from collections.abc import Mapping as CollectionsMapping, MutableMapping, Callable
 
 
@@ -33,6 +48,9 @@ class Dispatcher(MutableMapping):
 
         """
         self.method_map: Mapping[str, Callable] = dict()
+        self.executors: Mapping[str, Union[str, Executor]] = dict()
+        self.timeouts: Mapping[str, float] = dict()
+        self.caches: Mapping[str, Union[bool, float]] = dict()
 
         if prototype is not None:
             self.add_prototype(prototype, prefix=prefix)
@@ -45,6 +63,9 @@ class Dispatcher(MutableMapping):
 
     def __delitem__(self, key: str) -> None:
         del self.method_map[key]
+        self.executors.pop(key, None)
+        self.timeouts.pop(key, None)
+        self.caches.pop(key, None)
 
     def __len__(self):
         return len(self.method_map)
@@ -55,6 +76,47 @@ class Dispatcher(MutableMapping):
     def __repr__(self):
         return repr(self.method_map)
 
+    def set_executor(self, key: str, executor: Optional[Union[str, Executor]]) -> None:
+        """Set execution policy of a method, None resets it to manager default."""
+        if executor is None:
+            self.executors.pop(key, None)
+        else:
+            self.executors[key] = executor
+
+    def set_timeout(self, key: str, timeout: Optional[float]) -> None:
+        """Set timeout of a method, None resets it to manager default."""
+        if timeout is None:
+            self.timeouts.pop(key, None)
+        else:
+            self.timeouts[key] = timeout
+
+    def set_cache(self, key: str, cache: Optional[Union[bool, float]]) -> None:
+        """Set result caching of a method.
+
+        True caches results with manager cache default TTL, number sets TTL
+        in seconds, None or False disables caching.
+
+        """
+        if cache is None or cache is False:
+            self.caches.pop(key, None)
+        else:
+            self.caches[key] = cache
+
+    def update_methods(self, methods: Mapping[str, Callable],
+                       executor: Optional[Union[str, Executor]] = None,
+                       timeout: Optional[float] = None) -> None:
+        """Add methods sharing the same execution policy and timeout.
+
+        Results of the methods are not cached, even if previously registered
+        methods with the same names were.
+
+        """
+        for key, method in methods.items():
+            self[key] = method
+            self.set_executor(key, executor)
+            self.set_timeout(key, timeout)
+            self.set_cache(key, None)
+
     @staticmethod
     def _getattr_function(prototype: Any, attr: str) -> Callable:
         """Fix the issue of accessing instance method of a class.
@@ -78,7 +140,9 @@ class Dispatcher(MutableMapping):
             if not attr.startswith("_")
         }
 
-    def add_class(self, cls: Any, prefix: Optional[str] = None) -> None:
+    def add_class(self, cls: Any, prefix: Optional[str] = None,
+                  executor: Optional[Union[str, Executor]] = None,
+                  timeout: Optional[float] = None) -> None:
         """Add class to dispatcher.
 
         Adds all of the public methods to dispatcher.
@@ -96,31 +160,46 @@ class Dispatcher(MutableMapping):
             class with methods to be added to dispatcher
         prefix : str, optional
             Method prefix. If not present, lowercased class name is used.
+        executor : str or Executor, optional
+            Execution policy of class methods, see module docs.
+        timeout : float, optional
+            Timeout of class methods in seconds.
 
         """
         if prefix is None:
             prefix = cls.__name__.lower() + '.'
 
-        self.update(Dispatcher._extract_methods(cls, prefix=prefix))
+        self.update_methods(
+            Dispatcher._extract_methods(cls, prefix=prefix),
+            executor=executor, timeout=timeout)
 
-    def add_object(self, obj: Any, prefix: Optional[str] = None) -> None:
+    def add_object(self, obj: Any, prefix: Optional[str] = None,
+                   executor: Optional[Union[str, Executor]] = None,
+                   timeout: Optional[float] = None) -> None:
         if prefix is None:
             prefix = obj.__class__.__name__.lower() + '.'
 
-        self.update(Dispatcher._extract_methods(obj, prefix=prefix))
+        self.update_methods(
+            Dispatcher._extract_methods(obj, prefix=prefix),
+            executor=executor, timeout=timeout)
 
-    def add_prototype(self, prototype: Any, prefix: Optional[str] = None) -> None:
+    def add_prototype(self, prototype: Any, prefix: Optional[str] = None,
+                      executor: Optional[Union[str, Executor]] = None,
+                      timeout: Optional[float] = None) -> None:
         if isinstance(prototype, CollectionsMapping):
-            self.update({
+            self.update_methods({
                 (prefix or "") + key: value
                 for key, value in prototype.items()
-            })
+            }, executor=executor, timeout=timeout)
         elif inspect.isclass(prototype):
-            self.add_class(prototype, prefix=prefix)
+            self.add_class(prototype, prefix=prefix, executor=executor, timeout=timeout)
         else:
-            self.add_object(prototype, prefix=prefix)
+            self.add_object(prototype, prefix=prefix, executor=executor, timeout=timeout)
 
-    def add_function(self, f: Callable = None, name: Optional[str] = None) -> Callable:
+    def add_function(self, f: Callable = None, name: Optional[str] = None,
+                     executor: Optional[Union[str, Executor]] = None,
+                     timeout: Optional[float] = None,
+                     cache: Optional[Union[bool, float]] = None) -> Callable:
         """ Add a method to the dispatcher.
 
         Parameters
@@ -129,6 +208,16 @@ class Dispatcher(MutableMapping):
             Callable to be added.
         name : str, optional
             Name to register (the default is function **f** name)
+        executor : str or Executor, optional
+            Execution policy of a synchronous method: "inline", "thread",
+            "process", name of manager executor or executor itself. Manager
+            default policy is used if not set.
+        timeout : float, optional
+            Maximum execution time in seconds, manager default timeout is
+            used if not set.
+        cache : bool or float, optional
+            Cache results of a pure method: True uses manager cache default
+            TTL, number is TTL in seconds.
 
         Notes
         -----
@@ -156,9 +245,28 @@ class Dispatcher(MutableMapping):
             def mymethod(*args, **kwargs):
                 print(args, kwargs)
 
-        """
-        if name and not f:
-            return functools.partial(self.add_function, name=name)
+        Or run blocking method in a thread pool
+        >>> d = Dispatcher()
+        >>> @d.add_function(executor="thread")
+            def read(path):
+                with open(path) as f:
+                    return f.read()
 
-        self[name or f.__name__] = f
+        Or cache results of a read-only method for a minute
+        >>> d = Dispatcher()
+        >>> @d.add_function(cache=60)
+            def get_country(code):
+                return db.get_country(code)
+
+        """
+        if f is None:
+            return functools.partial(
+                self.add_function, name=name, executor=executor, timeout=timeout,
+                cache=cache)
+
+        key = name or f.__name__
+        self[key] = f
+        self.set_executor(key, executor)
+        self.set_timeout(key, timeout)
+        self.set_cache(key, cache)
         return f
@@ -0,0 +1,64 @@
+"""Adaptive concurrency limits for admission control.
+
+Fixed ``max_in_flight`` has to be tuned for the slowest deployment and the
+heaviest traffic. Adaptive limit adjusts itself from observed latency:
+manager rejects calls over the current limit immediately, so under a spike
+clients fail fast instead of waiting in ever growing queues.
+
+"""
+from typing import Optional
+
+
+class AIMDLimit:
+
+    """Additive increase, multiplicative decrease concurrency limit.
+
+    Limit grows by one for every call completed within latency threshold
+    while the limit is actually used, and shrinks by backoff ratio for every
+    slow or dropped (e.g. timed out) call.
+
+    Args:
+        latency_threshold (float): call latency in seconds considered as a
+            sign of overload.
+        initial_limit (int): starting limit.
+        min_limit (int): limit never goes below it.
+        max_limit (int, optional): limit never goes above it.
+        backoff_ratio (float): multiplier applied on overload, in (0, 1).
+
+    """
+
+    def __init__(self, latency_threshold: float, initial_limit: int = 20, min_limit: int = 1,
+                 max_limit: Optional[int] = 1000, backoff_ratio: float = 0.9):
+        if not 0 < backoff_ratio < 1:
+            raise ValueError("backoff_ratio has to be between 0 and 1")
+
+        self.latency_threshold = latency_threshold
+        self.min_limit = min_limit
+        self.max_limit = max_limit
+        self.backoff_ratio = backoff_ratio
+        self._limit = float(initial_limit)
+
+    @property
+    def limit(self) -> int:
+        return int(self._limit)
+
+    def update(self, latency: float, in_flight: int, is_dropped: bool = False) -> None:
+        """Adjust limit after a call completed.
+
+        Args:
+            latency: call duration in seconds.
+            in_flight: number of calls in flight when the call started.
+            is_dropped: whether the call was dropped, e.g. timed out.
+
+        """
+        if is_dropped or latency > self.latency_threshold:
+            self._limit = max(self.min_limit, self._limit * self.backoff_ratio)
+        elif in_flight * 2 >= self._limit:
+            # Increase only if the limit is in use, otherwise it would grow
+            # without bound under light load.
+            self._limit += 1
+            if self.max_limit is not None:
+                self._limit = min(self.max_limit, self._limit)
+
+    def __repr__(self):
+        return "AIMDLimit(limit={})".format(self.limit)
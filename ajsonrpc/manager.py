@@ -1,118 +1,1076 @@
 import json
-import inspect
 import asyncio
-from typing import Optional, Union, Iterable, Mapping
+import contextlib
+import contextvars
+import functools
+import logging
+import time
+from concurrent.futures import Executor, ThreadPoolExecutor
+from numbers import Real
+from typing import AsyncIterable, AsyncIterator, Dict, List, Optional, Tuple, Union, Iterable, Mapping
 
 from .core import (
     JSONRPC20Request, JSONRPC20BatchRequest, JSONRPC20Response,
     JSONRPC20BatchResponse, JSONRPC20MethodNotFound, JSONRPC20InvalidParams,
-    JSONRPC20ServerError, JSONRPC20ParseError, JSONRPC20InvalidRequest,
-    JSONRPC20DispatchException,
+    JSONRPC20ServerError, JSONRPC20ParseError, JSONRPC20InvalidRequest, JSONRPC20InternalError,
+    JSONRPC20DispatchException, JSONRPC20BatchTooLarge,
+    JSONRPC20ServerOverloaded, JSONRPC20RequestTimeout,
 )
+from .cache import ResultCache
+from .codec import Codec, FunctionCodec, IncrementalJSONParser, RawJSON, decode_raw_json, has_raw_json
 from .dispatcher import Dispatcher
-from .utils import is_invalid_params
+from .limit import AIMDLimit
+from .metrics import UNKNOWN_METHOD, Metrics
+from .profiler import Profiler, current_profile
+from .middleware import HOOKS, Middleware, get_hooks
+from .pool import ProcessPool, get_method_reference
+from .utils import MethodPlan
+
+logger = logging.getLogger(__name__)
+
+
+def make_result_response(result, response_id) -> JSONRPC20Response:
+    """Build successful response on the trusted (non-validating) path."""
+    return JSONRPC20Response._from_trusted_body({
+        "jsonrpc": "2.0",
+        "id": response_id,
+        "result": result,
+    })
+
+
+def make_error_response(error_class, response_id=None, data=None) -> JSONRPC20Response:
+    """Build response for a specific error on the trusted path."""
+    error_body = {"code": error_class.CODE, "message": error_class.MESSAGE}
+    if data is not None:
+        error_body["data"] = data
+
+    return JSONRPC20Response._from_trusted_body({
+        "jsonrpc": "2.0",
+        "id": response_id,
+        "error": error_body,
+    })
+
+
+# Loop time by which requests handled in the current context have to complete
+request_deadline: contextvars.ContextVar = contextvars.ContextVar("request_deadline", default=None)
+# Responses handled in the current context are encoded to payload, so cached
+# results could stay pre-encoded RawJSON instead of being decoded
+is_response_encoded: contextvars.ContextVar = contextvars.ContextVar("is_response_encoded", default=False)
+
+
+@contextlib.contextmanager
+def request_timeout(timeout: Optional[float]):
+    """Limit execution time of requests handled within the context.
+
+    Used by transports to apply request level deadline, e.g. from a header.
+    Nested contexts could only shorten the deadline.
+
+    >>> with request_timeout(0.5):
+    ...     await manager.get_payload_for_payload(payload)
+
+    """
+    if timeout is None:
+        yield
+        return
+
+    deadline = asyncio.get_event_loop().time() + timeout
+    current_deadline = request_deadline.get()
+    if current_deadline is not None:
+        deadline = min(deadline, current_deadline)
+
+    token = request_deadline.set(deadline)
+    try:
+        yield
+    finally:
+        request_deadline.reset(token)
+
+
+async def iter_chunks(stream: Union[bytes, Iterable[bytes], AsyncIterable[bytes]]) -> AsyncIterator[bytes]:
+    """Iterate over chunks of bytes, async iterables and bytes are supported."""
+    if isinstance(stream, (bytes, bytearray, memoryview)):
+        yield bytes(stream)
+    elif hasattr(stream, "__aiter__"):
+        async for chunk in stream:
+            yield chunk
+    else:
+        for chunk in stream:
+            yield chunk
+
+
+async def gather_or_cancel(tasks: List[asyncio.Future]) -> list:
+    """Gather results of tasks, cancel pending ones if any of them fails."""
+    try:
+        return await asyncio.gather(*tasks)
+    finally:
+        for task in tasks:
+            task.cancel()
 
 
 class AsyncJSONRPCResponseManager:
 
-    """Async JSON-RPC Response manager."""
+    """Async JSON-RPC Response manager.
+
+    Args:
+        dispatcher: mapping of method names to methods.
+        serialize: function to convert response body to payload.
+        deserialize: function to convert payload to request body.
+        is_server_error_verbose (bool): include exception details in server
+            error data.
+        is_params_prevalidated (bool): check request params against method
+            signature before the call. Calls with invalid params are rejected
+            with "Invalid params" error without running the method, and any
+            exception raised by the method itself is reported as server error.
+        codec (:obj:Codec, optional): bytes based codec. If set, it replaces
+            serialize and deserialize and payloads are bytes end to end.
+        max_batch_size (int, optional): maximum number of requests in a batch,
+            larger batches are rejected with "Batch too large" error.
+        max_batch_concurrency (int, optional): maximum number of requests of
+            a single batch executed concurrently.
+        max_in_flight (int, optional): maximum number of method calls
+            executed concurrently by the manager, calls over the limit are
+            rejected with overload error immediately, without queueing.
+        executors (dict, optional): named executors for synchronous methods,
+            referenced by execution policy in dispatcher.
+        timeout (float, optional): default maximum execution time of a method
+            in seconds. Expired calls are cancelled and get "Request timeout"
+            error. Dispatcher could set timeouts per method.
+        timeout_param (str, optional): name of by-name param with request
+            timeout in seconds, it is removed from params before the call.
+            Effective timeout is the minimum of method, request and transport
+            (see :func:`request_timeout`) timeouts, requests with expired
+            deadline are not started.
+        default_executor (str): execution policy of synchronous methods
+            without one set in dispatcher: "inline" (default), "thread",
+            "process" or name of an executor. Methods with "process" policy
+            run in :class:`~ajsonrpc.pool.ProcessPool` registered under this
+            name or created with default settings, they have to be
+            importable by name.
+            Execution policies referring to unknown executors are rejected
+            with ValueError when manager is created; methods registered
+            with them later get "Internal error".
+        is_notification_detached (bool): run notifications in background
+            tasks, so response is sent without waiting for them.
+        cache (:obj:ResultCache, optional): cache of results of methods
+            marked as cached in dispatcher. Cache with default settings is
+            used if not set.
+        is_call_coalesced (bool): coalesce concurrent calls with the same
+            method and params, batch elements included: method is called
+            once and every caller gets the shared result with its own id.
+            Meant for read-only methods, should not be used if methods have
+            side effects.
+        overload_error: error class of calls rejected by in-flight limits,
+            subclass of :class:`~ajsonrpc.core.JSONRPC20SpecificError`,
+            "Server overloaded" by default.
+        adaptive_limit (:obj:AIMDLimit, optional): in-flight limit adjusted
+            by observed call latency, applied in addition to max_in_flight.
+        middlewares (list, optional): middlewares to install, see
+            :mod:`ajsonrpc.middleware`.
+        metrics (:obj:Metrics, optional): registry to record call, batch and
+            payload metrics to, see :mod:`ajsonrpc.metrics`.
+        profiler (:obj:Profiler, optional): phase profiler of a sample of
+            payloads, see :mod:`ajsonrpc.profiler`.
+
+    Attributes:
+        in_flight (int): number of method calls being executed.
+        notification_tasks (set): pending detached notifications.
+
+    """
 
-    def __init__(self, dispatcher: Dispatcher, serialize=json.dumps, deserialize=json.loads, is_server_error_verbose=False):
+    def __init__(self, dispatcher: Dispatcher, serialize=json.dumps, deserialize=json.loads, is_server_error_verbose=False,
+                 is_params_prevalidated=False, codec: Optional[Codec] = None, max_batch_size: Optional[int] = None,
+                 max_batch_concurrency: Optional[int] = None, max_in_flight: Optional[int] = None,
+                 executors: Optional[Mapping[str, Executor]] = None, default_executor: str = "inline",
+                 timeout: Optional[float] = None, timeout_param: Optional[str] = None,
+                 is_notification_detached: bool = False, cache: Optional[ResultCache] = None,
+                 is_call_coalesced: bool = False, overload_error=JSONRPC20ServerOverloaded,
+                 adaptive_limit: Optional[AIMDLimit] = None, middlewares: Optional[List[Middleware]] = None,
+                 metrics: Optional[Metrics] = None, profiler: Optional[Profiler] = None):
         self.dispatcher = dispatcher
+        self.codec = codec
+        if codec is not None:
+            serialize, deserialize = codec.encode, codec.decode
         self.serialize = serialize
         self.deserialize = deserialize
         self.is_server_error_verbose = is_server_error_verbose
+        self.is_params_prevalidated = is_params_prevalidated
+        self.max_batch_size = max_batch_size
+        self.max_batch_concurrency = max_batch_concurrency
+        self.max_in_flight = max_in_flight
+        self.in_flight = 0
+        self.executors: Dict[str, Executor] = dict(executors or {})
+        self.default_executor = default_executor
+        self.timeout = timeout
+        self.timeout_param = timeout_param
+        self.is_notification_detached = is_notification_detached
+        self.notification_tasks = set()
+        self.cache = cache if cache is not None else ResultCache()
+        self.is_call_coalesced = is_call_coalesced
+        self._coalesced_calls: Dict[str, asyncio.Future] = {}
+        self.overload_error = overload_error
+        self.adaptive_limit = adaptive_limit
+        self.set_middlewares(middlewares or [])
+        self.metrics = metrics
+        self.profiler = profiler
+        self._owned_executors: Dict[str, Executor] = {}
+        self._method_plans = {}
 
-    async def get_response_for_request(self, request: JSONRPC20Request) -> Optional[JSONRPC20Response]:
-        """Get response for an individual request."""
-        output = None
-        response_id = request.id if not request.is_notification else None
+        self.check_executor(default_executor)
+        for policy in getattr(dispatcher, "executors", {}).values():
+            self.check_executor(policy)
+
+    def set_middlewares(self, middlewares: List[Middleware]) -> None:
+        """Install middlewares, replacing current ones.
+
+        Hooks are collected into flat tuples once, so handling paths without
+        hooks are not affected.
+
+        """
+        self.middlewares = tuple(middlewares)
+        for name in HOOKS:
+            setattr(self, "_{}_hooks".format(name), get_hooks(self.middlewares, name))
+        self._has_request_hooks = bool(self._before_request_hooks or self._after_request_hooks)
+        self._has_call_hooks = bool(self._before_call_hooks or self._after_call_hooks)
+
+    def add_middleware(self, middleware: Middleware) -> None:
+        """Install middleware after the current ones."""
+        self.set_middlewares(self.middlewares + (middleware,))
+
+    def check_executor(self, policy: Union[str, Executor]) -> None:
+        """Check that execution policy could be resolved to executor.
+
+        Raises:
+            ValueError: executor with given name is not registered.
+
+        """
+        if not isinstance(policy, Executor) and policy not in ("inline", "thread", "process") \
+                and policy not in self.executors:
+            raise ValueError("Unknown executor {!r}".format(policy))
+
+    def get_executor(self, policy: Union[str, Executor]) -> Optional[Executor]:
+        """Resolve execution policy to executor, None means inline.
+
+        Thread pool for "thread" and process pool for "process" policies are
+        created on first use unless registered explicitly.
+
+        Raises:
+            ValueError: executor with given name is not registered.
+
+        """
+        if isinstance(policy, Executor):
+            return policy
+
+        if policy == "inline":
+            return None
+
+        if policy in self.executors:
+            return self.executors[policy]
+
+        if policy == "thread":
+            executor = ThreadPoolExecutor(thread_name_prefix="ajsonrpc")
+        elif policy == "process":
+            executor = ProcessPool()
+        else:
+            raise ValueError("Unknown executor {!r}".format(policy))
+
+        self.executors[policy] = self._owned_executors[policy] = executor
+        return executor
+
+    def shutdown(self, wait: bool = True) -> None:
+        """Shutdown executors created by manager."""
+        for name, executor in self._owned_executors.items():
+            executor.shutdown(wait=wait)
+            del self.executors[name]
+        self._owned_executors.clear()
+        self.clear_method_plans()
+
+    def get_method_plan(self, method_name: str) -> MethodPlan:
+        """Get cached dispatch plan for a method.
+
+        Plan is built on the first call and rebuilt once dispatcher maps the
+        name to a different callable, execution policy, timeout or cache
+        setting, so
+        dispatcher modifications are picked up without explicit invalidation.
+
+        Raises:
+            KeyError: method is not registered in dispatcher.
+            ValueError: method execution policy refers to unknown executor,
+                or method of process pool is not importable by name.
+
+        """
+        method = self.dispatcher[method_name]
+        executors = getattr(self.dispatcher, "executors", None)
+        policy = executors.get(method_name, self.default_executor) \
+            if executors else self.default_executor
+        timeouts = getattr(self.dispatcher, "timeouts", None)
+        timeout = timeouts.get(method_name) if timeouts else None
+        caches = getattr(self.dispatcher, "caches", None)
+        cache = caches.get(method_name) if caches else None
+        plan = self._method_plans.get(method_name)
+        if plan is None or plan.method is not method or plan.executor_policy is not policy \
+                or plan.timeout != timeout or plan.cache != cache:
+            plan = MethodPlan(
+                method, name=method_name, executor_policy=policy,
+                executor=self.get_executor(policy), timeout=timeout, cache=cache)
+            if isinstance(plan.executor, ProcessPool):
+                plan.reference = get_method_reference(method)
+            self._method_plans[method_name] = plan
+        return plan
+
+    def clear_method_plans(self) -> None:
+        """Drop all cached dispatch plans."""
+        self._method_plans.clear()
+
+    async def invoke_method(self, plan: MethodPlan, args: list, kwargs: dict):
+        """Call method according to its execution policy and get result."""
+        if self._has_call_hooks:
+            return await self.invoke_method_with_hooks(plan, args, kwargs)
+
+        return await self.invoke_planned_method(plan, args, kwargs)
+
+    async def invoke_method_with_hooks(self, plan: MethodPlan, args: list, kwargs: dict):
+        """Call method surrounded by middleware call hooks."""
+        for hook in self._before_call_hooks:
+            await hook(plan.name, args, kwargs)
+
+        result = await self.invoke_planned_method(plan, args, kwargs)
+        for hook in self._after_call_hooks:
+            result = await hook(plan.name, result)
+
+        return result
+
+    async def invoke_planned_method(self, plan: MethodPlan, args: list, kwargs: dict):
+        """Call method according to its execution policy, without hooks."""
+        if plan.is_coroutine:
+            return await plan.method(*args, **kwargs)
+
+        if plan.executor is None:
+            return plan.method(*args, **kwargs)
+
+        if isinstance(plan.executor, ProcessPool):
+            # Workers import method by reference, it is not pickled
+            return await plan.executor.run_method(plan.reference, args, kwargs)
+
+        return await asyncio.get_event_loop().run_in_executor(
+            plan.executor, functools.partial(plan.method, *args, **kwargs))
+
+    async def call_method(self, plan: MethodPlan, args: list, kwargs: dict, response_id=None) -> JSONRPC20Response:
+        """Call method and wrap its result or exception into a response."""
+        try:
+            result = await self.invoke_method(plan, args, kwargs)
+        except JSONRPC20DispatchException as dispatch_error:
+            # Dispatcher method raised exception with controlled "data"
+            return JSONRPC20Response._from_trusted_body({
+                "jsonrpc": "2.0",
+                "id": response_id,
+                "error": dispatch_error.error.body,
+            })
+        except Exception as e:
+            if not self.is_params_prevalidated and plan.is_invalid_params(args, kwargs):
+                # Method's parameters are incorrect
+                return make_error_response(JSONRPC20InvalidParams, response_id)
+
+            # Dispatcher method raised exception
+            return make_error_response(JSONRPC20ServerError, response_id, data=self.get_error_data(e))
+
+        return make_result_response(result, response_id)
+
+    def get_error_data(self, e: Exception) -> Optional[dict]:
+        """Get exception details for error data, None unless verbose."""
+        if not self.is_server_error_verbose:
+            return None
+
+        return {
+            "type": e.__class__.__name__,
+            "args": e.args,
+            "message": str(e),
+        }
+
+    def get_call_timeout(self, plan: MethodPlan, kwargs: dict) -> Tuple[Optional[float], dict]:
+        """Get effective call timeout and kwargs without timeout param.
+
+        Raises:
+            ValueError: timeout param value is not a number.
+
+        """
+        timeout = plan.timeout if plan.timeout is not None else self.timeout
+        if self.timeout_param is not None and self.timeout_param in kwargs:
+            kwargs = dict(kwargs)  # do not modify request params
+            param_timeout = kwargs.pop(self.timeout_param)
+            if not isinstance(param_timeout, Real) or isinstance(param_timeout, bool):
+                raise ValueError("Timeout has to be a number")
+            timeout = param_timeout if timeout is None else min(timeout, param_timeout)
+
+        deadline = request_deadline.get()
+        if deadline is not None:
+            remaining = deadline - asyncio.get_event_loop().time()
+            timeout = remaining if timeout is None else min(timeout, remaining)
+
+        return timeout, kwargs
+
+    def get_call_rejection(self, plan: MethodPlan, args: list, kwargs: dict, timeout: Optional[float]):
+        """Get error class if call should not be started, None otherwise."""
+        if timeout is not None and timeout <= 0:
+            # Nobody waits for the response anymore, do not start the call
+            return JSONRPC20RequestTimeout
+
+        if self.is_params_prevalidated and not plan.is_bindable(args, kwargs):
+            # Reject the call without running any method code
+            return JSONRPC20InvalidParams
+
+        limit = self.get_in_flight_limit()
+        if limit is not None and self.in_flight >= limit:
+            return self.overload_error
+
+    def get_in_flight_limit(self) -> Optional[int]:
+        """Get current limit of concurrent calls, None if unlimited."""
+        if self.adaptive_limit is None:
+            return self.max_in_flight
+        if self.max_in_flight is None:
+            return self.adaptive_limit.limit
+        return min(self.max_in_flight, self.adaptive_limit.limit)
+
+    def update_in_flight_limit(self, started: float, in_flight: int, is_dropped: bool = False) -> None:
+        """Feed call latency to adaptive limit, if any."""
+        if self.adaptive_limit is not None:
+            latency = asyncio.get_event_loop().time() - started
+            self.adaptive_limit.update(latency, in_flight, is_dropped=is_dropped)
+
+    async def execute_request(self, request: JSONRPC20Request, response_id=None) -> JSONRPC20Response:
+        """Execute request and get its response."""
         try:
-            method = self.dispatcher[request.method]
+            plan = self.get_method_plan(request.method)
         except KeyError:
             # method not found
-            output = JSONRPC20Response(
-                error=JSONRPC20MethodNotFound(),
-                id=response_id
-            )
-        else:
-            try:
-                result = await method(*request.args, **request.kwargs) \
-                    if inspect.iscoroutinefunction(method) \
-                    else method(*request.args, **request.kwargs)
-            except JSONRPC20DispatchException as dispatch_error:
-                # Dispatcher method raised exception with controlled "data"
-                output = JSONRPC20Response(
-                    error=dispatch_error.error,
-                    id=response_id
-                )
-            except Exception as e:
-                if is_invalid_params(method, *request.args, **request.kwargs):
-                    # Method's parameters are incorrect
-                    output = JSONRPC20Response(
-                        error=JSONRPC20InvalidParams(),
-                        id=response_id
-                    )
+            return make_error_response(JSONRPC20MethodNotFound, response_id)
+        except ValueError as e:
+            # Method is registered with unknown executor or not importable
+            logger.error("Method %r could not be planned: %s", request.method, e)
+            return make_error_response(JSONRPC20InternalError, response_id, data=self.get_error_data(e))
+
+        args = request.args
+        try:
+            timeout, kwargs = self.get_call_timeout(plan, request.kwargs)
+        except ValueError:
+            return make_error_response(JSONRPC20InvalidParams, response_id)
+
+        cache_key = None
+        if plan.cache is not None:
+            cache_key = self.cache.make_key(plan.name, args, kwargs)
+            if cache_key is not None:
+                try:
+                    result = self.cache.get(cache_key)
+                except KeyError:
+                    pass
                 else:
-                    # Dispatcher method raised exception
-                    output = JSONRPC20Response(
-                        error=JSONRPC20ServerError(
-                            data={
-                                "type": e.__class__.__name__,
-                                "args": e.args,
-                                "message": str(e),
-                            } if self.is_server_error_verbose else None
-                        ),
-                        id=response_id
-                    )
+                    if isinstance(result, RawJSON) and (self._after_request_hooks or not is_response_encoded.get()):
+                        # Response object is exposed, results are encoded
+                        # only for payloads
+                        result = result.decode()
+                    return make_result_response(result, response_id)
+
+        if self.is_call_coalesced:
+            call_key = cache_key if cache_key is not None else self.cache.make_key(plan.name, args, kwargs)
+            if call_key is not None:
+                return await self.execute_coalesced_call(
+                    call_key, plan, args, kwargs, response_id, timeout, cache_key)
+
+        rejection = self.get_call_rejection(plan, args, kwargs, timeout)
+        if rejection is not None:
+            return make_error_response(rejection, response_id)
+
+        return await self.execute_call(plan, args, kwargs, response_id, timeout, cache_key)
+
+    async def execute_call(self, plan: MethodPlan, args: list, kwargs: dict, response_id=None,
+                           timeout: Optional[float] = None, cache_key: Optional[str] = None) -> JSONRPC20Response:
+        """Call method within timeout and cache its result if needed."""
+        self.in_flight += 1
+        in_flight, started = self.in_flight, asyncio.get_event_loop().time()
+        try:
+            if timeout is None:
+                response = await self.call_method(plan, args, kwargs, response_id)
+            else:
+                response = await asyncio.wait_for(
+                    self.call_method(plan, args, kwargs, response_id), timeout)
+        except asyncio.TimeoutError:
+            self.update_in_flight_limit(started, in_flight, is_dropped=True)
+            return make_error_response(JSONRPC20RequestTimeout, response_id)
+        finally:
+            self.in_flight -= 1
+
+        self.update_in_flight_limit(started, in_flight)
+
+        if cache_key is not None and "result" in response.body:
+            self.cache_result(plan, cache_key, response.body["result"])
+
+        return response
+
+    async def execute_coalesced_call(self, call_key: str, plan: MethodPlan, args: list, kwargs: dict,
+                                     response_id=None, timeout: Optional[float] = None,
+                                     cache_key: Optional[str] = None) -> JSONRPC20Response:
+        """Join identical in-flight call or start a shared one.
+
+        Shared call runs in its own task with timeout of the caller that
+        started it, so it is not cancelled with that caller. Every caller
+        waits for it within own timeout and gets response with own id.
+
+        """
+        call = self._coalesced_calls.get(call_key)
+        if call is None:
+            rejection = self.get_call_rejection(plan, args, kwargs, timeout)
+            if rejection is not None:
+                return make_error_response(rejection, response_id)
+
+            call = self._coalesced_calls[call_key] = asyncio.ensure_future(
+                self.execute_call(plan, args, kwargs, None, timeout, cache_key))
+            call.add_done_callback(lambda _: self._coalesced_calls.pop(call_key, None))
+
+        try:
+            if timeout is None:
+                response = await asyncio.shield(call)
+            else:
+                response = await asyncio.wait_for(asyncio.shield(call), timeout)
+        except asyncio.TimeoutError:
+            return make_error_response(JSONRPC20RequestTimeout, response_id)
+
+        return JSONRPC20Response._from_trusted_body(dict(response.body, id=response_id))
+
+    def cache_result(self, plan: MethodPlan, key: str, result) -> None:
+        """Store method result, encoded if manager codec is JSON."""
+        if self.codec is not None and self.codec.is_json and not isinstance(result, RawJSON):
+            try:
+                result = RawJSON(self.codec.encode(result))
+            except (TypeError, ValueError):
+                # Not serializable, response would fail anyway
+                return
+
+        self.cache.set(key, result, ttl=None if plan.cache is True else plan.cache)
+
+    async def execute_notification(self, request: JSONRPC20Request) -> None:
+        """Execute notification.
+
+        Server must not reply to notifications, so neither response nor error
+        objects are created: failed checks and exceptions are dropped.
+
+        """
+        try:
+            plan = self.get_method_plan(request.method)
+        except KeyError:
+            return
+        except ValueError as e:
+            # Method is registered with unknown executor or not importable
+            logger.error("Method %r could not be planned: %s", request.method, e)
+            return
+
+        try:
+            timeout, kwargs = self.get_call_timeout(plan, request.kwargs)
+        except ValueError:
+            return
+
+        args = request.args
+        if self.get_call_rejection(plan, args, kwargs, timeout) is not None:
+            return
+
+        self.in_flight += 1
+        in_flight, started = self.in_flight, asyncio.get_event_loop().time()
+        # Error is not sent, but recorded to metrics as for requests
+        error_code = None
+        try:
+            if timeout is None:
+                await self.invoke_method(plan, args, kwargs)
             else:
-                output = JSONRPC20Response(result=result, id=response_id)
+                await asyncio.wait_for(self.invoke_method(plan, args, kwargs), timeout)
+        except asyncio.TimeoutError:
+            error_code = JSONRPC20RequestTimeout.CODE
+        except Exception:
+            # Notifications are not confirmable by definition
+            error_code = JSONRPC20ServerError.CODE
+        finally:
+            self.in_flight -= 1
+
+        self.update_in_flight_limit(started, in_flight, is_dropped=error_code == JSONRPC20RequestTimeout.CODE)
+        if self.metrics is not None:
+            self.metrics.observe_call(plan.name, asyncio.get_event_loop().time() - started, error_code)
+
+    async def get_response_for_request(self, request: JSONRPC20Request) -> Optional[JSONRPC20Response]:
+        """Get response for an individual request."""
+        if not self._has_request_hooks:
+            return await self.process_request(request)
 
+        try:
+            for hook in self._before_request_hooks:
+                await hook(request)
+        except JSONRPC20DispatchException as dispatch_error:
+            # Middleware rejected request
+            response = None if request.is_notification else JSONRPC20Response._from_trusted_body({
+                "jsonrpc": "2.0",
+                "id": request.id,
+                "error": dispatch_error.error.body,
+            })
+        else:
+            response = await self.process_request(request)
+
+        for hook in self._after_request_hooks:
+            response = await hook(request, response)
+
+        return response
+
+    async def process_request(self, request: JSONRPC20Request) -> Optional[JSONRPC20Response]:
+        """Execute request or notification, without request hooks."""
         if not request.is_notification:
-            return output
+            if self.metrics is None:
+                return await self.execute_request(request, request.id)
+
+            started = time.perf_counter()
+            response = await self.execute_request(request, request.id)
+            self.observe_response(request, response, time.perf_counter() - started)
+            return response
+
+        if self.is_notification_detached:
+            task = asyncio.ensure_future(self.execute_notification(request))
+            self.notification_tasks.add(task)
+            task.add_done_callback(self.notification_tasks.discard)
+        else:
+            await self.execute_notification(request)
+
+    def observe_response(self, request: JSONRPC20Request, response: JSONRPC20Response, latency: float) -> None:
+        """Record request outcome to metrics."""
+        error = response.body.get("error")
+        if error is None:
+            self.metrics.observe_call(request.method, latency)
+        elif error["code"] == JSONRPC20MethodNotFound.CODE:
+            self.metrics.observe_call(UNKNOWN_METHOD, latency, error["code"])
+        else:
+            self.metrics.observe_call(request.method, latency, error["code"])
+
+    async def wait_notifications(self) -> None:
+        """Wait for detached notifications to complete, e.g. on shutdown."""
+        while self.notification_tasks:
+            await asyncio.wait(list(self.notification_tasks))
 
     async def get_response_for_request_body(self, request_body) -> Optional[JSONRPC20Response]:
         """Catch parse error as well"""
+        profile = current_profile.get() if self.profiler is not None else None
+        if profile is not None:
+            return await self.get_profiled_response_for_request_body(request_body, profile)
+
         try:
             request = JSONRPC20Request.from_body(request_body)
         except ValueError:
-            return JSONRPC20Response(error=JSONRPC20InvalidRequest())
+            return make_error_response(JSONRPC20InvalidRequest)
         else:
             return await self.get_response_for_request(request)
 
-    async def get_response_for_payload(self, payload: str) -> Optional[Union[JSONRPC20Response, JSONRPC20BatchResponse]]:
+    async def get_profiled_response_for_request_body(self, request_body, profile) -> Optional[JSONRPC20Response]:
+        """Get response for request body recording validate and execute phases."""
+        started = time.perf_counter()
+        try:
+            request = JSONRPC20Request.from_body(request_body)
+        except ValueError:
+            return make_error_response(JSONRPC20InvalidRequest)
+        finally:
+            validated = time.perf_counter()
+            profile.add_phase("validate", validated - started)
+
+        response = await self.get_response_for_request(request)
+        profile.add_call(request.method, request.params, time.perf_counter() - validated)
+        return response
+
+    async def gather_responses(self, request_bodies: List) -> List[Optional[JSONRPC20Response]]:
+        """Get responses for batch request bodies, in the same order.
+
+        At most max_batch_concurrency requests are executed at a time: fixed
+        number of workers takes bodies one by one, so coroutines are not
+        created for the whole batch upfront.
+
+        """
+        limit = self.max_batch_concurrency
+        if limit is None or limit >= len(request_bodies):
+            return await gather_or_cancel([
+                asyncio.ensure_future(self.get_response_for_request_body(request_body))
+                for request_body in request_bodies
+            ])
+
+        responses = [None] * len(request_bodies)
+        # iterator is shared between workers
+        indexed_bodies = iter(enumerate(request_bodies))
+
+        async def worker():
+            for index, request_body in indexed_bodies:
+                responses[index] = await self.get_response_for_request_body(request_body)
+
+        await gather_or_cancel([asyncio.ensure_future(worker()) for _ in range(limit)])
+        return responses
+
+    async def iter_responses(self, request_bodies: List) -> AsyncIterator[Optional[JSONRPC20Response]]:
+        """Get responses for batch request bodies in order of completion.
+
+        Respects max_batch_concurrency, pending requests are cancelled if the
+        consumer stops iteration.
+
+        """
+        limit = self.max_batch_concurrency
+        if limit is None or limit >= len(request_bodies):
+            tasks = [
+                asyncio.ensure_future(self.get_response_for_request_body(request_body))
+                for request_body in request_bodies
+            ]
+            try:
+                for future in asyncio.as_completed(tasks):
+                    yield await future
+            finally:
+                for task in tasks:
+                    task.cancel()
+            return
+
+        queue = asyncio.Queue()
+        # iterator is shared between workers
+        bodies = iter(request_bodies)
+
+        async def worker():
+            try:
+                for request_body in bodies:
+                    queue.put_nowait(await self.get_response_for_request_body(request_body))
+            except Exception as e:
+                # Pass failure to the consumer, it would wait forever otherwise
+                queue.put_nowait(e)
+
+        workers = [asyncio.ensure_future(worker()) for _ in range(limit)]
+        try:
+            for _ in range(len(request_bodies)):
+                response = await queue.get()
+                if isinstance(response, Exception):
+                    raise response
+                yield response
+        finally:
+            for task in workers:
+                task.cancel()
+
+    async def get_response_for_payload(self, payload: Union[str, bytes], codec: Optional[Codec] = None
+                                       ) -> Optional[Union[JSONRPC20Response, JSONRPC20BatchResponse]]:
         """Top level handler
 
         NOTE: top level handler, accepts string payload.
 
+        Args:
+            payload: serialized request.
+            codec: codec to decode payload with, e.g. negotiated by request
+                Content-Type. Manager deserialize is used by default.
+
         """
+        for hook in self._before_payload_hooks:
+            payload = await hook(payload)
+
+        deserialize = codec.decode if codec is not None else self.deserialize
+        profile = current_profile.get() if self.profiler is not None else None
+        started = time.perf_counter() if profile is not None else None
         try:
-            request_data = self.deserialize(payload)
+            request_data = deserialize(payload)
         except (TypeError, ValueError):
-            return JSONRPC20Response(error=JSONRPC20ParseError())
+            return make_error_response(JSONRPC20ParseError)
+        finally:
+            if profile is not None:
+                profile.add_phase("parse", time.perf_counter() - started)
 
-        # check if iterable, and determine what request to instantiate.
-        is_batch_request = isinstance(request_data, Iterable) \
+        return await self.get_response_for_request_data(request_data)
+
+    @staticmethod
+    def is_batch_request_data(request_data) -> bool:
+        """Check whether deserialized payload is a batch request."""
+        return isinstance(request_data, Iterable) \
             and not isinstance(request_data, Mapping)
-        if is_batch_request and len(request_data) == 0:
-            return JSONRPC20Response(error=JSONRPC20InvalidRequest())
-
-        requests_bodies = request_data if is_batch_request else [request_data]
-        responses = await asyncio.gather(*[
-            self.get_response_for_request_body(request_body)
-            for request_body in requests_bodies
-        ])
+
+    async def get_response_for_request_data(self, request_data
+                                            ) -> Optional[Union[JSONRPC20Response, JSONRPC20BatchResponse]]:
+        """Get (batch) response for a deserialized payload."""
+        # check if iterable, and determine what request to instantiate.
+        if type(request_data) is dict or not self.is_batch_request_data(request_data):
+            # Single request: await it directly, without batch machinery
+            return await self.get_response_for_request_body(request_data)
+
+        if len(request_data) == 0:
+            return make_error_response(JSONRPC20InvalidRequest)
+
+        if self.metrics is not None:
+            self.metrics.observe_batch(len(request_data))
+
+        if self.max_batch_size is not None and len(request_data) > self.max_batch_size:
+            return make_error_response(JSONRPC20BatchTooLarge)
+
+        responses = await self.gather_responses(request_data)
         nonempty_responses = [r for r in responses if r is not None]
-        if is_batch_request:
-            if len(nonempty_responses) > 0:
-                return JSONRPC20BatchResponse(nonempty_responses)
-        elif len(nonempty_responses) > 0:
-            return nonempty_responses[0]
+        if len(nonempty_responses) > 0:
+            return JSONRPC20BatchResponse(nonempty_responses)
+
+    async def get_response_for_stream(self, stream: Union[bytes, Iterable[bytes], AsyncIterable[bytes]]
+                                      ) -> Optional[Union[JSONRPC20Response, JSONRPC20BatchResponse]]:
+        """Top level handler for JSON payload received in chunks.
+
+        Payload is parsed incrementally: each element of a batch request is
+        dispatched as soon as it is parsed, so parsing of the rest of the
+        payload overlaps with execution and the list of request bodies is
+        never built. Payload has to be JSON, manager codec is not used.
+
+        With max_batch_concurrency set, elements are passed to that number
+        of workers through a bounded queue: parsing waits for a free worker,
+        so at most max_batch_concurrency parsed elements are pending. Batch
+        size is checked for every element before it is dispatched.
+
+        NOTE: invalid JSON is detected only when parser reaches it, requests
+        dispatched by then are cancelled if still pending, but might have
+        been executed already. Response is a parse error as usual.
 
-    async def get_payload_for_payload(self, payload: str) -> str:
-        response = await self.get_response_for_payload(payload)
+        Like :meth:`get_response_for_payload`, it returns a response object,
+        so payload metrics, profiler and after_payload hooks do not apply.
+        before_payload hooks need the whole payload, manager with them
+        installed refuses streams, so they are never bypassed.
 
+        Args:
+            stream: payload as bytes, iterable or async iterable of bytes,
+                e.g. request body stream provided by backend.
+
+        Raises:
+            RuntimeError: manager has before_payload hooks installed.
+
+        """
+        if self._before_payload_hooks:
+            raise RuntimeError("Streams could not be passed through before_payload hooks")
+
+        parser = IncrementalJSONParser()
+        limit = self.max_batch_concurrency
+        queue = asyncio.Queue(limit) if limit is not None else None
+        # Per element tasks without concurrency limit, workers otherwise
+        tasks = []
+        responses = []
+        failures = []
+
+        async def worker():
+            # Keep taking elements after a failure, so parsing is not blocked
+            while True:
+                item = await queue.get()
+                if item is None:
+                    return
+                index, request_body = item
+                if failures:
+                    continue
+                try:
+                    responses[index] = await self.get_response_for_request_body(request_body)
+                except Exception as e:
+                    failures.append(e)
+
+        async def iter_request_bodies():
+            async for chunk in iter_chunks(stream):
+                for request_body in parser.iter_feed(chunk):
+                    yield request_body
+            for request_body in parser.iter_feed(b"", eof=True):
+                yield request_body
+
+        request_bodies = iter_request_bodies()
+        request_data = None
+        try:
+            while True:
+                try:
+                    request_body = await request_bodies.__anext__()
+                except StopAsyncIteration:
+                    break
+                except ValueError:
+                    return make_error_response(JSONRPC20ParseError)
+
+                if not parser.is_batch:
+                    request_data = request_body
+                    continue
+
+                if self.max_batch_size is not None and parser.count > self.max_batch_size:
+                    return make_error_response(JSONRPC20BatchTooLarge)
+
+                if queue is None:
+                    tasks.append(asyncio.ensure_future(self.get_response_for_request_body(request_body)))
+                    continue
+
+                if not tasks:
+                    tasks.extend(asyncio.ensure_future(worker()) for _ in range(limit))
+                responses.append(None)
+                await queue.put((len(responses) - 1, request_body))
+                if failures:
+                    raise failures[0]
+
+            if not parser.is_batch:
+                return await self.get_response_for_request_data(request_data)
+
+            if parser.count == 0:
+                return make_error_response(JSONRPC20InvalidRequest)
+
+            if self.metrics is not None:
+                self.metrics.observe_batch(parser.count)
+
+            if queue is None:
+                responses = await gather_or_cancel(tasks)
+            else:
+                for _ in tasks:
+                    await queue.put(None)
+                await asyncio.gather(*tasks)
+                if failures:
+                    raise failures[0]
+        finally:
+            for task in tasks:
+                task.cancel()
+            await request_bodies.aclose()
+
+        nonempty_responses = [r for r in responses if r is not None]
+        if len(nonempty_responses) > 0:
+            return JSONRPC20BatchResponse(nonempty_responses)
+
+    async def get_payload_for_stream(self, stream: Union[bytes, Iterable[bytes], AsyncIterable[bytes]],
+                                     codec: Optional[Codec] = None) -> Union[str, bytes]:
+        """Get serialized response for a serialized request received in chunks.
+
+        JSON payload is parsed and executed while it is being received, see
+        :meth:`get_response_for_stream`. Payload of non-JSON codec, or with
+        payload hooks or profiler installed, is collected and handled by
+        :meth:`get_payload_for_payload`, so none of them is bypassed.
+
+        Args:
+            stream: payload as bytes, iterable or async iterable of bytes.
+            codec: codec of payload, manager codec by default.
+
+        """
+        codec = codec if codec is not None else self.codec
+        if codec is None or not codec.is_json or self._before_payload_hooks \
+                or self._after_payload_hooks or self.profiler is not None:
+            payload = b"".join([chunk async for chunk in iter_chunks(stream)])
+            return await self.get_payload_for_payload(payload, codec=codec)
+
+        token = is_response_encoded.set(True)
+        try:
+            if self.metrics is None:
+                return self.encode_response(await self.get_response_for_stream(stream), codec)
+
+            request_size = 0
+
+            async def iter_counted_chunks():
+                nonlocal request_size
+                async for chunk in iter_chunks(stream):
+                    request_size += len(chunk)
+                    yield chunk
+
+            response_payload = self.encode_response(await self.get_response_for_stream(iter_counted_chunks()), codec)
+        finally:
+            is_response_encoded.reset(token)
+        self.metrics.observe_payloads(request_size, len(response_payload) or None)
+        return response_payload
+
+    async def get_payload_for_payload(self, payload: Union[str, bytes], codec: Optional[Codec] = None
+                                      ) -> Union[str, bytes]:
+        """Get serialized response for a serialized request.
+
+        Returns bytes if codec is given or manager is configured with one,
+        otherwise whatever serialize returns (str for json.dumps). Empty
+        payload means there is nothing to send back, e.g. for notifications.
+
+        """
+        codec = codec if codec is not None else self.codec
+        profile = self.profiler.start(len(payload)) if self.profiler is not None else None
+        encoded_token = is_response_encoded.set(True)
+        try:
+            if profile is None:
+                response = await self.get_response_for_payload(payload, codec=codec)
+                response_payload = self.encode_response(response, codec)
+            else:
+                token = current_profile.set(profile)
+                try:
+                    response = await self.get_response_for_payload(payload, codec=codec)
+                    started = time.perf_counter()
+                    response_payload = self.encode_response(response, codec)
+                    profile.add_phase("serialize", time.perf_counter() - started)
+                finally:
+                    current_profile.reset(token)
+                    self.profiler.finish(profile)
+        finally:
+            is_response_encoded.reset(encoded_token)
+
+        for hook in self._after_payload_hooks:
+            response_payload = await hook(payload, response_payload)
+
+        if self.metrics is not None:
+            self.metrics.observe_payloads(len(payload), len(response_payload) or None)
+
+        return response_payload
+
+    def encode_response(self, response: Optional[Union[JSONRPC20Response, JSONRPC20BatchResponse]],
+                        codec: Optional[Codec] = None) -> Union[str, bytes]:
+        """Serialize (batch) response, empty payload for no response."""
         if response is None:
-            return ""
+            return b"" if codec is not None else ""
+
+        if codec is not None:
+            return codec.encode_body(response.body)
+
+        body = response.body
+        if has_raw_json(body):
+            body = decode_raw_json(body)
+
+        return self.serialize(body)
+
+    async def iter_payload_for_payload(self, payload: Union[str, bytes], codec: Optional[Codec] = None
+                                       ) -> AsyncIterator[bytes]:
+        """Get serialized response for a serialized request as chunks.
+
+        Batch responses are streamed: every response is encoded and yielded
+        as soon as its request completes, so order of responses in the batch
+        might differ from order of requests (JSON-RPC 2.0 allows it). Opening
+        bracket is sent with the first response, so nothing is yielded for a
+        batch of notifications. Single requests yield one chunk.
+
+        Pending requests are cancelled if the consumer stops iteration, e.g.
+        after the client disconnects.
+
+        """
+        codec = codec if codec is not None else self.codec
+        if codec is None:
+            codec = FunctionCodec(self.serialize, self.deserialize)
+
+        for hook in self._before_payload_hooks:
+            payload = await hook(payload)
+
+        if self.metrics is not None:
+            # Response size is recorded only once it is sent completely
+            self.metrics.request_size.observe(len(payload))
+
+        try:
+            request_data = codec.decode(payload)
+        except (TypeError, ValueError):
+            chunk = codec.encode_body(make_error_response(JSONRPC20ParseError).body)
+            if self.metrics is not None:
+                self.metrics.response_size.observe(len(chunk))
+            yield chunk
+            return
+
+        if type(request_data) is dict or not self.is_batch_request_data(request_data) \
+                or len(request_data) == 0 or (self.max_batch_size is not None and len(request_data) > self.max_batch_size):
+            token = is_response_encoded.set(True)
+            try:
+                response = await self.get_response_for_request_data(request_data)
+            finally:
+                is_response_encoded.reset(token)
+            if response is not None:
+                chunk = codec.encode_body(response.body)
+                if self.metrics is not None:
+                    self.metrics.response_size.observe(len(chunk))
+                yield chunk
+            return
+
+        if self.metrics is not None:
+            self.metrics.observe_batch(len(request_data))
+
+        separator = b"["
+        response_size = 0
+        async for response in self.iter_responses(request_data):
+            if response is not None:
+                chunk = separator + codec.encode_body(response.body)
+                response_size += len(chunk)
+                yield chunk
+                separator = b","
 
-        return self.serialize(response.body)
+        if separator == b",":
+            yield b"]"
+            if self.metrics is not None:
+                self.metrics.response_size.observe(response_size + 1)
@@ -0,0 +1,186 @@
+"""Built-in manager instrumentation.
+
+Manager configured with :class:`Metrics` records per-method call counts,
+error counts by JSON-RPC code and latency, batch sizes and payload sizes.
+Recording is plain integer arithmetic on preallocated bucket lists: manager
+runs on a single event loop thread, so no locks are needed. Metrics are
+exported in Prometheus text exposition format:
+
+>>> metrics = Metrics()
+>>> manager = AsyncJSONRPCResponseManager(dispatcher, metrics=metrics)
+>>> print(metrics.render())
+
+"""
+from bisect import bisect_left
+from typing import Dict, Iterator, Optional, Sequence, Tuple
+
+CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+LATENCY_BUCKETS = (
+    0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10,
+)
+BATCH_SIZE_BUCKETS = (1, 2, 5, 10, 20, 50, 100, 200, 500, 1000)
+PAYLOAD_SIZE_BUCKETS = (
+    64, 256, 1024, 4096, 16384, 65536, 262144, 1048576, 4194304, 16777216,
+)
+
+# Label of calls to methods that are not registered, keeps label set bounded
+UNKNOWN_METHOD = "<unknown>"
+
+
+class Histogram:
+
+    """Histogram with fixed buckets.
+
+    Args:
+        buckets: sorted upper bounds of buckets, +Inf bucket is implicit.
+
+    Attributes:
+        counts (list): number of observations per bucket, not cumulative.
+        sum (float): sum of observed values.
+        count (int): number of observations.
+
+    """
+
+    __slots__ = ("buckets", "counts", "sum", "count")
+
+    def __init__(self, buckets: Sequence[float]):
+        self.buckets = tuple(buckets)
+        self.counts = [0] * (len(self.buckets) + 1)
+        self.sum = 0
+        self.count = 0
+
+    def observe(self, value: float) -> None:
+        # Value equal to a bound belongs to its bucket ("le")
+        self.counts[bisect_left(self.buckets, value)] += 1
+        self.sum += value
+        self.count += 1
+
+    def iter_cumulative(self) -> Iterator[Tuple[str, int]]:
+        """Iterate over (upper bound, cumulative count) pairs."""
+        total = 0
+        for bound, count in zip(self.buckets + ("+Inf",), self.counts):
+            total += count
+            yield format_value(bound), total
+
+
+class MethodMetrics:
+
+    """Metrics of a single method."""
+
+    __slots__ = ("calls", "errors", "latency")
+
+    def __init__(self, latency_buckets: Sequence[float]):
+        self.calls = 0
+        self.errors: Dict[int, int] = {}
+        self.latency = Histogram(latency_buckets)
+
+
+def format_value(value) -> str:
+    if isinstance(value, str):
+        return value
+    if isinstance(value, float) and value.is_integer():
+        value = int(value)
+    return repr(value)
+
+
+def escape_label(value: str) -> str:
+    return value.replace("\\", "\\\\").replace("\"", "\\\"").replace("\n", "\\n")
+
+
+class Metrics:
+
+    """Manager metrics registry.
+
+    Args:
+        prefix (str): metric name prefix.
+        latency_buckets: upper bounds of call latency buckets, seconds.
+        batch_size_buckets: upper bounds of batch size buckets.
+        payload_size_buckets: upper bounds of payload size buckets, bytes.
+
+    Attributes:
+        methods (dict): method name to :class:`MethodMetrics`.
+
+    """
+
+    def __init__(self, prefix: str = "jsonrpc",
+                 latency_buckets: Sequence[float] = LATENCY_BUCKETS,
+                 batch_size_buckets: Sequence[float] = BATCH_SIZE_BUCKETS,
+                 payload_size_buckets: Sequence[float] = PAYLOAD_SIZE_BUCKETS):
+        self.prefix = prefix
+        self.latency_buckets = tuple(latency_buckets)
+        self.methods: Dict[str, MethodMetrics] = {}
+        self.batch_size = Histogram(batch_size_buckets)
+        self.request_size = Histogram(payload_size_buckets)
+        self.response_size = Histogram(payload_size_buckets)
+
+    def observe_call(self, method_name: str, latency: float, error_code: Optional[int] = None) -> None:
+        """Record completed call, error code is None for successful ones."""
+        metrics = self.methods.get(method_name)
+        if metrics is None:
+            metrics = self.methods[method_name] = MethodMetrics(self.latency_buckets)
+
+        metrics.calls += 1
+        metrics.latency.observe(latency)
+        if error_code is not None:
+            metrics.errors[error_code] = metrics.errors.get(error_code, 0) + 1
+
+    def observe_batch(self, size: int) -> None:
+        self.batch_size.observe(size)
+
+    def observe_payloads(self, request_size: int, response_size: Optional[int] = None) -> None:
+        """Record payload sizes in bytes, response size is None if not sent."""
+        self.request_size.observe(request_size)
+        if response_size is not None:
+            self.response_size.observe(response_size)
+
+    def _render_histogram(self, lines: list, name: str, histogram: Histogram, labels: str = "") -> None:
+        separator = "," if labels else ""
+        for bound, count in histogram.iter_cumulative():
+            lines.append('{}_bucket{{{}{}le="{}"}} {}'.format(name, labels, separator, bound, count))
+        suffix = "{{{}}}".format(labels) if labels else ""
+        lines.append("{}_sum{} {}".format(name, suffix, format_value(histogram.sum)))
+        lines.append("{}_count{} {}".format(name, suffix, histogram.count))
+
+    def render(self) -> str:
+        """Get metrics in Prometheus text exposition format."""
+        prefix = self.prefix
+        methods = sorted(
+            ('method="{}"'.format(escape_label(name)), metrics)
+            for name, metrics in self.methods.items()
+        )
+        lines = [
+            "# HELP {}_calls_total Number of method calls.".format(prefix),
+            "# TYPE {}_calls_total counter".format(prefix),
+        ]
+        for labels, metrics in methods:
+            lines.append("{}_calls_total{{{}}} {}".format(prefix, labels, metrics.calls))
+
+        lines += [
+            "# HELP {}_errors_total Number of method calls with error, by error code.".format(prefix),
+            "# TYPE {}_errors_total counter".format(prefix),
+        ]
+        for labels, metrics in methods:
+            for code, count in sorted(metrics.errors.items()):
+                lines.append('{}_errors_total{{{},code="{}"}} {}'.format(prefix, labels, code, count))
+
+        name = "{}_call_duration_seconds".format(prefix)
+        lines += [
+            "# HELP {} Method call latency.".format(name),
+            "# TYPE {} histogram".format(name),
+        ]
+        for labels, metrics in methods:
+            self._render_histogram(lines, name, metrics.latency, labels)
+
+        for suffix, histogram, description in (
+                ("batch_size", self.batch_size, "Number of requests in batch."),
+                ("request_size_bytes", self.request_size, "Request payload size."),
+                ("response_size_bytes", self.response_size, "Response payload size.")):
+            name = "{}_{}".format(prefix, suffix)
+            lines += [
+                "# HELP {} {}".format(name, description),
+                "# TYPE {} histogram".format(name),
+            ]
+            self._render_histogram(lines, name, histogram)
+
+        return "\n".join(lines) + "\n"
@@ -0,0 +1,94 @@
+"""Middleware: cross-cutting behavior around dispatch.
+
+Middleware hooks into three levels of request handling:
+
+* payload: serialized request and response, e.g. decryption, size checks.
+* request: parsed request and its response, e.g. authorization, logging.
+* method call: method name, arguments and result, e.g. metrics.
+
+Subclass :class:`Middleware` and override hooks of interest only, manager
+collects overridden hooks once when middleware is added, so levels without
+hooks cost nothing. "before" hooks run in order of installation, "after"
+hooks in reverse order.
+
+Payload hooks see complete payloads: after_payload is not applied to
+streamed responses, and
+:meth:`~ajsonrpc.manager.AsyncJSONRPCResponseManager.get_response_for_stream`,
+which parses request payload as it arrives, refuses to run while
+before_payload hooks are installed, so they are never bypassed.
+
+>>> class Auth(Middleware):
+...     async def before_request(self, request):
+...         if request.method.startswith("admin."):
+...             raise JSONRPC20DispatchException(code=4001, message="Forbidden")
+...
+>>> manager = AsyncJSONRPCResponseManager(dispatcher, middlewares=[Auth()])
+
+"""
+from typing import Any, Optional, Union
+
+from .core import JSONRPC20Request, JSONRPC20Response
+
+HOOKS = (
+    "before_payload", "after_payload",
+    "before_request", "after_request",
+    "before_call", "after_call",
+)
+
+
+class Middleware:
+
+    """Base middleware, all hooks are no-op."""
+
+    async def before_payload(self, payload: Union[str, bytes]) -> Union[str, bytes]:
+        """Get request payload to process, called before it is decoded.
+
+        Manager with this hook installed refuses request streams, see
+        :meth:`~ajsonrpc.manager.AsyncJSONRPCResponseManager.get_response_for_stream`.
+
+        """
+        return payload
+
+    async def after_payload(self, payload: Union[str, bytes], response_payload: Union[str, bytes]
+                            ) -> Union[str, bytes]:
+        """Get response payload to send, empty one means nothing to send.
+
+        Called by :meth:`~AsyncJSONRPCResponseManager.get_payload_for_payload`,
+        streamed responses are not passed through it.
+
+        """
+        return response_payload
+
+    async def before_request(self, request: JSONRPC20Request) -> None:
+        """Called before request is executed.
+
+        Raise :class:`~ajsonrpc.core.JSONRPC20DispatchException` to reject
+        request with given error, the method is not called.
+
+        """
+
+    async def after_request(self, request: JSONRPC20Request, response: Optional[JSONRPC20Response]
+                            ) -> Optional[JSONRPC20Response]:
+        """Get response to send, None for notifications."""
+        return response
+
+    async def before_call(self, method_name: str, args: list, kwargs: dict) -> None:
+        """Called right before method call.
+
+        Exceptions are handled as raised by the method.
+
+        """
+
+    async def after_call(self, method_name: str, result: Any) -> Any:
+        """Get method result, called only if method succeeded."""
+        return result
+
+
+def get_hooks(middlewares, name: str) -> tuple:
+    """Get bound hooks overridden by middlewares, in order of execution."""
+    default = getattr(Middleware, name)
+    hooks = tuple(
+        getattr(middleware, name) for middleware in middlewares
+        if getattr(type(middleware), name, default) is not default
+    )
+    return hooks if name.startswith("before") else hooks[::-1]
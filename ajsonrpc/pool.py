@@ -0,0 +1,124 @@
+"""Process pool for CPU-bound methods.
+
+Threads do not help CPU-bound methods because of the GIL, such methods could
+be registered with "process" execution policy and run in a process pool.
+
+Neither dispatcher nor methods are sent to workers: each call sends
+(module, qualname) reference of the method with its arguments, and workers
+import the method by that name. Methods are looked up when called, so methods
+added to dispatcher after workers started work with any start method. Such
+methods have to be importable: module level functions, static and class
+methods, but not lambdas, nested functions or methods of instances.
+
+"""
+import asyncio
+import concurrent.futures
+import importlib
+import os
+import sys
+import threading
+from typing import Any, Callable, Dict, Optional, Tuple
+
+MethodReference = Tuple[str, str]
+
+# Methods resolved in a worker process
+_methods: Dict[MethodReference, Callable] = {}
+
+
+def _get_pid() -> int:
+    return os.getpid()
+
+
+def _get_attribute(module, qualname: str):
+    value = module
+    for name in qualname.split("."):
+        value = getattr(value, name)
+    return value
+
+
+def get_method_reference(method: Callable) -> MethodReference:
+    """Get (module, qualname) reference a method is imported by in workers.
+
+    Raises:
+        ValueError: method could not be imported by its name.
+
+    """
+    module = getattr(method, "__module__", None)
+    qualname = getattr(method, "__qualname__", None)
+    try:
+        is_importable = _get_attribute(sys.modules[module], qualname) == method
+    except (KeyError, TypeError, AttributeError):
+        is_importable = False
+    if not is_importable:
+        raise ValueError("Method {!r} is not importable by name and could not run in a process pool".format(method))
+    return module, qualname
+
+
+def call_method(reference: MethodReference, args: list, kwargs: dict) -> Any:
+    """Call method by its reference, executed in a worker process."""
+    method = _methods.get(reference)
+    if method is None:
+        module, qualname = reference
+        method = _methods[reference] = _get_attribute(importlib.import_module(module), qualname)
+    return method(*args, **kwargs)
+
+
+class ProcessPool(concurrent.futures.Executor):
+
+    """Managed process pool that calls importable methods by reference.
+
+    Args:
+        max_workers (int, optional): number of worker processes, number of
+            CPUs by default.
+        max_calls (int, optional): recycle workers after this number of calls
+            of the pool: new pool is started and the old one is shut down once
+            its pending calls complete. Useful for methods that leak memory.
+        mp_context (optional): multiprocessing context.
+
+    """
+
+    def __init__(self, max_workers: Optional[int] = None,
+                 max_calls: Optional[int] = None, mp_context=None):
+        self.max_workers = max_workers or os.cpu_count() or 1
+        self.max_calls = max_calls
+        self.mp_context = mp_context
+        self.calls = 0
+        self._lock = threading.Lock()
+        self._executor = self._create_executor()
+
+    def _create_executor(self) -> concurrent.futures.ProcessPoolExecutor:
+        return concurrent.futures.ProcessPoolExecutor(
+            max_workers=self.max_workers,
+            mp_context=self.mp_context,
+        )
+
+    def _get_executor(self) -> concurrent.futures.ProcessPoolExecutor:
+        with self._lock:
+            self.calls += 1
+            if self.max_calls is not None and self.calls > self.max_calls:
+                retired, self._executor = self._executor, self._create_executor()
+                self.calls = 1
+                retired.shutdown(wait=False)
+            return self._executor
+
+    def submit(self, fn, *args, **kwargs) -> concurrent.futures.Future:
+        return self._get_executor().submit(fn, *args, **kwargs)
+
+    def submit_method(self, reference: MethodReference, args: list, kwargs: dict) -> concurrent.futures.Future:
+        """Schedule call of a method by its reference, see :func:`get_method_reference`."""
+        return self.submit(call_method, reference, args, kwargs)
+
+    async def run_method(self, reference: MethodReference, args: list, kwargs: dict) -> Any:
+        """Call method by its reference and wait for the result."""
+        return await asyncio.wrap_future(self.submit_method(reference, args, kwargs))
+
+    def warm_up(self) -> None:
+        """Start all worker processes now rather than on first calls."""
+        futures = [
+            self._executor.submit(_get_pid)
+            for _ in range(self.max_workers)
+        ]
+        concurrent.futures.wait(futures)
+
+    def shutdown(self, wait: bool = True, **kwargs) -> None:
+        self._executor.shutdown(wait=wait, **kwargs)
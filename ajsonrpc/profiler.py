@@ -0,0 +1,177 @@
+"""Sampling profiler of request handling phases.
+
+For a sample of payloads handled by
+:meth:`~ajsonrpc.manager.AsyncJSONRPCResponseManager.get_payload_for_payload`
+manager records time spent in each phase:
+
+* parse: payload deserialization.
+* validate: request body validation.
+* execute: method call, including queueing and middleware.
+* serialize: response serialization.
+
+Batch elements are handled concurrently, so their validate and execute
+times are summed up and might exceed payload time.
+
+Profiled payloads slower than threshold are logged with method names, params
+sizes and phase breakdown; aggregated stats are available on demand, e.g.
+:meth:`Profiler.format_stats` on a signal.
+
+"""
+import contextvars
+import json
+import logging
+import random
+import time
+from typing import Dict, List, Optional, Tuple
+
+PHASES = ("parse", "validate", "execute", "serialize")
+
+# Profile of payload handled in the current context, None if not sampled
+current_profile: contextvars.ContextVar = contextvars.ContextVar("current_profile", default=None)
+
+
+class Profile:
+
+    """Phase timings of a single payload.
+
+    Attributes:
+        payload_size (int): size of request payload.
+        phases (dict): phase name to time in seconds.
+        calls (list): (method name, params size, execution time) of requests.
+
+    """
+
+    __slots__ = ("payload_size", "started", "duration", "phases", "calls")
+
+    def __init__(self, payload_size: int):
+        self.payload_size = payload_size
+        self.started = time.perf_counter()
+        self.duration = None
+        self.phases: Dict[str, float] = dict.fromkeys(PHASES, 0.0)
+        self.calls: List[Tuple[str, int, float]] = []
+
+    def add_phase(self, phase: str, duration: float) -> None:
+        self.phases[phase] += duration
+
+    def add_call(self, method_name: str, params, duration: float) -> None:
+        self.add_phase("execute", duration)
+        if params is None:
+            params_size = 0
+        else:
+            try:
+                params_size = len(json.dumps(params, separators=(",", ":"), default=str))
+            except (TypeError, ValueError):
+                params_size = -1
+        self.calls.append((method_name, params_size, duration))
+
+
+class PhaseStats:
+
+    """Aggregated timings: count, total and maximum in seconds."""
+
+    __slots__ = ("count", "total", "max")
+
+    def __init__(self):
+        self.count = 0
+        self.total = 0.0
+        self.max = 0.0
+
+    def add(self, duration: float) -> None:
+        self.count += 1
+        self.total += duration
+        if duration > self.max:
+            self.max = duration
+
+    def as_dict(self) -> Dict[str, float]:
+        return {
+            "count": self.count,
+            "total": self.total,
+            "mean": self.total / self.count if self.count else 0.0,
+            "max": self.max,
+        }
+
+
+class Profiler:
+
+    """Phase profiler for a sample of payloads.
+
+    Args:
+        sample_rate (float): fraction of payloads to profile, from 0 to 1.
+        slow_threshold (float, optional): log profiled payloads handled
+            longer than this number of seconds.
+        logger (logging.Logger, optional): logger for slow payloads.
+
+    """
+
+    def __init__(self, sample_rate: float = 0.01, slow_threshold: Optional[float] = None,
+                 logger: Optional[logging.Logger] = None):
+        if not 0 <= sample_rate <= 1:
+            raise ValueError("sample_rate has to be between 0 and 1")
+
+        self.sample_rate = sample_rate
+        self.slow_threshold = slow_threshold
+        self.logger = logger if logger is not None else logging.getLogger(__name__)
+        self.reset()
+
+    def reset(self) -> None:
+        """Drop aggregated stats."""
+        self.payloads = PhaseStats()
+        self.phases: Dict[str, PhaseStats] = {phase: PhaseStats() for phase in PHASES}
+        self.methods: Dict[str, PhaseStats] = {}
+        self.slow_payloads = 0
+
+    def start(self, payload_size: int) -> Optional[Profile]:
+        """Get profile for a new payload, None if it is not sampled."""
+        if self.sample_rate < 1 and random.random() >= self.sample_rate:
+            return None
+        return Profile(payload_size)
+
+    def finish(self, profile: Profile) -> None:
+        """Aggregate completed profile and log it if slow."""
+        profile.duration = time.perf_counter() - profile.started
+        self.payloads.add(profile.duration)
+        for phase, duration in profile.phases.items():
+            self.phases[phase].add(duration)
+        for method_name, _, duration in profile.calls:
+            stats = self.methods.get(method_name)
+            if stats is None:
+                stats = self.methods[method_name] = PhaseStats()
+            stats.add(duration)
+
+        if self.slow_threshold is not None and profile.duration > self.slow_threshold:
+            self.slow_payloads += 1
+            self.logger.warning(
+                "Slow payload: %.6fs, %d bytes, calls: %s, phases: %s",
+                profile.duration, profile.payload_size,
+                ", ".join(
+                    "{}(params {} bytes) {:.6f}s".format(*call)
+                    for call in profile.calls
+                ) or "none",
+                ", ".join(
+                    "{} {:.6f}s".format(phase, duration)
+                    for phase, duration in profile.phases.items()
+                ),
+            )
+
+    def get_stats(self) -> dict:
+        """Get aggregated stats of profiled payloads."""
+        return {
+            "payloads": self.payloads.as_dict(),
+            "slow_payloads": self.slow_payloads,
+            "phases": {phase: stats.as_dict() for phase, stats in self.phases.items()},
+            "methods": {name: stats.as_dict() for name, stats in self.methods.items()},
+        }
+
+    def format_stats(self) -> str:
+        """Get aggregated stats as a human readable table."""
+        lines = ["{:<32} {:>10} {:>12} {:>12} {:>12}".format("phase/method", "count", "total, s", "mean, s", "max, s")]
+        rows = [("payload", self.payloads)]
+        rows += sorted(self.phases.items(), key=lambda item: PHASES.index(item[0]))
+        rows += sorted(
+            (("method " + name, stats) for name, stats in self.methods.items()),
+            key=lambda item: -item[1].total)
+        for name, stats in rows:
+            stats = stats.as_dict()
+            lines.append("{:<32} {:>10} {:>12.6f} {:>12.6f} {:>12.6f}".format(
+                name, stats["count"], stats["total"], stats["mean"], stats["max"]))
+        return "\n".join(lines)
@@ -1,13 +1,29 @@
 import argparse
 import asyncio
+import collections
 import json
 import logging
 import importlib.util
+import os
+import re
+import signal
+import socket
 import sys
+import time
 from inspect import getmembers, isfunction
+
+try:
+    import uvloop
+except ImportError:  # pragma: no cover
+    uvloop = None
+
 from ajsonrpc import __version__
+from ajsonrpc.codec import get_available_codecs, get_json_codec, get_mime_type
 from ajsonrpc.dispatcher import Dispatcher
 from ajsonrpc.manager import AsyncJSONRPCResponseManager
+from ajsonrpc.metrics import CONTENT_TYPE as METRICS_CONTENT_TYPE, Metrics
+from ajsonrpc.profiler import Profiler
+from ajsonrpc.transport import FRAMINGS, JSONRPCStreamProtocol, set_tcp_nodelay
 
 
 logger = logging.getLogger(__name__)
@@ -19,35 +35,653 @@ if sys.version_info >= (3, 7):
 else:
     create_task = asyncio.ensure_future
 
+# Seconds to keep connection without requests open
+DEFAULT_IDLE_TIMEOUT = 5
+# Stop reading from connection with this number of responses pending
+DEFAULT_MAX_PIPELINED = 100
+DEFAULT_MAX_HEADER_SIZE = 64 * 1024
+DEFAULT_MAX_BODY_SIZE = 16 * 1024 * 1024
+# Bodies of this size and chunked ones are handled while being received
+DEFAULT_STREAM_BODY_SIZE = 64 * 1024
+MAX_CHUNK_LINE_SIZE = 1024
+# Chunk size is 1*HEXDIG, without sign, prefix or underscores int() accepts
+CHUNK_SIZE = re.compile(rb"[0-9A-Fa-f]+")
+DEFAULT_BACKLOG = 100
+# Seconds to wait before restarting a worker that failed right after start
+WORKER_RESTART_DELAY = 1
+
+
+class HTTPError(Exception):
+
+    """Request could not be parsed, status is HTTP status line reason."""
+
+    def __init__(self, status):
+        super().__init__(status)
+        self.status = status
+
+
+HTTPRequest = collections.namedtuple("HTTPRequest", "method path version headers body")
+
+
+class HTTPBodyStream:
+
+    """Request body being received, async iterable of bytes chunks.
+
+    Parser feeds it as data arrives, iteration waits for the next chunk and
+    raises the error body is aborted with.
+
+    """
+
+    def __init__(self):
+        self._chunks = collections.deque()
+        self._is_eof = False
+        self._error = None
+        self._waiter = None
+
+    def feed(self, data):
+        self._chunks.append(data)
+        self._wakeup()
+
+    def feed_eof(self):
+        self._is_eof = True
+        self._wakeup()
+
+    def abort(self, error):
+        self._error = error
+        self._wakeup()
+
+    def _wakeup(self):
+        if self._waiter is not None and not self._waiter.done():
+            self._waiter.set_result(None)
+
+    async def __aiter__(self):
+        while True:
+            if self._error is not None:
+                raise self._error
+            if self._chunks:
+                yield self._chunks.popleft()
+            elif self._is_eof:
+                return
+            else:
+                self._waiter = asyncio.get_event_loop().create_future()
+                await self._waiter
+                self._waiter = None
+
+
+class HTTPRequestParser:
+
+    """Incremental HTTP/1.x request parser.
+
+    Data is buffered until request is complete: body is framed by
+    Content-Length or chunked transfer encoding, so requests could arrive in
+    any number of reads, several pipelined requests could arrive in one.
+    Body is returned as bytes, header names are lowercase bytes.
+
+    With stream_body_size set, request with body of at least this size or
+    chunked one is returned as soon as its head is parsed, with
+    :class:`HTTPBodyStream` body fed as data arrives. Stream of request
+    being received is available as body_stream.
+
+    Args:
+        max_header_size (int): maximum size of request line and headers.
+        max_body_size (int): maximum size of (decoded) body.
+        on_continue (callable, optional): called when client expects
+            "100 Continue" before sending the body.
+        stream_body_size (int, optional): minimum size of streamed bodies.
+
+    Raises:
+        HTTPError: from :meth:`feed` if request is malformed or too large.
+
+    """
+
+    def __init__(self, max_header_size=DEFAULT_MAX_HEADER_SIZE, max_body_size=DEFAULT_MAX_BODY_SIZE,
+                 on_continue=None, stream_body_size=None):
+        self.max_header_size = max_header_size
+        self.max_body_size = max_body_size
+        self.on_continue = on_continue
+        self.stream_body_size = stream_body_size
+        self._buffer = bytearray()
+        self._search_start = 0
+        self._reset()
+
+    def _reset(self):
+        # (method, path, version, headers) of request with parsed head
+        self._head = None
+        self._content_length = 0
+        self._is_chunked = False
+        self._chunk_size = None
+        self._body = bytearray()
+        self._received = 0
+        self.body_stream = None
+
+    def feed(self, data):
+        """Feed received data, get list of completed (or streamed) requests."""
+        self._buffer += data
+        requests = []
+        while True:
+            if self._head is None:
+                if not self._parse_head():
+                    return requests
+                if self.body_stream is not None:
+                    requests.append(self._make_request(self.body_stream))
+
+            body = self._parse_body()
+            if body is None:
+                return requests
+
+            if self.body_stream is not None:
+                self.body_stream.feed_eof()
+            else:
+                requests.append(self._make_request(body))
+            self._reset()
+
+    def _parse_head(self):
+        end = self._buffer.find(b'\r\n\r\n', self._search_start)
+        if end < 0:
+            if len(self._buffer) > self.max_header_size:
+                raise HTTPError("431 Request Header Fields Too Large")
+            # Separator might be split between reads
+            self._search_start = max(0, len(self._buffer) - 3)
+            return False
+        if end > self.max_header_size:
+            raise HTTPError("431 Request Header Fields Too Large")
+
+        request_line, *header_lines = bytes(self._buffer[:end]).split(b'\r\n')
+        del self._buffer[:end + 4]
+        self._search_start = 0
+
+        request_line = request_line.split(b' ')
+        if len(request_line) != 3 or not request_line[2].startswith(b'HTTP/1.'):
+            raise HTTPError("400 Bad Request")
+
+        fields = collections.defaultdict(list)
+        for line in header_lines:
+            name, separator, value = line.partition(b':')
+            if not separator or not name or name != name.strip():
+                raise HTTPError("400 Bad Request")
+            fields[name.lower()].append(value.strip())
+
+        # Repeated Content-Length might be request smuggling unless the
+        # values are the same
+        content_lengths = set(fields.pop(b'content-length', ()))
+        if len(content_lengths) > 1:
+            raise HTTPError("400 Bad Request")
+        content_length = content_lengths.pop() if content_lengths else None
+        # Repeated fields are combined into a comma separated list
+        headers = {name: b', '.join(values) for name, values in fields.items()}
+        if content_length is not None:
+            headers[b'content-length'] = content_length
+
+        transfer_encoding = headers.get(b'transfer-encoding')
+        if transfer_encoding is not None:
+            if content_length is not None:
+                # Ambiguous framing, might be request smuggling
+                raise HTTPError("400 Bad Request")
+            if transfer_encoding.lower() != b'chunked':
+                raise HTTPError("501 Not Implemented")
+            self._is_chunked = True
+        elif content_length is not None:
+            if not content_length.isdigit():
+                raise HTTPError("400 Bad Request")
+            self._content_length = int(content_length)
+            if self._content_length > self.max_body_size:
+                raise HTTPError("413 Payload Too Large")
+
+        self._head = (request_line[0], request_line[1], request_line[2], headers)
+        if self.on_continue is not None and headers.get(b'expect', b'').lower() == b'100-continue' \
+                and (self._is_chunked or len(self._buffer) < self._content_length):
+            self.on_continue()
+
+        if self.stream_body_size is not None \
+                and (self._is_chunked or self._content_length >= self.stream_body_size):
+            self.body_stream = HTTPBodyStream()
+
+        return True
+
+    def _parse_body(self):
+        """Get complete body, None if it is incomplete.
+
+        Received part of streamed body is fed to stream, complete one is
+        returned empty.
+
+        """
+        if self._is_chunked:
+            return self._parse_chunks()
+
+        if self.body_stream is not None:
+            size = min(len(self._buffer), self._content_length - self._received)
+            if size:
+                self.body_stream.feed(bytes(self._buffer[:size]))
+                del self._buffer[:size]
+                self._received += size
+            return b'' if self._received == self._content_length else None
+
+        if len(self._buffer) < self._content_length:
+            return None
+
+        with memoryview(self._buffer) as view:
+            body = bytes(view[:self._content_length])
+        del self._buffer[:self._content_length]
+        return body
+
+    def _parse_chunks(self):
+        while True:
+            if self._chunk_size is None:
+                line_end = self._buffer.find(b'\r\n')
+                if line_end < 0:
+                    if len(self._buffer) > MAX_CHUNK_LINE_SIZE:
+                        raise HTTPError("400 Bad Request")
+                    return None
+                # Chunk extensions after ";" are ignored
+                chunk_size = bytes(self._buffer[:line_end]).split(b';', 1)[0].rstrip(b' \t')
+                if CHUNK_SIZE.fullmatch(chunk_size) is None:
+                    raise HTTPError("400 Bad Request")
+                self._chunk_size = int(chunk_size, 16)
+                del self._buffer[:line_end + 2]
+                if self._received + self._chunk_size > self.max_body_size:
+                    raise HTTPError("413 Payload Too Large")
+
+            if self._chunk_size == 0:
+                # Last chunk, skip trailer fields up to the empty line
+                line_end = self._buffer.find(b'\r\n')
+                if line_end < 0:
+                    if len(self._buffer) > self.max_header_size:
+                        raise HTTPError("431 Request Header Fields Too Large")
+                    return None
+                del self._buffer[:line_end + 2]
+                if line_end == 0:
+                    return bytes(self._body)
+                continue
+
+            if len(self._buffer) < self._chunk_size + 2:
+                return None
+            if self._buffer[self._chunk_size:self._chunk_size + 2] != b'\r\n':
+                raise HTTPError("400 Bad Request")
+            if self.body_stream is not None:
+                self.body_stream.feed(bytes(self._buffer[:self._chunk_size]))
+            else:
+                with memoryview(self._buffer) as view:
+                    self._body += view[:self._chunk_size]
+            self._received += self._chunk_size
+            del self._buffer[:self._chunk_size + 2]
+            self._chunk_size = None
+
+    def _make_request(self, body):
+        method, path, version, headers = self._head
+        return HTTPRequest(method, path, version, headers, body)
+
 
 class JSONRPCProtocol(asyncio.Protocol):
-    def __init__(self, json_rpc_manager):
+
+    """HTTP/1.1 JSON-RPC server protocol.
+
+    Connections are persistent unless client asks to close them (HTTP/1.0
+    clients have to ask to keep them alive). Pipelined requests are handled
+    concurrently, responses are sent in order of requests. Connection
+    without pending requests is closed after idle_timeout seconds.
+
+    Payload codec is selected by request Content-Type from codecs, manager
+    codec is used if it is not set or unknown. Bodies of at least
+    stream_body_size bytes and chunked ones are parsed and executed while
+    being received, see
+    :meth:`~ajsonrpc.manager.AsyncJSONRPCResponseManager.get_payload_for_stream`.
+
+    """
+
+    def __init__(self, json_rpc_manager, metrics_path=None, idle_timeout=DEFAULT_IDLE_TIMEOUT,
+                 max_pipelined=DEFAULT_MAX_PIPELINED, codecs=None,
+                 max_header_size=DEFAULT_MAX_HEADER_SIZE, max_body_size=DEFAULT_MAX_BODY_SIZE,
+                 is_tcp_nodelay=True, stream_body_size=DEFAULT_STREAM_BODY_SIZE):
         self.json_rpc_manager = json_rpc_manager
+        self.metrics_path = metrics_path.encode("utf-8") if metrics_path else None
+        self.idle_timeout = idle_timeout
+        self.max_pipelined = max_pipelined
+        self.is_tcp_nodelay = is_tcp_nodelay
+        self.codecs = codecs if codecs is not None else get_available_codecs()
+        self.parser = HTTPRequestParser(
+            max_header_size=max_header_size, max_body_size=max_body_size,
+            on_continue=self.write_continue, stream_body_size=stream_body_size)
+        self.transport = None
+        # Body stream of the last handled request
+        self._body_stream = None
+        # (future of response body, content type, Connection header, status)
+        # in request order, Connection is None for default HTTP/1.1
+        # persistence, status is None for regular responses
+        self._pending = collections.deque()
+        self._is_closing = False
+        self._is_reading_paused = False
+        self._idle_handle = None
 
     def connection_made(self, transport):
         self.transport = transport
+        set_tcp_nodelay(transport, self.is_tcp_nodelay)
+        self._reset_idle_timer()
+
+    def connection_lost(self, exc):
+        self._is_closing = True
+        self._cancel_idle_timer()
+        for future, *_ in self._pending:
+            future.cancel()
+        self._pending.clear()
 
     def data_received(self, data):
-        message = data.decode()
-        request_method, request_message = message.split('\r\n', 1)
-        if not request_method.startswith('POST'):
+        if self._is_closing and self.parser.body_stream is None:
+            return
+
+        self._cancel_idle_timer()
+        error = None
+        try:
+            requests = self.parser.feed(data)
+        except HTTPError as e:
+            requests, error = [], e
+
+        for request in requests:
+            if self._is_closing:
+                break
+            self.handle_request(request)
+
+        if error is not None:
+            logger.warning('Malformed request: {}'.format(error.status))
+            stream = self.parser.body_stream
+            if stream is not None and stream is self._body_stream:
+                # Response of the request being received reports the error
+                stream.abort(error)
+            elif not self._is_closing:
+                self.add_response(None, "text/plain", "close", status=error.status)
+            self._is_closing = True
+
+        if not self._pending:
+            self._reset_idle_timer()
+
+    def handle_request(self, request):
+        method, path, version, headers, body = request
+        connection = headers.get(b'connection', b'').lower()
+        if version == b'HTTP/1.0':
+            connection = "keep-alive" if connection == b'keep-alive' else "close"
+        else:
+            connection = "close" if connection == b'close' else None
+        if connection == "close":
+            # Requests after the one closing connection are ignored
+            self._is_closing = True
+
+        if self.metrics_path is not None and self.json_rpc_manager.metrics is not None \
+                and method == b'GET' and path == self.metrics_path:
+            self.add_response(
+                self.json_rpc_manager.metrics.render().encode("utf-8"),
+                METRICS_CONTENT_TYPE, connection)
+            return
+
+        if method != b'POST':
             logger.warning('Incorrect HTTP method, should be POST')
 
-        _, payload = request_message.split('\r\n\r\n', 1)
-        task = create_task(self.json_rpc_manager.get_payload_for_payload(payload))
-        task.add_done_callback(self.handle_task_result)
-    
-    def handle_task_result(self, task):
-        res = task.result()
-        self.transport.write((
-            "HTTP/1.1 200 OK\r\n"
-            "Content-Type: application/json\r\n"
-            "\r\n"
-            +  str(res)
-        ).encode("utf-8"))
+        content_type = headers.get(b'content-type', b'').decode("latin-1")
+        codec = self.codecs.get(get_mime_type(content_type), self.json_rpc_manager.codec)
+
+        if isinstance(body, HTTPBodyStream):
+            self._body_stream = body
+            future = create_task(self.json_rpc_manager.get_payload_for_stream(body, codec=codec))
+        else:
+            future = create_task(self.json_rpc_manager.get_payload_for_payload(body, codec=codec))
+        self.add_response(future, codec.content_type, connection)
+
+    def add_response(self, future, content_type, connection, status=None):
+        """Queue response body future, body is empty if future is None.
+
+        Connection is closed after the response if connection is "close".
+
+        """
+        if future is None or isinstance(future, bytes):
+            body, future = future or b'', asyncio.get_event_loop().create_future()
+            future.set_result(body)
+
+        self._pending.append((future, content_type, connection, status))
+        future.add_done_callback(self.write_responses)
+
+        if len(self._pending) >= self.max_pipelined and not self._is_reading_paused:
+            self._is_reading_paused = True
+            self.transport.pause_reading()
+
+    def write_responses(self, _=None):
+        """Write completed responses, preserving order of requests."""
+        while self._pending and self._pending[0][0].done():
+            future, content_type, connection, status = self._pending.popleft()
+            if future.cancelled():
+                return
+
+            if isinstance(future.exception(), HTTPError):
+                # Body of the request turned out to be malformed
+                connection = "close"
+                self.write_response(b'', "text/plain", status=future.exception().status, connection=connection)
+            elif future.exception() is not None:
+                logger.error('Request failed', exc_info=future.exception())
+                self.write_response(b'', content_type, status="500 Internal Server Error", connection=connection)
+            else:
+                self.write_response(future.result(), content_type, status=status, connection=connection)
 
-        logger.info('Close the client socket')
-        self.transport.close()
+            if connection == "close":
+                logger.info('Close the client socket')
+                self.transport.close()
+                return
+
+        if self._is_reading_paused and len(self._pending) < self.max_pipelined:
+            self._is_reading_paused = False
+            self.transport.resume_reading()
+
+        if not self._pending:
+            self._reset_idle_timer()
+
+    def write_continue(self):
+        self.transport.write(b'HTTP/1.1 100 Continue\r\n\r\n')
+
+    def write_response(self, body, content_type, status=None, connection=None):
+        """Write response, Connection header is sent unless it is None."""
+        if status is None:
+            # Nothing to send back for notifications
+            status = "200 OK" if body else "204 No Content"
+        head = "HTTP/1.1 {}\r\nContent-Type: {}\r\n".format(status, content_type)
+        if status != "204 No Content":
+            # 204 response must not have Content-Length
+            head += "Content-Length: {}\r\n".format(len(body))
+        if connection is not None:
+            head += "Connection: {}\r\n".format(connection)
+        self.transport.write((head + "\r\n").encode("utf-8") + body)
+
+    def _reset_idle_timer(self):
+        self._cancel_idle_timer()
+        if self.idle_timeout is not None and not self._is_closing:
+            self._idle_handle = asyncio.get_event_loop().call_later(
+                self.idle_timeout, self._close_idle)
+
+    def _cancel_idle_timer(self):
+        if self._idle_handle is not None:
+            self._idle_handle.cancel()
+            self._idle_handle = None
+
+    def _close_idle(self):
+        self._idle_handle = None
+        if not self._pending:
+            logger.info('Close idle client socket')
+            self.transport.close()
+
+
+def create_event_loop(name="auto"):
+    """Create event loop: "uvloop", "asyncio" or "auto" (uvloop if installed).
+
+    Raises:
+        ValueError: uvloop is requested but not installed.
+
+    """
+    if name == "uvloop" and uvloop is None:
+        raise ValueError("uvloop is not installed")
+    if name == "uvloop" or (name == "auto" and uvloop is not None):
+        return uvloop.new_event_loop()
+    return asyncio.new_event_loop()
+
+
+def get_loop_description(loop):
+    if uvloop is not None and isinstance(loop, uvloop.Loop):
+        return "uvloop {}".format(uvloop.__version__)
+    return "asyncio {}".format(loop.__class__.__name__)
+
+
+def bind_socket(host, port, reuse_port=False, backlog=DEFAULT_BACKLOG):
+    """Create listening TCP socket, used to share it between workers."""
+    family, type_, proto, _, address = socket.getaddrinfo(
+        host, port, type=socket.SOCK_STREAM, flags=socket.AI_PASSIVE)[0]
+    sock = socket.socket(family, type_, proto)
+    sock.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+    if reuse_port:
+        sock.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEPORT, 1)
+    sock.bind(address)
+    sock.listen(backlog)
+    sock.setblocking(False)
+    return sock
+
+
+def run_server(args, dispatcher, sock=None):
+    """Serve requests on the current process until stopped."""
+    json_rpc_manager = AsyncJSONRPCResponseManager(
+        dispatcher=dispatcher, codec=get_json_codec(),
+        metrics=Metrics() if args.metrics_path else None,
+        profiler=Profiler(
+            sample_rate=args.profile_sample_rate,
+            slow_threshold=args.slow_threshold,
+        ) if args.profile_sample_rate else None)
+    loop = create_event_loop(args.loop)
+    asyncio.set_event_loop(loop)
+    # Each client connection will create a new protocol instance
+    if args.transport == "tcp":
+        protocol_factory = lambda: JSONRPCStreamProtocol(
+            json_rpc_manager, framing=args.framing, max_frame_size=args.max_body_size,
+            is_tcp_nodelay=args.is_tcp_nodelay)
+    else:
+        protocol_factory = lambda: JSONRPCProtocol(
+            json_rpc_manager, metrics_path=args.metrics_path,
+            idle_timeout=args.idle_timeout, max_body_size=args.max_body_size,
+            is_tcp_nodelay=args.is_tcp_nodelay)
+    if sock is not None:
+        coro = loop.create_server(protocol_factory, sock=sock)
+    else:
+        coro = loop.create_server(
+            protocol_factory,
+            host=args.host,
+            port=args.port,
+            reuse_port=args.reuse_port or None,
+            backlog=args.backlog,
+        )
+    server = loop.run_until_complete(coro)
+
+    if json_rpc_manager.profiler is not None and hasattr(signal, "SIGUSR1"):
+        loop.add_signal_handler(
+            signal.SIGUSR1,
+            lambda: logger.info('Profiler stats:\n{}'.format(json_rpc_manager.profiler.format_stats())))
+    if hasattr(signal, "SIGTERM"):
+        loop.add_signal_handler(signal.SIGTERM, loop.stop)
+
+    # Serve requests until Ctrl+C is pressed
+    logger.info('Serving {} on {} (pid {}, {})'.format(
+        "HTTP" if args.transport == "http" else "TCP ({} framing)".format(args.framing),
+        server.sockets[0].getsockname(), os.getpid(), get_loop_description(loop)))
+    try:
+        loop.run_forever()
+    except KeyboardInterrupt:
+        pass
+
+    # Close the server
+    server.close()
+    loop.run_until_complete(server.wait_closed())
+    loop.run_until_complete(json_rpc_manager.wait_notifications())
+    json_rpc_manager.shutdown()
+    loop.close()
+
+
+class Supervisor:
+
+    """Run server in a number of forked worker processes.
+
+    Workers either share listening socket bound by supervisor or, with
+    reuse_port, bind their own sockets with SO_REUSEPORT, so the kernel
+    balances connections between them. Crashed workers are restarted,
+    SIGINT and SIGTERM stop all workers. SIGUSR1 is forwarded to workers
+    if profiling is enabled, so they log profiler stats, ignored otherwise.
+
+    """
+
+    def __init__(self, args, dispatcher, workers):
+        self.args = args
+        self.dispatcher = dispatcher
+        self.workers = workers
+        self.sock = None
+        # pid -> start time
+        self.processes = {}
+        self.is_stopping = False
+        self.is_profiled = bool(args.profile_sample_rate)
+
+    def spawn(self):
+        pid = os.fork()
+        if pid == 0:
+            # Worker: drop supervisor signal handlers
+            signal.signal(signal.SIGINT, signal.default_int_handler)
+            signal.signal(signal.SIGTERM, signal.SIG_DFL)
+            # Profiler stats handler replaces it once server is started
+            signal.signal(signal.SIGUSR1, signal.SIG_IGN)
+            code = 0
+            try:
+                run_server(self.args, self.dispatcher, sock=self.sock)
+            except BaseException:
+                logger.exception('Worker failed')
+                code = 1
+            finally:
+                os._exit(code)
+
+        self.processes[pid] = time.monotonic()
+
+    def signal_workers(self, signum):
+        for pid in list(self.processes):
+            try:
+                os.kill(pid, signum)
+            except ProcessLookupError:
+                pass
+
+    def stop(self, signum, frame):
+        if not self.is_stopping:
+            logger.info('Stopping workers')
+        self.is_stopping = True
+        self.signal_workers(signal.SIGTERM)
+
+    def run(self):
+        if not self.args.reuse_port:
+            self.sock = bind_socket(self.args.host, self.args.port, backlog=self.args.backlog)
+
+        signal.signal(signal.SIGINT, self.stop)
+        signal.signal(signal.SIGTERM, self.stop)
+        if self.is_profiled:
+            signal.signal(signal.SIGUSR1, lambda signum, frame: self.signal_workers(signum))
+        else:
+            signal.signal(signal.SIGUSR1, signal.SIG_IGN)
+
+        for _ in range(self.workers):
+            self.spawn()
+
+        while self.processes:
+            try:
+                pid, status = os.wait()
+            except ChildProcessError:
+                break
+
+            started = self.processes.pop(pid, None)
+            if started is None or self.is_stopping:
+                continue
+
+            logger.warning('Worker {} exited with status {}, restarting'.format(pid, status))
+            if time.monotonic() - started < WORKER_RESTART_DELAY:
+                # Do not spin if worker fails on start
+                time.sleep(WORKER_RESTART_DELAY)
+            if not self.is_stopping:
+                self.spawn()
+
+        if self.sock is not None:
+            self.sock.close()
 
 
 def main():
@@ -60,9 +694,57 @@ def main():
         version='%(prog)s {version}'.format(version=__version__))
     parser.add_argument("--host", dest="host", default="127.0.0.1")
     parser.add_argument("--port", dest="port")
+    parser.add_argument(
+        "--transport", dest="transport", choices=["http", "tcp"], default="http",
+        help="tcp serves JSON-RPC directly over TCP without HTTP")
+    parser.add_argument(
+        "--framing", dest="framing", choices=FRAMINGS, default="newline",
+        help="message framing of tcp transport: newline delimited or 4-byte "
+             "big-endian length prefix")
+    parser.add_argument(
+        "--workers", dest="workers", type=int, default=1,
+        help="number of worker processes")
+    parser.add_argument(
+        "--reuse-port", dest="reuse_port", action="store_true",
+        help="bind socket in every worker with SO_REUSEPORT instead of "
+             "sharing one socket")
+    parser.add_argument(
+        "--loop", dest="loop", choices=["auto", "asyncio", "uvloop"],
+        default="auto", help="event loop, auto uses uvloop if installed")
+    parser.add_argument(
+        "--backlog", dest="backlog", type=int, default=DEFAULT_BACKLOG,
+        help="maximum number of queued connections")
+    parser.add_argument(
+        "--no-tcp-nodelay", dest="is_tcp_nodelay", action="store_false",
+        help="do not disable Nagle's algorithm on client connections")
+    parser.add_argument(
+        "--idle-timeout", dest="idle_timeout", type=float,
+        default=DEFAULT_IDLE_TIMEOUT,
+        help="close keep-alive connections idle for this number of seconds")
+    parser.add_argument(
+        "--max-body-size", dest="max_body_size", type=int,
+        default=DEFAULT_MAX_BODY_SIZE,
+        help="reject requests (tcp frames) with larger body, bytes")
+    parser.add_argument(
+        "--metrics-path", dest="metrics_path",
+        help="serve Prometheus metrics on this path, e.g. /metrics; metrics "
+             "are per process, so it is not supported with --workers")
+    parser.add_argument(
+        "--profile-sample-rate", dest="profile_sample_rate", type=float,
+        help="profile phases of this fraction of requests, stats are logged "
+             "on SIGUSR1")
+    parser.add_argument(
+        "--slow-threshold", dest="slow_threshold", type=float,
+        help="log profiled requests slower than this number of seconds")
     parser.add_argument('module')
 
     args = parser.parse_args()
+    if args.loop == "uvloop" and uvloop is None:
+        parser.error("uvloop is not installed")
+    if args.metrics_path and args.workers > 1:
+        # Each worker would serve its own metrics to whichever connection it
+        # accepted, so scrapes would be inconsistent
+        parser.error("--metrics-path is not supported with --workers > 1")
 
     spec = importlib.util.spec_from_file_location("module", args.module)
     module = importlib.util.module_from_spec(spec)
@@ -72,27 +754,12 @@ def main():
     logger.info('Extracted methods: {}'.format(methods))
     dispatcher = Dispatcher(dict(methods))
 
-    json_rpc_manager = AsyncJSONRPCResponseManager(dispatcher=dispatcher)
-    loop = asyncio.get_event_loop()
-    # Each client connection will create a new protocol instance
-    coro = loop.create_server(
-        lambda: JSONRPCProtocol(json_rpc_manager),
-        host=args.host,
-        port=args.port
-    )
-    server = loop.run_until_complete(coro)
-
-    # Serve requests until Ctrl+C is pressed
-    logger.info('Serving on {}'.format(server.sockets[0].getsockname()))
-    try:
-        loop.run_forever()
-    except KeyboardInterrupt:
-        pass
-
-    # Close the server
-    server.close()
-    loop.run_until_complete(server.wait_closed())
-    loop.close()
+    if args.workers > 1:
+        if not hasattr(os, "fork"):
+            parser.error("--workers requires fork support")
+        Supervisor(args, dispatcher, args.workers).run()
+    else:
+        run_server(args, dispatcher)
 
 
 if __name__ == '__main__':
@@ -0,0 +1,75 @@
+import unittest
+
+from ..cache import ResultCache
+from ..codec import RawJSON
+
+
+class TestResultCache(unittest.TestCase):
+    def setUp(self):
+        self.now = 0
+        self.cache = ResultCache(max_size=3, clock=lambda: self.now)
+
+    def test_make_key(self):
+        self.assertEqual(ResultCache.make_key("sum", [1, 2], {}), "sum [1,2]")
+        self.assertEqual(
+            ResultCache.make_key("get", [], {"b": 1, "a": "x"}),
+            ResultCache.make_key("get", [], {"a": "x", "b": 1}),
+        )
+        self.assertEqual(ResultCache.make_key("get", [], {"a": "x"}), 'get {"a":"x"}')
+        self.assertIsNone(ResultCache.make_key("get", [object()], {}))
+
+    def test_get_set(self):
+        with self.assertRaises(KeyError):
+            self.cache.get("a")
+
+        self.cache.set("a", None)
+        self.assertIsNone(self.cache.get("a"))
+        self.assertEqual(self.cache.get_stats(), {
+            "hits": 1, "misses": 1, "evictions": 0, "expirations": 0,
+            "size": 1, "bytes": 0,
+        })
+
+    def test_lru_eviction(self):
+        for key in "abc":
+            self.cache.set(key, key)
+        self.cache.get("a")
+        self.cache.set("d", "d")
+
+        self.assertNotIn("b", self.cache)
+        self.assertEqual(len(self.cache), 3)
+        self.assertEqual(self.cache.evictions, 1)
+
+    def test_max_bytes(self):
+        cache = ResultCache(max_bytes=10)
+        cache.set("a", RawJSON(b"[1,2,3]"))
+        cache.set("b", RawJSON(b"[1]"))
+        self.assertEqual(cache.bytes, 10)
+
+        cache.set("c", RawJSON(b"[2]"))
+        self.assertNotIn("a", cache)
+        self.assertEqual(cache.bytes, 6)
+
+        cache.set("d", RawJSON(b"[1,2,3,4,5]"))
+        self.assertNotIn("d", cache)
+
+    def test_ttl(self):
+        self.cache.ttl = 10
+        self.cache.set("a", 1)
+        self.cache.set("b", 2, ttl=20)
+
+        self.now = 15
+        with self.assertRaises(KeyError):
+            self.cache.get("a")
+        self.assertEqual(self.cache.get("b"), 2)
+        self.assertEqual(self.cache.expirations, 1)
+
+    def test_invalidate(self):
+        self.cache.set("sum [1]", 1)
+        self.cache.set("sum [2]", 2)
+        self.cache.set("summary []", 3)
+
+        self.assertTrue(self.cache.invalidate("sum [1]"))
+        self.assertFalse(self.cache.invalidate("sum [1]"))
+        self.assertEqual(self.cache.invalidate_method("sum"), 1)
+        self.assertEqual(self.cache.invalidate_prefix("sum"), 1)
+        self.assertEqual(len(self.cache), 0)
@@ -0,0 +1,186 @@
+import json
+import unittest
+
+from .. import codec as codec_module
+from ..backend.common import CommonBackend
+from ..codec import (CBORCodec, FunctionCodec, IncrementalJSONParser,
+                     JSONCodec, MsgpackCodec, OrjsonCodec, RawJSON,
+                     get_available_codecs, get_json_codec, get_mime_type)
+from ..manager import AsyncJSONRPCResponseManager
+
+
+class TestCodec(unittest.TestCase):
+    body = {"jsonrpc": "2.0", "method": "sum", "params": [1, 2], "id": "1"}
+
+    def assertRoundTrip(self, codec):
+        payload = codec.encode(self.body)
+        self.assertIsInstance(payload, bytes)
+        self.assertEqual(codec.decode(payload), self.body)
+
+        with self.assertRaises(ValueError):
+            codec.decode(b"\xc1{[")
+
+    def test_json(self):
+        self.assertRoundTrip(JSONCodec())
+        self.assertEqual(JSONCodec().content_type, "application/json")
+        self.assertEqual(JSONCodec().decode('{"a": 1}'), {"a": 1})
+
+    def test_function(self):
+        codec = FunctionCodec(json.dumps, json.loads)
+        self.assertRoundTrip(codec)
+
+    @unittest.skipIf(codec_module.orjson is None, "orjson is not installed")
+    def test_orjson(self):
+        self.assertRoundTrip(OrjsonCodec())
+        self.assertIsInstance(get_json_codec(), OrjsonCodec)
+
+    @unittest.skipIf(codec_module.msgpack is None, "msgpack is not installed")
+    def test_msgpack(self):
+        self.assertRoundTrip(MsgpackCodec())
+        self.assertIn("application/msgpack", get_available_codecs())
+
+    @unittest.skipIf(codec_module.cbor2 is None, "cbor2 is not installed")
+    def test_cbor(self):
+        self.assertRoundTrip(CBORCodec())
+        self.assertIn("application/cbor", get_available_codecs())
+
+    def test_get_available_codecs(self):
+        self.assertIn("application/json", get_available_codecs())
+
+    def test_get_mime_type(self):
+        self.assertEqual(get_mime_type("Application/JSON; charset=utf-8"), "application/json")
+        self.assertEqual(get_mime_type(None), "")
+
+
+class TestIncrementalJSONParser(unittest.TestCase):
+    def parse(self, payload: str, chunk_size: int):
+        parser = IncrementalJSONParser()
+        data = payload.encode("utf-8")
+        values = []
+        for start in range(0, len(data), chunk_size):
+            values.extend(parser.feed(data[start:start + chunk_size]))
+        values.extend(parser.feed(b"", eof=True))
+        return parser, values
+
+    def test_batch(self):
+        payload = '[{"id": 1, "params": ["\u00e9"]}, 12 , "s", [1, 2], "\u00fc"]'
+        for chunk_size in [1, 2, 5, 1000]:
+            parser, values = self.parse(payload, chunk_size)
+            self.assertTrue(parser.is_batch)
+            self.assertEqual(values, json.loads(payload))
+
+    def test_elements_are_returned_early(self):
+        parser = IncrementalJSONParser()
+        self.assertEqual(parser.feed(b'[{"id": 1}, {"id"'), [{"id": 1}])
+        self.assertEqual(parser.feed(b': 2}, 3'), [{"id": 2}])
+        self.assertEqual(parser.feed(b'4]'), [34])
+        self.assertEqual(parser.feed(b'', eof=True), [])
+
+    def test_empty_batch(self):
+        parser, values = self.parse(" [ ] ", 1)
+        self.assertTrue(parser.is_batch)
+        self.assertEqual(values, [])
+
+    def test_single(self):
+        parser, values = self.parse('{"id": [1]}', 3)
+        self.assertFalse(parser.is_batch)
+        self.assertEqual(values, [{"id": [1]}])
+
+    def test_large_element(self):
+        element = {"params": [{"s": 'a\\"]}[{\u00e9', "n": [1.5, -2, None]}] * 1000}
+        payload = json.dumps([element, element])
+        for chunk_size in [1, 7, 4096]:
+            parser, values = self.parse(payload, chunk_size)
+            self.assertEqual(values, [element, element])
+
+        # Escape at the end of chunk
+        parser, values = self.parse('["\\\\", "\\"\\\\"]', 1)
+        self.assertEqual(values, ["\\", '"\\'])
+
+    def test_invalid(self):
+        for payload in ["", "[", "[1,]", "[,1]", "[1 2]", "[1] 2", '[{"a":}]', "{", "[1.]", "[tru]"]:
+            for chunk_size in [1, 100]:
+                with self.assertRaises(ValueError):
+                    self.parse(payload, chunk_size)
+
+    def test_invalid_is_detected_early(self):
+        for chunk in [b'[{"a":}, {"b": ', b'[x', b'[1.x, ', b'[1 2']:
+            parser = IncrementalJSONParser()
+            with self.assertRaises(ValueError):
+                parser.feed(chunk)
+
+
+class TestCodecManager(unittest.IsolatedAsyncioTestCase):
+    async def test_bytes_payload(self):
+        manager = AsyncJSONRPCResponseManager(
+            dispatcher={"sum": lambda *args: sum(args)}, codec=JSONCodec())
+        payload = await manager.get_payload_for_payload(
+            b'{"jsonrpc": "2.0", "method": "sum", "params": [1, 2], "id": 1}')
+        self.assertEqual(json.loads(payload), {"jsonrpc": "2.0", "id": 1, "result": 3})
+
+        payload = await manager.get_payload_for_payload(
+            b'{"jsonrpc": "2.0", "method": "sum", "params": [1, 2]}')
+        self.assertEqual(payload, b"")
+
+        payload = await manager.get_payload_for_payload(b'{"jsonrpc')
+        self.assertEqual(json.loads(payload)["error"]["code"], -32700)
+
+    async def test_codec_override(self):
+        manager = AsyncJSONRPCResponseManager(dispatcher={"one": lambda: 1})
+        payload = await manager.get_payload_for_payload(
+            '{"jsonrpc": "2.0", "method": "one", "id": 1}', codec=JSONCodec())
+        self.assertEqual(payload, b'{"jsonrpc":"2.0","id":1,"result":1}')
+
+
+class TestRawJSON(unittest.IsolatedAsyncioTestCase):
+    def setUp(self):
+        self.manager = AsyncJSONRPCResponseManager(dispatcher={
+            "cached": lambda: RawJSON('{"name": "cached", "tags": [1, 2]}'),
+            "one": lambda: 1,
+        })
+        self.expected = {"name": "cached", "tags": [1, 2]}
+
+    def test_encode_body_splices_payload(self):
+        body = {"jsonrpc": "2.0", "id": 1, "result": RawJSON(b'{"a":1}')}
+        self.assertEqual(
+            JSONCodec().encode_body(body),
+            b'{"jsonrpc":"2.0","id":1,"result":{"a":1}}'
+        )
+        self.assertEqual(
+            FunctionCodec().decode(FunctionCodec().encode_body(body)),
+            {"jsonrpc": "2.0", "id": 1, "result": {"a": 1}}
+        )
+
+    async def test_single(self):
+        for codec in [None, JSONCodec(), get_json_codec()]:
+            payload = await self.manager.get_payload_for_payload(
+                '{"jsonrpc": "2.0", "method": "cached", "id": 1}', codec=codec)
+            self.assertEqual(
+                json.loads(payload),
+                {"jsonrpc": "2.0", "id": 1, "result": self.expected}
+            )
+
+    async def test_batch(self):
+        for codec in [None, JSONCodec()]:
+            payload = await self.manager.get_payload_for_payload(json.dumps([
+                {"jsonrpc": "2.0", "method": "cached", "id": 1},
+                {"jsonrpc": "2.0", "method": "one", "id": 2},
+            ]), codec=codec)
+            self.assertEqual(json.loads(payload), [
+                {"jsonrpc": "2.0", "id": 1, "result": self.expected},
+                {"jsonrpc": "2.0", "id": 2, "result": 1},
+            ])
+
+
+class TestCommonBackend(unittest.TestCase):
+    def test_get_codec(self):
+        backend = CommonBackend()
+        self.assertIs(backend.get_codec("text/plain"), backend.manager.codec)
+        self.assertIs(backend.get_codec(None), backend.manager.codec)
+        self.assertIs(
+            backend.get_codec("application/json; charset=utf-8"),
+            backend.manager.codec)
+
+    def test_legacy_serializers(self):
+        backend = CommonBackend(serialize=json.dumps, deserialize=json.loads)
+        self.assertIsInstance(backend.manager.codec, FunctionCodec)
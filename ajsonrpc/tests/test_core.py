@@ -210,6 +210,30 @@ class TestJSONRPC20Request(unittest.TestCase):
         self.assertEqual(JSONRPC20Request("add", {}, id=0).kwargs, {})
         self.assertEqual(JSONRPC20Request("add", {"a": 1}, id=0).kwargs, {"a": 1})
 
+    def test_request_args_kwargs_follow_params(self):
+        r = JSONRPC20Request("add", [1, 2], id=0)
+        self.assertIs(r.args, r.args)
+        r.params = {"a": 1}
+        self.assertEqual(r.args, [])
+        self.assertEqual(r.kwargs, {"a": 1})
+        del r.params
+        self.assertEqual(r.kwargs, {})
+        r.body = {"jsonrpc": "2.0", "method": "add", "params": [3], "id": 1}
+        self.assertEqual(r.args, [3])
+
+    def test_from_body(self):
+        body = {"jsonrpc": "2.0", "method": "add", "params": [1, 2], "id": 1}
+        r = JSONRPC20Request.from_body(body)
+        self.assertIs(r.body, body)
+        self.assertEqual(r.args, [1, 2])
+        self.assertFalse(r.is_notification)
+
+        with self.assertRaises(ValueError):
+            JSONRPC20Request.from_body({"jsonrpc": "2.0", "method": "add", "extra": 1})
+
+        with self.assertRaises(ValueError):
+            JSONRPC20Request.from_body([])
+
     #############################################
     # body methods tests
     #############################################
@@ -332,6 +356,15 @@ class TestJSONRPC20Error(unittest.TestCase):
             with self.assertRaises(NotImplementedError):
                 error.message = ""
 
+    def test_from_trusted_body(self):
+        body = {"code": -32601, "message": "Method not found"}
+        error = JSONRPC20MethodNotFound._from_trusted_body(body)
+        self.assertIs(error.body, body)
+        self.assertEqual(error, JSONRPC20MethodNotFound())
+
+        with self.assertRaises(NotImplementedError):
+            error.code = 0
+
 
 class TestJSONRPC20Response(unittest.TestCase):
     def test_valid_result(self):
@@ -384,6 +417,17 @@ class TestJSONRPC20Response(unittest.TestCase):
                 error=JSONRPC20Error(code=0, message="")
             )
 
+    def test_from_trusted_body(self):
+        body = {"jsonrpc": "2.0", "id": 1, "result": None}
+        response = JSONRPC20Response._from_trusted_body(body)
+        self.assertIs(response.body, body)
+        self.assertIsNone(response.result)
+        self.assertEqual(response.id, 1)
+
+        # public setters stay strict
+        with self.assertRaises(ValueError):
+            response.body = {"jsonrpc": "2.0", "id": 1}
+
     @unittest.skip("TODO: Implement later")
     def test_set_body_error_correct_error_class(self):
         """Return error class matching pre-defined error codes."""
@@ -38,6 +38,57 @@ class TestDispatcher(unittest.TestCase):
         self.assertIn("two", d)
         self.assertIn("two_alias", d)
 
+    def test_add_function_executor(self):
+        d = Dispatcher()
+
+        @d.add_function(executor="thread")
+        def blocking():
+            return 1
+
+        d.add_function(blocking, name="inline", executor="inline")
+        d.add_function(blocking, name="default")
+        d.add_object(Math(), executor="io")
+
+        self.assertEqual(d.executors["blocking"], "thread")
+        self.assertEqual(d.executors["inline"], "inline")
+        self.assertNotIn("default", d.executors)
+        self.assertEqual(d.executors["math.sum"], "io")
+        self.assertEqual(blocking(), 1)
+
+        del d["blocking"]
+        self.assertNotIn("blocking", d.executors)
+
+    def test_add_function_timeout(self):
+        d = Dispatcher()
+        d.add_function(lambda: 1, name="one", timeout=1.5)
+        d.add_class(Math, timeout=2)
+        self.assertEqual(d.timeouts, {
+            "one": 1.5, "math.sum": 2, "math.diff": 2, "math.mul": 2,
+        })
+
+        d.add_function(lambda: 1, name="one")
+        del d["math.sum"]
+        self.assertEqual(d.timeouts, {"math.diff": 2, "math.mul": 2})
+
+    def test_add_function_cache(self):
+        d = Dispatcher()
+
+        @d.add_function(cache=60)
+        def country(code):
+            return code.upper()
+
+        d.add_function(lambda: 1, name="one", cache=True)
+        self.assertEqual(d.caches, {"country": 60, "one": True})
+
+        d.add_function(lambda: 1, name="one", cache=False)
+        del d["country"]
+        self.assertEqual(d.caches, {})
+
+        # Methods added by class replace cached ones with the same names
+        d.add_function(lambda a, b: a + b, name="math.sum", cache=True)
+        d.add_class(Math)
+        self.assertEqual(d.caches, {})
+
     def test_class(self):
         d1 = Dispatcher()
         d1.add_class(Math)
@@ -0,0 +1,28 @@
+import unittest
+
+from ..limit import AIMDLimit
+
+
+class TestAIMDLimit(unittest.TestCase):
+    def test_increase(self):
+        limit = AIMDLimit(latency_threshold=1, initial_limit=4, max_limit=5)
+        limit.update(0.5, in_flight=1)
+        self.assertEqual(limit.limit, 4)
+
+        limit.update(0.5, in_flight=2)
+        self.assertEqual(limit.limit, 5)
+        limit.update(0.5, in_flight=5)
+        self.assertEqual(limit.limit, 5)
+
+    def test_decrease(self):
+        limit = AIMDLimit(latency_threshold=1, initial_limit=10, min_limit=8, backoff_ratio=0.5)
+        limit.update(2, in_flight=10)
+        self.assertEqual(limit.limit, 8)
+
+        limit = AIMDLimit(latency_threshold=1, initial_limit=10, backoff_ratio=0.5)
+        limit.update(0.1, in_flight=10, is_dropped=True)
+        self.assertEqual(limit.limit, 5)
+
+    def test_backoff_ratio(self):
+        with self.assertRaises(ValueError):
+            AIMDLimit(latency_threshold=1, backoff_ratio=1)
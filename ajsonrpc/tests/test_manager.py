@@ -1,9 +1,17 @@
 """Test Async JSON-RPC Response manager."""
+import asyncio
+import threading
 import unittest
+from unittest import mock
 import json
+from concurrent.futures import ThreadPoolExecutor
 
-from ..core import JSONRPC20Request, JSONRPC20Response, JSONRPC20MethodNotFound, JSONRPC20InvalidParams, JSONRPC20ServerError, JSONRPC20DispatchException
-from ..manager import AsyncJSONRPCResponseManager
+from ..core import JSONRPC20Request, JSONRPC20Response, JSONRPC20MethodNotFound, JSONRPC20InvalidParams, JSONRPC20ServerError, JSONRPC20DispatchException, JSONRPC20ServerOverloaded
+from ..codec import JSONCodec, RawJSON
+from ..dispatcher import Dispatcher
+from ..limit import AIMDLimit
+from ..manager import AsyncJSONRPCResponseManager, request_timeout
+from ..middleware import Middleware
 
 
 class TestAsyncJSONRPCResponseManager(unittest.IsolatedAsyncioTestCase):
@@ -36,6 +44,11 @@ class TestAsyncJSONRPCResponseManager(unittest.IsolatedAsyncioTestCase):
         self.assertTrue(isinstance(res, JSONRPC20Response))
         self.assertEqual(res.result, 2)
 
+    async def test_get_response_none_result(self):
+        manager = AsyncJSONRPCResponseManager(dispatcher={"noop": lambda: None})
+        res = await manager.get_response_for_request(JSONRPC20Request("noop", id=0))
+        self.assertEqual(res.body, {"jsonrpc": "2.0", "id": 0, "result": None})
+
     async def test_get_response_notification(self):
         req = JSONRPC20Request("subtract", params=[5, 3], is_notification=True)
         res = await self.manager.get_response_for_request(req)
@@ -126,6 +139,596 @@ class TestAsyncJSONRPCResponseManager(unittest.IsolatedAsyncioTestCase):
         res = await manager.get_response_for_request(req)
         self.assertIsNone(res.error.data)
 
+    async def test_method_plan_cached(self):
+        plan = self.manager.get_method_plan("subtract")
+        self.assertIs(plan, self.manager.get_method_plan("subtract"))
+        self.assertFalse(plan.is_coroutine)
+        self.assertEqual((plan.min_args, plan.max_args), (2, 2))
+        self.assertTrue(self.manager.get_method_plan("async_sum").is_coroutine)
+
+    async def test_method_plan_invalidated_on_dispatcher_change(self):
+        plan = self.manager.get_method_plan("subtract")
+        self.dispatcher["subtract"] = lambda a, b, c=0: a - b - c
+        new_plan = self.manager.get_method_plan("subtract")
+        self.assertIsNot(plan, new_plan)
+        self.assertEqual((new_plan.min_args, new_plan.max_args), (2, 3))
+
+        req = JSONRPC20Request("subtract", params=[5, 3, 1], id=0)
+        res = await self.manager.get_response_for_request(req)
+        self.assertEqual(res.result, 1)
+
+        del self.dispatcher["subtract"]
+        with self.assertRaises(KeyError):
+            self.manager.get_method_plan("subtract")
+
+    async def test_prevalidated_params_do_not_call_method(self):
+        calls = []
+
+        def record(a, b=0, *, c):
+            calls.append((a, b, c))
+            return a + b + c
+
+        manager = AsyncJSONRPCResponseManager(
+            dispatcher={"record": record, "subtract": self.dispatcher["subtract"]},
+            is_params_prevalidated=True,
+        )
+        for params in [[1], [1, 2, 3], {"a": 1, "d": 2}, {"b": 1, "c": 2}]:
+            res = await manager.get_response_for_request(
+                JSONRPC20Request("record", params=params, id=0))
+            self.assertEqual(res.error, JSONRPC20InvalidParams())
+        self.assertEqual(calls, [])
+
+        res = await manager.get_response_for_request(
+            JSONRPC20Request("record", params={"a": 1, "c": 2}, id=0))
+        self.assertEqual(res.result, 3)
+
+        res = await manager.get_response_for_request(
+            JSONRPC20Request("subtract", params=[1], id=0))
+        self.assertEqual(res.error, JSONRPC20InvalidParams())
+
+    async def test_prevalidated_params_internal_type_error(self):
+        def broken(a):
+            return a + "1"
+
+        req = JSONRPC20Request("broken", params=[1], id=0)
+        res = await AsyncJSONRPCResponseManager(
+            dispatcher={"broken": broken},
+            is_params_prevalidated=True,
+        ).get_response_for_request(req)
+        self.assertEqual(res.error, JSONRPC20ServerError())
+
+    async def test_iter_payload_for_payload_batch(self):
+        order = []
+
+        async def sleep(delay):
+            await asyncio.sleep(delay)
+            order.append(delay)
+            return delay
+
+        manager = AsyncJSONRPCResponseManager(dispatcher={"sleep": sleep})
+        payload = json.dumps([
+            {"jsonrpc": "2.0", "method": "sleep", "params": [0.02], "id": 1},
+            {"jsonrpc": "2.0", "method": "sleep", "params": [0]},
+            {"jsonrpc": "2.0", "method": "sleep", "params": [0], "id": 2},
+        ])
+        chunks = [chunk async for chunk in manager.iter_payload_for_payload(payload)]
+        self.assertEqual(chunks[0][:1], b"[")
+        self.assertEqual(chunks[-1], b"]")
+        self.assertEqual(len(chunks), 3)
+        self.assertEqual(json.loads(b"".join(chunks)), [
+            {"jsonrpc": "2.0", "id": 2, "result": 0},
+            {"jsonrpc": "2.0", "id": 1, "result": 0.02},
+        ])
+
+    async def test_iter_payload_for_payload_no_response(self):
+        chunks = [chunk async for chunk in self.manager.iter_payload_for_payload(json.dumps([
+            {"jsonrpc": "2.0", "method": "subtract", "params": [1, 2]},
+        ]))]
+        self.assertEqual(chunks, [])
+
+        chunks = [chunk async for chunk in self.manager.iter_payload_for_payload(
+            '{"jsonrpc": "2.0", "method": "subtract", "params": [1, 2]}')]
+        self.assertEqual(chunks, [])
+
+    async def test_iter_payload_for_payload_single(self):
+        for payload, expected in [
+            ('{"jsonrpc": "2.0", "method": "subtract", "params": [3, 1], "id": 1}',
+             {"jsonrpc": "2.0", "id": 1, "result": 2}),
+            ('{"jsonrpc": "2.0", "method"', {"jsonrpc": "2.0", "id": None, "error": {"code": -32700, "message": "Parse error"}}),
+            ('[]', {"jsonrpc": "2.0", "id": None, "error": {"code": -32600, "message": "Invalid Request"}}),
+        ]:
+            chunks = [chunk async for chunk in self.manager.iter_payload_for_payload(payload)]
+            self.assertEqual(len(chunks), 1)
+            self.assertEqual(json.loads(chunks[0]), expected)
+
+    async def test_get_response_for_stream(self):
+        async def stream():
+            yield b'[{"jsonrpc": "2.0", "method": "subtract", "params": [3, 4], "id": 1},'
+            yield b' {"jsonrpc": "2.0"}, {"jsonrpc": "2.0", "method": "subtract", '
+            yield b'"params": [3, 4]}]'
+
+        response = await self.manager.get_response_for_stream(stream())
+        self.assertEqual(response.body, [
+            {"jsonrpc": "2.0", "result": -1, "id": 1},
+            {"jsonrpc": "2.0", "error": {"code": -32600, "message": "Invalid Request"}, "id": None},
+        ])
+
+        response = await self.manager.get_response_for_stream(
+            [b'{"jsonrpc": "2.0", "method": "subtract", ', b'"params": [3, 4], "id": 1}'])
+        self.assertEqual(response.body, {"jsonrpc": "2.0", "result": -1, "id": 1})
+
+        response = await self.manager.get_response_for_stream(b"[]")
+        self.assertEqual(response.error.code, -32600)
+
+        response = await self.manager.get_response_for_stream(
+            [b'[{"jsonrpc": "2.0", "method": "subtract", "params": [3, 4]}, ', b'{"jsonrpc"'])
+        self.assertEqual(response.error.code, -32700)
+
+        response = await self.manager.get_response_for_stream(
+            [b'[{"jsonrpc": "2.0", "method": "subtract", "params": [3, 4]}]'])
+        self.assertIsNone(response)
+
+    async def test_max_batch_size(self):
+        manager = AsyncJSONRPCResponseManager(dispatcher=self.dispatcher, max_batch_size=2)
+        request = {"jsonrpc": "2.0", "method": "subtract", "params": [3, 4], "id": 1}
+        error = {"jsonrpc": "2.0", "error": {"code": -32001, "message": "Batch too large"}, "id": None}
+
+        response = await manager.get_response_for_payload(json.dumps([request] * 2))
+        self.assertEqual(len(response), 2)
+
+        response = await manager.get_response_for_payload(json.dumps([request] * 3))
+        self.assertEqual(response.body, error)
+
+        response = await manager.get_response_for_stream(json.dumps([request] * 3).encode())
+        self.assertEqual(response.body, error)
+
+        chunks = [chunk async for chunk in manager.iter_payload_for_payload(json.dumps([request] * 3))]
+        self.assertEqual(json.loads(b"".join(chunks)), error)
+
+    async def test_max_batch_concurrency(self):
+        running = []
+        max_running = []
+
+        async def work(value):
+            running.append(value)
+            max_running.append(len(running))
+            await asyncio.sleep(0)
+            running.remove(value)
+            return value
+
+        manager = AsyncJSONRPCResponseManager(dispatcher={"work": work}, max_batch_concurrency=2)
+        payload = json.dumps([
+            {"jsonrpc": "2.0", "method": "work", "params": [i], "id": i}
+            for i in range(5)
+        ])
+
+        response = await manager.get_response_for_payload(payload)
+        self.assertEqual([r.result for r in response], list(range(5)))
+        self.assertEqual(max(max_running), 2)
+
+        max_running.clear()
+        chunks = [chunk async for chunk in manager.iter_payload_for_payload(payload)]
+        self.assertEqual(sorted(r["result"] for r in json.loads(b"".join(chunks))), list(range(5)))
+        self.assertEqual(max(max_running), 2)
+
+        max_running.clear()
+        response = await manager.get_response_for_stream(payload.encode())
+        self.assertEqual(sorted(r.result for r in response), list(range(5)))
+        self.assertEqual(max(max_running), 2)
+
+    async def test_batch_failure(self):
+        running = []
+
+        async def work(delay):
+            running.append(delay)
+            try:
+                await asyncio.sleep(delay)
+            finally:
+                running.remove(delay)
+
+        class Fail(Middleware):
+            async def before_request(self, request):
+                if request.params == [0]:
+                    raise RuntimeError("Unexpected")
+
+        payload = json.dumps([
+            {"jsonrpc": "2.0", "method": "work", "params": [delay], "id": 1}
+            for delay in [0.1, 0, 1]
+        ])
+        for max_batch_concurrency in [None, 2, 1]:
+            manager = AsyncJSONRPCResponseManager(
+                dispatcher={"work": work}, middlewares=[Fail()], max_batch_concurrency=max_batch_concurrency)
+
+            with self.assertRaises(RuntimeError):
+                await asyncio.wait_for(manager.get_response_for_payload(payload), 0.5)
+            await asyncio.sleep(0)
+            # Requests of failed batch are cancelled
+            self.assertEqual(running, [])
+
+            with self.assertRaises(RuntimeError):
+                await asyncio.wait_for(manager.get_response_for_stream(payload.encode()), 0.5)
+
+            async def iter_payload():
+                return [chunk async for chunk in manager.iter_payload_for_payload(payload)]
+
+            with self.assertRaises(RuntimeError):
+                await asyncio.wait_for(iter_payload(), 0.5)
+
+    async def test_get_response_for_stream_bounded(self):
+        release = asyncio.Event()
+        received = []
+
+        async def wait(value):
+            await release.wait()
+            return value
+
+        async def stream():
+            yield b"["
+            for i in range(100):
+                received.append(i)
+                yield json.dumps({"jsonrpc": "2.0", "method": "wait", "params": [i], "id": i}).encode()
+                yield b"," if i < 99 else b"]"
+
+        manager = AsyncJSONRPCResponseManager(dispatcher={"wait": wait}, max_batch_concurrency=1)
+        task = asyncio.ensure_future(manager.get_response_for_stream(stream()))
+        await asyncio.sleep(0.01)
+        # One element is executed, one queued and one waits for the queue
+        self.assertEqual(len(received), 3)
+
+        release.set()
+        response = await task
+        self.assertEqual([r.result for r in response], list(range(100)))
+
+        # Batch size is checked before elements are dispatched
+        manager = AsyncJSONRPCResponseManager(dispatcher={"wait": wait}, max_batch_size=2)
+        request = {"jsonrpc": "2.0", "method": "wait", "params": [1], "id": 1}
+        with mock.patch.object(manager, "get_response_for_request_body") as get_response:
+            response = await manager.get_response_for_stream(json.dumps([request] * 100).encode())
+        self.assertEqual(response.error.code, -32001)
+        self.assertEqual(get_response.call_count, 2)
+
+    async def test_max_in_flight(self):
+        release = asyncio.Event()
+
+        async def wait():
+            await release.wait()
+            return "done"
+
+        manager = AsyncJSONRPCResponseManager(dispatcher={"wait": wait}, max_in_flight=1)
+        first = asyncio.ensure_future(
+            manager.get_response_for_request(JSONRPC20Request("wait", id=1)))
+        await asyncio.sleep(0)
+        self.assertEqual(manager.in_flight, 1)
+
+        response = await manager.get_response_for_request(JSONRPC20Request("wait", id=2))
+        self.assertEqual(response.body, {
+            "jsonrpc": "2.0", "id": 2,
+            "error": {"code": -32002, "message": "Server overloaded"},
+        })
+
+        release.set()
+        self.assertEqual((await first).result, "done")
+        self.assertEqual(manager.in_flight, 0)
+
+    async def test_overload_error(self):
+        class RetryLater(JSONRPC20ServerOverloaded):
+            CODE = -32050
+            MESSAGE = "Server overloaded, retry later"
+
+        manager = AsyncJSONRPCResponseManager(
+            dispatcher=self.dispatcher, max_in_flight=0, overload_error=RetryLater)
+        response = await manager.get_response_for_request(JSONRPC20Request("subtract", params=[2, 1], id=1))
+        self.assertEqual(response.error.body, {"code": -32050, "message": "Server overloaded, retry later"})
+
+    async def test_adaptive_limit(self):
+        async def sleep(delay):
+            await asyncio.sleep(delay)
+
+        limit = AIMDLimit(latency_threshold=0.01, initial_limit=4, min_limit=1)
+        manager = AsyncJSONRPCResponseManager(
+            dispatcher={"sleep": sleep}, adaptive_limit=limit, max_in_flight=3)
+        self.assertEqual(manager.get_in_flight_limit(), 3)
+
+        await manager.get_response_for_request(JSONRPC20Request("sleep", params=[0.02], id=1))
+        self.assertEqual(manager.get_in_flight_limit(), 3)
+        for _ in range(10):
+            await manager.get_response_for_request(JSONRPC20Request("sleep", params=[0.02], id=1))
+        self.assertEqual(manager.get_in_flight_limit(), 1)
+
+        responses = await asyncio.gather(*[
+            manager.get_response_for_request(JSONRPC20Request("sleep", params=[0], id=i))
+            for i in range(2)
+        ])
+        self.assertEqual([r.error.code if r.error else None for r in responses], [None, -32002])
+
+    async def test_executors(self):
+        dispatcher = Dispatcher()
+        thread_name = lambda: threading.current_thread().name
+        dispatcher.add_function(thread_name, name="default")
+        dispatcher.add_function(thread_name, name="inline", executor="inline")
+        dispatcher.add_function(thread_name, name="thread", executor="thread")
+        dispatcher.add_function(thread_name, name="named", executor="named")
+
+        named = ThreadPoolExecutor(thread_name_prefix="named")
+        manager = AsyncJSONRPCResponseManager(dispatcher=dispatcher, executors={"named": named})
+        self.addCleanup(named.shutdown)
+        self.addCleanup(manager.shutdown)
+
+        async def call(method):
+            response = await manager.get_response_for_request(JSONRPC20Request(method, id=0))
+            return response.result
+
+        self.assertEqual(await call("default"), threading.current_thread().name)
+        self.assertEqual(await call("inline"), threading.current_thread().name)
+        self.assertTrue((await call("thread")).startswith("ajsonrpc"))
+        self.assertTrue((await call("named")).startswith("named"))
+
+        manager.default_executor = "thread"
+        self.assertTrue((await call("default")).startswith("ajsonrpc"))
+        self.assertEqual(await call("inline"), threading.current_thread().name)
+
+        dispatcher.set_executor("inline", None)
+        self.assertTrue((await call("inline")).startswith("ajsonrpc"))
+
+    async def test_executor_exceptions(self):
+        manager = AsyncJSONRPCResponseManager(
+            dispatcher=self.dispatcher, default_executor="thread")
+        self.addCleanup(manager.shutdown)
+
+        res = await manager.get_response_for_request(
+            JSONRPC20Request("subtract", params=[5, 3], id=0))
+        self.assertEqual(res.result, 2)
+
+        res = await manager.get_response_for_request(
+            JSONRPC20Request("subtract", params=[5], id=0))
+        self.assertEqual(res.error, JSONRPC20InvalidParams())
+
+        res = await manager.get_response_for_request(
+            JSONRPC20Request("unexpected_exception", id=0))
+        self.assertEqual(res.error, JSONRPC20ServerError())
+
+    async def test_unknown_executor(self):
+        dispatcher = Dispatcher()
+        dispatcher.add_function(lambda: 1, name="one", executor="nosuch")
+        with self.assertRaises(ValueError):
+            AsyncJSONRPCResponseManager(dispatcher=dispatcher)
+        with self.assertRaises(ValueError):
+            AsyncJSONRPCResponseManager(dispatcher=self.dispatcher, default_executor="nosuch")
+
+        dispatcher = Dispatcher()
+        manager = AsyncJSONRPCResponseManager(dispatcher=dispatcher)
+        dispatcher.add_function(lambda: 1, name="one", executor="nosuch")
+
+        with self.assertLogs("ajsonrpc.manager", "ERROR"):
+            res = await manager.get_response_for_request(JSONRPC20Request("one", id=0))
+        self.assertEqual(res.body, {
+            "jsonrpc": "2.0", "id": 0,
+            "error": {"code": -32603, "message": "Internal error"},
+        })
+
+        with self.assertLogs("ajsonrpc.manager", "ERROR"):
+            res = await manager.get_response_for_request(JSONRPC20Request("one", is_notification=True))
+        self.assertIsNone(res)
+
+        payload = await manager.get_payload_for_payload(json.dumps([
+            {"jsonrpc": "2.0", "method": "one", "id": 1},
+        ]))
+        self.assertEqual(json.loads(payload)[0]["error"]["code"], -32603)
+
+    async def test_timeouts(self):
+        cancelled = []
+
+        async def sleep(delay):
+            try:
+                await asyncio.sleep(delay)
+            except asyncio.CancelledError:
+                cancelled.append(delay)
+                raise
+            return delay
+
+        dispatcher = Dispatcher()
+        dispatcher.add_function(sleep)
+        dispatcher.add_function(sleep, name="sleep_short", timeout=0.01)
+        manager = AsyncJSONRPCResponseManager(dispatcher=dispatcher, timeout_param="timeout")
+
+        async def call(method, params):
+            response = await manager.get_response_for_request(JSONRPC20Request(method, params=params, id=0))
+            return response.error.code if response.error else response.result
+
+        self.assertEqual(await call("sleep", [0.02]), 0.02)
+        self.assertEqual(await call("sleep_short", [1]), -32003)
+        self.assertEqual(cancelled, [1])
+
+        manager.timeout = 0.01
+        self.assertEqual(await call("sleep", [1]), -32003)
+        manager.timeout = None
+
+        self.assertEqual(await call("sleep", {"delay": 1, "timeout": 0.01}), -32003)
+        self.assertEqual(await call("sleep", {"delay": 0, "timeout": 1}), 0)
+        self.assertEqual(await call("sleep", {"delay": 0, "timeout": "1"}), -32602)
+        self.assertEqual(manager.in_flight, 0)
+
+    async def test_request_deadline(self):
+        calls = []
+        manager = AsyncJSONRPCResponseManager(dispatcher={"call": lambda: calls.append(1)})
+
+        with request_timeout(0):
+            response = await manager.get_response_for_request(JSONRPC20Request("call", id=0))
+        self.assertEqual(response.error.code, -32003)
+        self.assertEqual(calls, [])
+
+        with request_timeout(10):
+            response = await manager.get_payload_for_payload(json.dumps([
+                {"jsonrpc": "2.0", "method": "call", "id": 1},
+                {"jsonrpc": "2.0", "method": "call", "id": 2},
+            ]))
+        self.assertEqual(len(json.loads(response)), 2)
+        self.assertEqual(calls, [1, 1])
+
+    async def test_get_response_for_payload_single(self):
+        response = await self.manager.get_response_for_payload(
+            '{"jsonrpc": "2.0", "method": "async_sum", "params": [1, 2], "id": 1}')
+        self.assertEqual(response.body, {"jsonrpc": "2.0", "result": 3, "id": 1})
+
+        response = await self.manager.get_response_for_payload('1')
+        self.assertEqual(response.body, {"jsonrpc": "2.0", "error": {"code": -32600, "message": "Invalid Request"}, "id": None})
+
+    async def test_notification_does_not_build_response(self):
+        serialized = []
+        manager = AsyncJSONRPCResponseManager(
+            dispatcher=self.dispatcher,
+            serialize=lambda body: serialized.append(body) or json.dumps(body),
+        )
+        with mock.patch("ajsonrpc.manager.make_error_response") as make_error_response:
+            for method in ["subtract", "does_not_exist", "dispatch_exception", "unexpected_exception"]:
+                req = JSONRPC20Request(method, params=[5, 3], is_notification=True)
+                self.assertIsNone(await manager.get_response_for_request(req))
+        make_error_response.assert_not_called()
+
+        payload = await manager.get_payload_for_payload(json.dumps([
+            {"jsonrpc": "2.0", "method": "subtract", "params": [5, 3]},
+            {"jsonrpc": "2.0", "method": "unexpected_exception"},
+        ]))
+        self.assertFalse(payload)
+        self.assertEqual(serialized, [])
+        self.assertEqual(manager.in_flight, 0)
+
+    async def test_notification_detached(self):
+        calls = []
+        event = asyncio.Event()
+
+        async def log(value):
+            await event.wait()
+            calls.append(value)
+
+        manager = AsyncJSONRPCResponseManager(dispatcher={"log": log}, is_notification_detached=True)
+        res = await manager.get_response_for_request(JSONRPC20Request("log", params=[1], is_notification=True))
+        self.assertIsNone(res)
+        self.assertEqual(calls, [])
+        self.assertEqual(len(manager.notification_tasks), 1)
+
+        event.set()
+        await manager.wait_notifications()
+        self.assertEqual(calls, [1])
+        self.assertEqual(manager.notification_tasks, set())
+
+    async def test_cached_method(self):
+        calls = []
+        dispatcher = Dispatcher()
+
+        @dispatcher.add_function(cache=True)
+        def country(code):
+            calls.append(code)
+            return {"code": code.upper()}
+
+        @dispatcher.add_function(cache=True)
+        def fail():
+            calls.append("fail")
+            raise ValueError()
+
+        manager = AsyncJSONRPCResponseManager(dispatcher, codec=JSONCodec())
+
+        for request_id in range(3):
+            payload = await manager.get_payload_for_payload(json.dumps(
+                {"jsonrpc": "2.0", "method": "country", "params": ["nl"], "id": request_id}))
+            self.assertEqual(json.loads(payload), {"jsonrpc": "2.0", "id": request_id, "result": {"code": "NL"}})
+
+        await manager.get_payload_for_payload(json.dumps(
+            {"jsonrpc": "2.0", "method": "country", "params": {"code": "nl"}, "id": 0}))
+        self.assertEqual(calls, ["nl", "nl"])
+        self.assertIsInstance(manager.cache.get('country ["nl"]'), RawJSON)
+
+        for _ in range(2):
+            response = await manager.get_response_for_request(JSONRPC20Request("fail", id=0))
+            self.assertEqual(response.error.code, -32000)
+        self.assertEqual(calls, ["nl", "nl", "fail", "fail"])
+
+        self.assertEqual(manager.cache.invalidate_method("country"), 2)
+        await manager.get_response_for_request(JSONRPC20Request("country", params=["nl"], id=0))
+        self.assertEqual(calls[-1], "nl")
+        self.assertEqual(manager.cache.hits, 3)
+
+        # Response objects expose decoded results of cache hits
+        response = await manager.get_response_for_request(JSONRPC20Request("country", params=["nl"], id=0))
+        self.assertEqual(response.result, {"code": "NL"})
+        response = await manager.get_response_for_payload(json.dumps(
+            {"jsonrpc": "2.0", "method": "country", "params": ["nl"], "id": 0}))
+        self.assertEqual(response.result, {"code": "NL"})
+        self.assertEqual(len(calls), 5)
+
+        # Disabling cache in dispatcher takes effect immediately
+        dispatcher.set_cache("country", None)
+        await manager.get_response_for_request(JSONRPC20Request("country", params=["nl"], id=0))
+        self.assertEqual(len(calls), 6)
+
+    async def test_cached_method_after_request_hook(self):
+        results = []
+
+        class Recorder(Middleware):
+            async def after_request(self, request, response):
+                results.append(response.result)
+                return response
+
+        dispatcher = Dispatcher()
+        dispatcher.add_function(lambda: [1], name="cached", cache=True)
+        manager = AsyncJSONRPCResponseManager(dispatcher, codec=JSONCodec(), middlewares=[Recorder()])
+        for _ in range(2):
+            payload = await manager.get_payload_for_payload(b'{"jsonrpc": "2.0", "method": "cached", "id": 0}')
+            self.assertEqual(json.loads(payload)["result"], [1])
+        self.assertEqual(results, [[1], [1]])
+
+    async def test_coalesced_calls(self):
+        calls = []
+        event = asyncio.Event()
+
+        async def lookup(key):
+            calls.append(key)
+            await event.wait()
+            return key * 2
+
+        manager = AsyncJSONRPCResponseManager(dispatcher={"lookup": lookup}, is_call_coalesced=True)
+        tasks = [
+            asyncio.ensure_future(manager.get_response_for_request(
+                JSONRPC20Request("lookup", params=[key], id=request_id)))
+            for request_id, key in enumerate([1, 1, 2, 1])
+        ]
+        await asyncio.sleep(0.01)
+        self.assertEqual(calls, [1, 2])
+        self.assertEqual(manager.in_flight, 2)
+
+        event.set()
+        responses = await asyncio.gather(*tasks)
+        self.assertEqual([(r.id, r.result) for r in responses], [(0, 2), (1, 2), (2, 4), (3, 2)])
+        self.assertEqual(manager._coalesced_calls, {})
+
+        payload = await manager.get_payload_for_payload(json.dumps([
+            {"jsonrpc": "2.0", "method": "lookup", "params": [3], "id": "a"},
+            {"jsonrpc": "2.0", "method": "lookup", "params": [3], "id": "b"},
+        ]))
+        self.assertEqual(json.loads(payload), [
+            {"jsonrpc": "2.0", "id": "a", "result": 6},
+            {"jsonrpc": "2.0", "id": "b", "result": 6},
+        ])
+        self.assertEqual(calls, [1, 2, 3])
+
+    async def test_coalesced_call_timeout(self):
+        event = asyncio.Event()
+
+        async def wait():
+            await event.wait()
+            return "done"
+
+        manager = AsyncJSONRPCResponseManager(dispatcher={"wait": wait}, is_call_coalesced=True, timeout_param="timeout")
+        first = asyncio.ensure_future(manager.get_response_for_request(JSONRPC20Request("wait", id=0)))
+        await asyncio.sleep(0.01)
+
+        # Caller that gives up does not cancel the shared call
+        response = await manager.get_response_for_request(JSONRPC20Request("wait", params={"timeout": 0.01}, id=1))
+        self.assertEqual(response.error.code, -32003)
+
+        event.set()
+        self.assertEqual((await first).result, "done")
+
     #############################################
     # Test examples from https://www.jsonrpc.org/specification
     #############################################
@@ -0,0 +1,84 @@
+import asyncio
+import json
+import unittest
+
+from ..core import JSONRPC20Request
+from ..manager import AsyncJSONRPCResponseManager
+from ..metrics import Histogram, Metrics, UNKNOWN_METHOD
+
+
+class TestHistogram(unittest.TestCase):
+    def test_observe(self):
+        histogram = Histogram([1, 5])
+        for value in [0.5, 1, 3, 10]:
+            histogram.observe(value)
+
+        self.assertEqual(histogram.counts, [2, 1, 1])
+        self.assertEqual(histogram.count, 4)
+        self.assertEqual(histogram.sum, 14.5)
+        self.assertEqual(list(histogram.iter_cumulative()), [("1", 2), ("5", 3), ("+Inf", 4)])
+
+
+class TestMetrics(unittest.TestCase):
+    def test_render(self):
+        metrics = Metrics(latency_buckets=[0.1], batch_size_buckets=[10], payload_size_buckets=[100])
+        metrics.observe_call("sum", 0.05)
+        metrics.observe_call('say "hi"', 0.5, error_code=-32602)
+        metrics.observe_batch(3)
+        metrics.observe_payloads(50)
+
+        text = metrics.render()
+        self.assertIn('jsonrpc_calls_total{method="sum"} 1\n', text)
+        self.assertIn('jsonrpc_errors_total{method="say \\"hi\\"",code="-32602"} 1\n', text)
+        self.assertIn('jsonrpc_call_duration_seconds_bucket{method="sum",le="0.1"} 1\n', text)
+        self.assertIn('jsonrpc_call_duration_seconds_bucket{method="say \\"hi\\"",le="0.1"} 0\n', text)
+        self.assertIn('jsonrpc_batch_size_bucket{le="+Inf"} 1\n', text)
+        self.assertIn("jsonrpc_batch_size_sum 3\n", text)
+        self.assertIn("jsonrpc_request_size_bytes_count 1\n", text)
+        self.assertIn("jsonrpc_response_size_bytes_count 0\n", text)
+        self.assertIn("# TYPE jsonrpc_call_duration_seconds histogram\n", text)
+
+
+class TestManagerMetrics(unittest.IsolatedAsyncioTestCase):
+    async def test_manager(self):
+        metrics = Metrics()
+        manager = AsyncJSONRPCResponseManager({"sum": lambda a, b: a + b}, metrics=metrics)
+
+        payload = json.dumps([
+            {"jsonrpc": "2.0", "method": "sum", "params": [1, 2], "id": 1},
+            {"jsonrpc": "2.0", "method": "sum", "params": [1], "id": 2},
+            {"jsonrpc": "2.0", "method": "missing", "id": 3},
+            {"jsonrpc": "2.0", "method": "sum", "params": [1, 2]},
+        ])
+        response = await manager.get_payload_for_payload(payload)
+
+        self.assertEqual(metrics.methods["sum"].calls, 3)
+        self.assertEqual(metrics.methods["sum"].errors, {-32602: 1})
+        self.assertEqual(metrics.methods[UNKNOWN_METHOD].errors, {-32601: 1})
+        self.assertEqual(metrics.batch_size.sum, 4)
+        self.assertEqual(metrics.request_size.sum, len(payload))
+        self.assertEqual(metrics.response_size.sum, len(response))
+
+        chunks = [chunk async for chunk in manager.iter_payload_for_payload(payload)]
+        self.assertEqual(metrics.batch_size.count, 2)
+        self.assertEqual(metrics.response_size.sum, len(response) + len(b"".join(chunks)))
+
+        await manager.get_response_for_request(JSONRPC20Request("sum", params=[1, 2], id=0))
+        self.assertEqual(metrics.methods["sum"].calls, 7)
+
+    async def test_notification_errors(self):
+        async def sleep():
+            await asyncio.sleep(1)
+
+        def fail():
+            raise ValueError()
+
+        metrics = Metrics()
+        manager = AsyncJSONRPCResponseManager(
+            {"sleep": sleep, "fail": fail}, metrics=metrics, timeout_param="timeout")
+        await manager.get_response_for_request(
+            JSONRPC20Request("sleep", params={"timeout": 0.01}, is_notification=True))
+        await manager.get_response_for_request(JSONRPC20Request("fail", is_notification=True))
+
+        self.assertEqual(metrics.methods["sleep"].errors, {-32003: 1})
+        self.assertEqual(metrics.methods["fail"].errors, {-32000: 1})
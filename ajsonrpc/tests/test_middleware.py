@@ -0,0 +1,110 @@
+import json
+import unittest
+
+from ..core import JSONRPC20DispatchException, JSONRPC20Request
+from ..manager import AsyncJSONRPCResponseManager
+from ..middleware import Middleware, get_hooks
+
+
+class Log(Middleware):
+    def __init__(self, name, events):
+        self.name = name
+        self.events = events
+
+    async def before_request(self, request):
+        self.events.append((self.name, "before_request", request.method))
+
+    async def after_request(self, request, response):
+        self.events.append((self.name, "after_request", request.method))
+        return response
+
+    async def before_call(self, method_name, args, kwargs):
+        self.events.append((self.name, "before_call", method_name))
+
+    async def after_call(self, method_name, result):
+        self.events.append((self.name, "after_call", method_name))
+        return result
+
+
+class Auth(Middleware):
+    async def before_request(self, request):
+        if request.method.startswith("admin."):
+            raise JSONRPC20DispatchException(code=4001, message="Forbidden")
+
+
+class Double(Middleware):
+    async def after_call(self, method_name, result):
+        return result * 2
+
+
+class Envelope(Middleware):
+    async def before_payload(self, payload):
+        return json.loads(payload)["data"]
+
+    async def after_payload(self, payload, response_payload):
+        return '{{"data": {}}}'.format(json.dumps(response_payload))
+
+
+class TestMiddleware(unittest.IsolatedAsyncioTestCase):
+    def setUp(self):
+        self.calls = []
+        self.dispatcher = {
+            "sum": lambda a, b: a + b,
+            "admin.reset": lambda: self.calls.append("reset"),
+        }
+
+    def test_get_hooks(self):
+        events = []
+        first, auth, second = Log("first", events), Auth(), Log("second", events)
+        self.assertEqual(get_hooks([first, auth, second], "before_request"), (
+            first.before_request, auth.before_request, second.before_request,
+        ))
+        self.assertEqual(get_hooks([first, auth, second], "after_request"), (
+            second.after_request, first.after_request,
+        ))
+        self.assertEqual(get_hooks([auth, object()], "before_payload"), ())
+
+    async def test_no_middlewares(self):
+        manager = AsyncJSONRPCResponseManager(self.dispatcher)
+        self.assertFalse(manager._has_request_hooks)
+        self.assertFalse(manager._has_call_hooks)
+
+    async def test_order(self):
+        events = []
+        manager = AsyncJSONRPCResponseManager(
+            self.dispatcher, middlewares=[Log("first", events), Log("second", events)])
+        response = await manager.get_response_for_request(JSONRPC20Request("sum", params=[1, 2], id=0))
+        self.assertEqual(response.result, 3)
+        self.assertEqual([event[:2] for event in events], [
+            ("first", "before_request"), ("second", "before_request"),
+            ("first", "before_call"), ("second", "before_call"),
+            ("second", "after_call"), ("first", "after_call"),
+            ("second", "after_request"), ("first", "after_request"),
+        ])
+
+    async def test_reject_request(self):
+        manager = AsyncJSONRPCResponseManager(self.dispatcher)
+        manager.add_middleware(Auth())
+        response = await manager.get_response_for_request(JSONRPC20Request("admin.reset", id=1))
+        self.assertEqual(response.body, {
+            "jsonrpc": "2.0", "id": 1, "error": {"code": 4001, "message": "Forbidden"},
+        })
+
+        response = await manager.get_response_for_request(JSONRPC20Request("admin.reset", is_notification=True))
+        self.assertIsNone(response)
+        self.assertEqual(self.calls, [])
+
+    async def test_call_hooks(self):
+        manager = AsyncJSONRPCResponseManager(self.dispatcher, middlewares=[Double()])
+        response = await manager.get_response_for_request(JSONRPC20Request("sum", params=[1, 2], id=0))
+        self.assertEqual(response.result, 6)
+
+    async def test_payload_hooks(self):
+        manager = AsyncJSONRPCResponseManager(self.dispatcher, middlewares=[Envelope()])
+        payload = await manager.get_payload_for_payload(json.dumps({
+            "data": '{"jsonrpc": "2.0", "method": "sum", "params": [1, 2], "id": 0}',
+        }))
+        self.assertEqual(json.loads(json.loads(payload)["data"]), {"jsonrpc": "2.0", "id": 0, "result": 3})
+
+        with self.assertRaises(RuntimeError):
+            await manager.get_response_for_stream(b'{"jsonrpc": "2.0", "method": "sum", "params": [1, 2], "id": 0}')
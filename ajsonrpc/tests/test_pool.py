@@ -0,0 +1,102 @@
+import multiprocessing
+import os
+import pickle
+import unittest
+
+from ..core import JSONRPC20DispatchException, JSONRPC20Request
+from ..dispatcher import Dispatcher
+from ..manager import AsyncJSONRPCResponseManager
+from ..pool import ProcessPool, get_method_reference
+
+
+def get_pid():
+    return os.getpid()
+
+
+def fail():
+    raise JSONRPC20DispatchException(code=4000, message="error", data={"param": 1})
+
+
+def mul(a, b):
+    return a * b
+
+
+class Methods:
+    @staticmethod
+    def add(a, b):
+        return a + b
+
+    def sub(self, a, b):
+        return a - b
+
+
+class TestProcessPool(unittest.IsolatedAsyncioTestCase):
+    def setUp(self):
+        self.dispatcher = Dispatcher()
+        self.dispatcher.add_function(get_pid, executor="process")
+        self.dispatcher.add_function(fail, executor="process")
+        self.dispatcher.add_function(mul, executor="process")
+
+    async def test_manager_process_policy(self):
+        manager = AsyncJSONRPCResponseManager(dispatcher=self.dispatcher)
+        self.addCleanup(manager.shutdown)
+
+        response = await manager.get_response_for_request(JSONRPC20Request("get_pid", id=0))
+        self.assertNotEqual(response.result, os.getpid())
+        self.assertIsInstance(manager.executors["process"], ProcessPool)
+
+        response = await manager.get_response_for_request(JSONRPC20Request("mul", params=[2, 3], id=0))
+        self.assertEqual(response.result, 6)
+
+        response = await manager.get_response_for_request(JSONRPC20Request("mul", params=[2], id=0))
+        self.assertEqual(response.error.code, -32602)
+
+        response = await manager.get_response_for_request(JSONRPC20Request("fail", id=0))
+        self.assertEqual(response.error.body, {"code": 4000, "message": "error", "data": {"param": 1}})
+
+    async def test_methods_added_later(self):
+        manager = AsyncJSONRPCResponseManager(dispatcher=self.dispatcher, executors={
+            "spawn": ProcessPool(max_workers=1, mp_context=multiprocessing.get_context("spawn")),
+        })
+        self.addCleanup(manager.executors["spawn"].shutdown)
+        self.addCleanup(manager.shutdown)
+        await manager.get_response_for_request(JSONRPC20Request("get_pid", id=0))
+        manager.executors["process"].warm_up()
+
+        self.dispatcher.add_class(Methods, executor="process")
+        self.dispatcher.add_function(mul, name="spawn_mul", executor="spawn")
+        response = await manager.get_response_for_request(JSONRPC20Request("methods.add", params=[2, 3], id=0))
+        self.assertEqual(response.result, 5)
+        response = await manager.get_response_for_request(JSONRPC20Request("spawn_mul", params=[2, 3], id=0))
+        self.assertEqual(response.result, 6)
+
+    async def test_not_importable(self):
+        self.dispatcher.add_function(lambda a, b: a * b, name="lambda", executor="process")
+        self.dispatcher.add_object(Methods(), executor="process")
+        manager = AsyncJSONRPCResponseManager(dispatcher=self.dispatcher)
+        self.addCleanup(manager.shutdown)
+
+        for method in ["lambda", "methods.sub"]:
+            with self.assertLogs("ajsonrpc.manager", "ERROR"):
+                response = await manager.get_response_for_request(JSONRPC20Request(method, params=[2, 3], id=0))
+            self.assertEqual(response.error.code, -32603)
+
+    def test_get_method_reference(self):
+        self.assertEqual(get_method_reference(mul), (__name__, "mul"))
+        self.assertEqual(get_method_reference(Methods.add), (__name__, "Methods.add"))
+        with self.assertRaises(ValueError):
+            get_method_reference(Methods().sub)
+
+    async def test_recycle_workers(self):
+        pool = ProcessPool(max_workers=1, max_calls=2)
+        self.addCleanup(pool.shutdown)
+        pool.warm_up()
+
+        pids = [await pool.run_method(get_method_reference(get_pid), [], {}) for _ in range(3)]
+        self.assertEqual(pids[0], pids[1])
+        self.assertNotEqual(pids[1], pids[2])
+
+    def test_dispatch_exception_pickle(self):
+        exception = pickle.loads(pickle.dumps(
+            JSONRPC20DispatchException(code=4000, message="error", data=1)))
+        self.assertEqual(exception.error.body, {"code": 4000, "message": "error", "data": 1})
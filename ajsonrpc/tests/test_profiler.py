@@ -0,0 +1,54 @@
+import json
+import unittest
+
+from ..manager import AsyncJSONRPCResponseManager
+from ..profiler import PHASES, Profiler
+
+
+class TestProfiler(unittest.IsolatedAsyncioTestCase):
+    def setUp(self):
+        self.dispatcher = {"sum": lambda *args: sum(args)}
+
+    def test_sample_rate(self):
+        self.assertIsNone(Profiler(sample_rate=0).start(10))
+        self.assertIsNotNone(Profiler(sample_rate=1).start(10))
+        with self.assertRaises(ValueError):
+            Profiler(sample_rate=2)
+
+    async def test_phases(self):
+        profiler = Profiler(sample_rate=1)
+        manager = AsyncJSONRPCResponseManager(self.dispatcher, profiler=profiler)
+        await manager.get_payload_for_payload(json.dumps([
+            {"jsonrpc": "2.0", "method": "sum", "params": [1, 2], "id": 1},
+            {"jsonrpc": "2.0", "method": "sum", "id": 2},
+            {"jsonrpc": "2.0", "id": 3},
+        ]))
+
+        stats = profiler.get_stats()
+        self.assertEqual(stats["payloads"]["count"], 1)
+        self.assertEqual(set(stats["phases"]), set(PHASES))
+        for phase in PHASES:
+            self.assertEqual(stats["phases"][phase]["count"], 1)
+            self.assertGreater(stats["phases"][phase]["total"], 0)
+        self.assertEqual(stats["methods"]["sum"]["count"], 2)
+        self.assertIn("method sum", profiler.format_stats())
+
+        profiler.reset()
+        self.assertEqual(profiler.get_stats()["payloads"]["count"], 0)
+
+    async def test_not_sampled(self):
+        profiler = Profiler(sample_rate=0)
+        manager = AsyncJSONRPCResponseManager(self.dispatcher, profiler=profiler)
+        await manager.get_payload_for_payload('{"jsonrpc": "2.0", "method": "sum", "id": 1}')
+        self.assertEqual(profiler.get_stats()["payloads"]["count"], 0)
+
+    async def test_slow_log(self):
+        profiler = Profiler(sample_rate=1, slow_threshold=0)
+        manager = AsyncJSONRPCResponseManager(self.dispatcher, profiler=profiler)
+        with self.assertLogs("ajsonrpc.profiler", level="WARNING") as logs:
+            await manager.get_payload_for_payload(
+                '{"jsonrpc": "2.0", "method": "sum", "params": [1, 2], "id": 1}')
+
+        self.assertIn("sum(params 5 bytes)", logs.output[0])
+        self.assertIn("parse", logs.output[0])
+        self.assertEqual(profiler.slow_payloads, 1)
@@ -0,0 +1,317 @@
+import asyncio
+import json
+import os
+import queue
+import re
+import signal
+import socket
+import subprocess
+import sys
+import threading
+import time
+import unittest
+
+from ..manager import AsyncJSONRPCResponseManager
+from ..codec import JSONCodec
+from ..scripts import server
+from ..scripts.server import (HTTPBodyStream, HTTPError, HTTPRequestParser, JSONRPCProtocol,
+                              bind_socket, create_event_loop)
+
+
+def make_request(body, headers=b""):
+    payload = json.dumps(body).encode("utf-8")
+    return b"POST / HTTP/1.1\r\nHost: test\r\n" + headers \
+        + b"Content-Length: " + str(len(payload)).encode() + b"\r\n\r\n" + payload
+
+
+class TestHTTPRequestParser(unittest.TestCase):
+    def test_content_length(self):
+        parser = HTTPRequestParser()
+        data = make_request({"a": 1}) + make_request({"b": 2})
+        requests = []
+        for index in range(len(data)):
+            requests += parser.feed(data[index:index + 1])
+
+        self.assertEqual([json.loads(request.body) for request in requests], [{"a": 1}, {"b": 2}])
+        self.assertEqual(requests[0].method, b"POST")
+        self.assertEqual(requests[0].headers[b"host"], b"test")
+
+    def test_chunked(self):
+        parser = HTTPRequestParser()
+        data = b"POST / HTTP/1.1\r\nTransfer-Encoding: chunked\r\n\r\n" \
+            b"4;ext=1\r\n[1,2\r\n3\r\n, 3\r\n0\r\nTrailer: 1\r\n\r\n"
+        self.assertEqual(parser.feed(data[:50]), [])
+        request, = parser.feed(data[50:])
+        self.assertEqual(request.body, b"[1,2, 3")
+
+    def test_repeated_headers(self):
+        parser = HTTPRequestParser()
+        request, = parser.feed(
+            b"POST / HTTP/1.1\r\nContent-Length: 2\r\nContent-Length: 2\r\nAccept: a\r\nAccept: b\r\n\r\n[]")
+        self.assertEqual(request.body, b"[]")
+        self.assertEqual(request.headers[b"accept"], b"a, b")
+
+    def test_chunk_extensions(self):
+        parser = HTTPRequestParser()
+        request, = parser.feed(
+            b"POST / HTTP/1.1\r\nTransfer-Encoding: chunked\r\n\r\n2 ;a=b\r\n[]\r\n0\r\n\r\n")
+        self.assertEqual(request.body, b"[]")
+
+    def test_stream_body(self):
+        parser = HTTPRequestParser(stream_body_size=4)
+        first = make_request([1, 2])
+        data = first + make_request({})
+        request, = parser.feed(data[:len(first) - 2])
+        self.assertIsInstance(request.body, HTTPBodyStream)
+        self.assertIs(parser.body_stream, request.body)
+        second, = parser.feed(data[len(first) - 2:])
+        self.assertEqual(second.body, b"{}")
+        self.assertIsNone(parser.body_stream)
+
+        async def read(stream):
+            return b"".join([chunk async for chunk in stream])
+
+        self.assertEqual(asyncio.run(read(request.body)), b"[1, 2]")
+
+        parser = HTTPRequestParser(stream_body_size=1000)
+        request, = parser.feed(b"POST / HTTP/1.1\r\nTransfer-Encoding: chunked\r\n\r\n2\r\n[1\r\n")
+        parser.feed(b"1\r\n]\r\n0\r\n\r\n")
+        self.assertEqual(asyncio.run(read(request.body)), b"[1]")
+
+    def test_expect_continue(self):
+        calls = []
+        parser = HTTPRequestParser(on_continue=lambda: calls.append(1))
+        parser.feed(b"POST / HTTP/1.1\r\nExpect: 100-continue\r\nContent-Length: 2\r\n\r\n")
+        self.assertEqual(calls, [1])
+        self.assertEqual(parser.feed(b"{}")[0].body, b"{}")
+
+    def test_errors(self):
+        cases = [
+            (HTTPRequestParser(), b"POST /\r\n\r\n", "400 Bad Request"),
+            (HTTPRequestParser(), b"POST / HTTP/1.1\r\nContent-Length: x\r\n\r\n", "400 Bad Request"),
+            (HTTPRequestParser(), b"POST / HTTP/1.1\r\nContent-Length: 1\r\nTransfer-Encoding: chunked\r\n\r\n",
+             "400 Bad Request"),
+            (HTTPRequestParser(), b"POST / HTTP/1.1\r\nTransfer-Encoding: gzip\r\n\r\n", "501 Not Implemented"),
+            (HTTPRequestParser(), b"POST / HTTP/1.1\r\nTransfer-Encoding: chunked\r\n\r\nzz\r\n", "400 Bad Request"),
+            (HTTPRequestParser(), b"POST / HTTP/1.1\r\nTransfer-Encoding: chunked\r\n\r\n0x5\r\n", "400 Bad Request"),
+            (HTTPRequestParser(), b"POST / HTTP/1.1\r\nTransfer-Encoding: chunked\r\n\r\n+5\r\n", "400 Bad Request"),
+            (HTTPRequestParser(), b"POST / HTTP/1.1\r\nTransfer-Encoding: chunked\r\n\r\n1_0\r\n", "400 Bad Request"),
+            (HTTPRequestParser(), b"POST / HTTP/1.1\r\nTransfer-Encoding: chunked\r\n\r\n\r\n", "400 Bad Request"),
+            (HTTPRequestParser(), b"POST / HTTP/1.1\r\nContent-Length: 1\r\nContent-Length: 2\r\n\r\n",
+             "400 Bad Request"),
+            (HTTPRequestParser(max_body_size=1), b"POST / HTTP/1.1\r\nContent-Length: 2\r\n\r\n",
+             "413 Payload Too Large"),
+            (HTTPRequestParser(max_body_size=1), b"POST / HTTP/1.1\r\nTransfer-Encoding: chunked\r\n\r\n2\r\n",
+             "413 Payload Too Large"),
+            (HTTPRequestParser(max_header_size=10), b"POST / HTTP/1.1\r\nHost: x", "431 Request Header Fields Too Large"),
+        ]
+        for parser, data, status in cases:
+            with self.assertRaises(HTTPError) as context:
+                parser.feed(data)
+            self.assertEqual(context.exception.status, status)
+
+
+class TestLoop(unittest.TestCase):
+    def test_create_event_loop(self):
+        loop = create_event_loop("asyncio")
+        self.assertIn("asyncio", server.get_loop_description(loop))
+        loop.close()
+
+        if server.uvloop is None:
+            with self.assertRaises(ValueError):
+                create_event_loop("uvloop")
+        else:
+            loop = create_event_loop("auto")
+            self.assertIn("uvloop", server.get_loop_description(loop))
+            loop.close()
+
+
+class TestJSONRPCProtocol(unittest.IsolatedAsyncioTestCase):
+    async def asyncSetUp(self):
+        self.sock = bind_socket("127.0.0.1", 0)
+
+        async def sleep(delay, value):
+            await asyncio.sleep(delay)
+            return value
+
+        self.calls = []
+        manager = AsyncJSONRPCResponseManager({
+            "sleep": sleep,
+            "record": lambda value: self.calls.append(value) or value,
+        }, codec=JSONCodec())
+        self.server = await asyncio.get_event_loop().create_server(
+            lambda: JSONRPCProtocol(manager, idle_timeout=0.2, stream_body_size=100), sock=self.sock)
+        self.port = self.server.sockets[0].getsockname()[1]
+
+    async def asyncTearDown(self):
+        self.server.close()
+        await self.server.wait_closed()
+
+    async def read_response(self, reader, headers=None):
+        head = await reader.readuntil(b"\r\n\r\n")
+        status, *lines = head[:-4].split(b"\r\n")
+        fields = dict(line.lower().split(b": ", 1) for line in lines)
+        if headers is not None:
+            headers.update(fields)
+        return status, await reader.readexactly(int(fields.get(b"content-length", 0)))
+
+    async def test_pipelining(self):
+        reader, writer = await asyncio.open_connection("127.0.0.1", self.port)
+        data = make_request({"jsonrpc": "2.0", "method": "sleep", "params": [0.05, "slow"], "id": 1}) \
+            + make_request({"jsonrpc": "2.0", "method": "sleep", "params": [0, "fast"], "id": 2}) \
+            + make_request({"jsonrpc": "2.0", "method": "sleep", "params": [0, "note"]})
+        # Fragmented write
+        writer.write(data[:30])
+        await asyncio.sleep(0.01)
+        writer.write(data[30:])
+
+        headers = {}
+        responses = [await self.read_response(reader) for _ in range(2)]
+        responses.append(await self.read_response(reader, headers))
+        # 204 response of notification
+        self.assertNotIn(b"content-length", headers)
+        self.assertNotIn(b"connection", headers)
+        self.assertEqual([status for status, _ in responses], [b"HTTP/1.1 200 OK"] * 2 + [b"HTTP/1.1 204 No Content"])
+        self.assertEqual([json.loads(body)["result"] for _, body in responses[:2]], ["slow", "fast"])
+        writer.close()
+
+    async def test_connection_close(self):
+        reader, writer = await asyncio.open_connection("127.0.0.1", self.port)
+        writer.write(make_request(
+            {"jsonrpc": "2.0", "method": "sleep", "params": [0, 1], "id": 1},
+            headers=b"Connection: close\r\n"))
+        headers = {}
+        _, body = await self.read_response(reader, headers)
+        self.assertEqual(json.loads(body)["result"], 1)
+        self.assertEqual(headers[b"connection"], b"close")
+        self.assertEqual(await reader.read(), b"")
+        writer.close()
+
+    async def test_http10_keep_alive(self):
+        reader, writer = await asyncio.open_connection("127.0.0.1", self.port)
+        request = make_request({"jsonrpc": "2.0", "method": "sleep", "params": [0, 1], "id": 1}).replace(
+            b"HTTP/1.1", b"HTTP/1.0")
+        writer.write(request.replace(b"\r\n\r\n", b"\r\nConnection: keep-alive\r\n\r\n"))
+        headers = {}
+        await self.read_response(reader, headers)
+        self.assertEqual(headers[b"connection"], b"keep-alive")
+
+        writer.write(request)
+        await self.read_response(reader, headers)
+        self.assertEqual(headers[b"connection"], b"close")
+        self.assertEqual(await reader.read(), b"")
+        writer.close()
+
+    async def test_malformed_request(self):
+        reader, writer = await asyncio.open_connection("127.0.0.1", self.port)
+        writer.write(b"POST / HTTP/1.1\r\nContent-Length: -1\r\n\r\n")
+        headers = {}
+        status, _ = await self.read_response(reader, headers)
+        self.assertEqual(status, b"HTTP/1.1 400 Bad Request")
+        self.assertEqual(headers[b"connection"], b"close")
+        self.assertEqual(await reader.read(), b"")
+        writer.close()
+
+    async def test_streamed_body(self):
+        reader, writer = await asyncio.open_connection("127.0.0.1", self.port)
+        data = make_request([
+            {"jsonrpc": "2.0", "method": "record", "params": [i], "id": i}
+            for i in range(3)
+        ])
+        # The first element is executed before the rest of body is sent
+        first_end = data.index(b"}, {") + 1
+        writer.write(data[:first_end + 1])
+        await asyncio.sleep(0.01)
+        self.assertEqual(self.calls, [0])
+        writer.write(data[first_end + 1:])
+
+        status, body = await self.read_response(reader)
+        self.assertEqual(sorted(r["result"] for r in json.loads(body)), [0, 1, 2])
+
+        # Malformed chunk is reported by response of the request
+        writer.write(b"POST / HTTP/1.1\r\nTransfer-Encoding: chunked\r\n\r\n2\r\n[1\r\nzz\r\n")
+        status, _ = await self.read_response(reader)
+        self.assertEqual(status, b"HTTP/1.1 400 Bad Request")
+        self.assertEqual(await reader.read(), b"")
+        writer.close()
+
+    async def test_idle_timeout(self):
+        reader, writer = await asyncio.open_connection("127.0.0.1", self.port)
+        writer.write(make_request({"jsonrpc": "2.0", "method": "sleep", "params": [0, 1], "id": 1}))
+        await self.read_response(reader)
+        self.assertEqual(await asyncio.wait_for(reader.read(), 1), b"")
+        writer.close()
+
+
+@unittest.skipUnless(hasattr(os, "fork") and hasattr(signal, "SIGUSR1"), "requires fork")
+class TestSupervisor(unittest.TestCase):
+    def setUp(self):
+        with socket.socket() as sock:
+            sock.bind(("127.0.0.1", 0))
+            port = sock.getsockname()[1]
+
+        root = os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+        self.process = subprocess.Popen(
+            [sys.executable, "-m", "ajsonrpc.scripts.server", os.path.join("examples", "methods.py"),
+             "--port", str(port), "--workers", "2"],
+            cwd=root, stderr=subprocess.PIPE, universal_newlines=True)
+        self.worker_pids = set()
+        self.addCleanup(self.stop)
+
+        # Read log lines in background, so waiting for them could time out
+        self.lines = queue.Queue()
+        self.reader = threading.Thread(target=self.read_lines, daemon=True)
+        self.reader.start()
+
+    def read_lines(self):
+        for line in self.process.stderr:
+            self.lines.put(line)
+
+    def stop(self):
+        if self.process.poll() is None:
+            self.process.kill()
+            self.process.wait()
+        for pid in self.worker_pids:
+            try:
+                os.kill(pid, signal.SIGKILL)
+            except ProcessLookupError:
+                pass
+        self.reader.join(5)
+        self.process.stderr.close()
+
+    def wait_line(self, text, timeout=5):
+        deadline = time.monotonic() + timeout
+        while True:
+            try:
+                line = self.lines.get(timeout=max(0, deadline - time.monotonic()))
+            except queue.Empty:
+                self.fail("No {!r} in server log".format(text))
+            if text in line:
+                return line
+
+    def wait_worker(self):
+        pid = int(re.search(r"\(pid (\d+),", self.wait_line("Serving")).group(1))
+        self.worker_pids.add(pid)
+        return pid
+
+    def test_restart_and_stop(self):
+        pids = {self.wait_worker(), self.wait_worker()}
+
+        # Crashed worker is restarted
+        crashed = pids.pop()
+        os.kill(crashed, signal.SIGKILL)
+        self.wait_line("Worker {} exited".format(crashed))
+        pids.add(self.wait_worker())
+        self.assertNotIn(crashed, pids)
+
+        # Without profiling SIGUSR1 is ignored
+        self.process.send_signal(signal.SIGUSR1)
+        with self.assertRaises(AssertionError):
+            self.wait_line("exited", timeout=0.5)
+        self.assertIsNone(self.process.poll())
+
+        self.process.send_signal(signal.SIGTERM)
+        self.assertEqual(self.process.wait(5), 0)
+        for pid in pids:
+            with self.assertRaises(ProcessLookupError):
+                os.kill(pid, 0)
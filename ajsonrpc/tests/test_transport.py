@@ -0,0 +1,135 @@
+import asyncio
+import json
+import socket
+import struct
+import unittest
+from unittest import mock
+
+from ..codec import Codec, FunctionCodec, JSONCodec, RawJSON
+from ..manager import AsyncJSONRPCResponseManager
+from ..transport import JSONRPCStreamProtocol, set_tcp_nodelay
+
+
+class TestSetTCPNodelay(unittest.TestCase):
+    def test_set_tcp_nodelay(self):
+        sock = socket.socket()
+        sock.bind(("127.0.0.1", 0))
+        sock.listen(1)
+        client = socket.create_connection(sock.getsockname())
+        transport = mock.Mock()
+        transport.get_extra_info.return_value = client
+
+        set_tcp_nodelay(transport, False)
+        self.assertEqual(client.getsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY), 0)
+        set_tcp_nodelay(transport)
+        self.assertNotEqual(client.getsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY), 0)
+        client.close()
+        sock.close()
+
+
+class TestJSONRPCStreamProtocol(unittest.IsolatedAsyncioTestCase):
+    async def asyncSetUp(self):
+        async def sleep(delay, value):
+            await asyncio.sleep(delay)
+            return value
+
+        self.manager = AsyncJSONRPCResponseManager({
+            "sleep": sleep,
+            "raw": lambda: RawJSON('{\n  "a": 1\n}'),
+        }, codec=JSONCodec())
+        self.servers = []
+
+    async def asyncTearDown(self):
+        for server in self.servers:
+            server.close()
+            await server.wait_closed()
+
+    async def connect(self, **kwargs):
+        server = await asyncio.get_event_loop().create_server(
+            lambda: JSONRPCStreamProtocol(self.manager, **kwargs), host="127.0.0.1", port=0)
+        self.servers.append(server)
+        return await asyncio.open_connection(*server.sockets[0].getsockname()[:2])
+
+    def test_framing(self):
+        with self.assertRaises(ValueError):
+            JSONRPCStreamProtocol(self.manager, framing="xml")
+
+        class BinaryCodec(Codec):
+            content_types = ("application/octet-stream",)
+
+        manager = AsyncJSONRPCResponseManager({}, codec=BinaryCodec())
+        with self.assertRaises(ValueError):
+            JSONRPCStreamProtocol(manager)
+        JSONRPCStreamProtocol(manager, framing="length")
+        JSONRPCStreamProtocol(AsyncJSONRPCResponseManager({}, codec=FunctionCodec()))
+
+    async def test_newline(self):
+        reader, writer = await self.connect()
+        data = b"".join(json.dumps(body).encode() + b"\n" for body in [
+            {"jsonrpc": "2.0", "method": "sleep", "params": [0.05, "slow"], "id": 1},
+            {"jsonrpc": "2.0", "method": "sleep", "params": [0, "note"]},
+            {"jsonrpc": "2.0", "method": "sleep", "params": [0, "fast"], "id": 2},
+        ])
+        writer.write(data[:10])
+        await asyncio.sleep(0.01)
+        writer.write(data[10:])
+
+        # Responses are sent as soon as ready
+        first = json.loads(await reader.readline())
+        second = json.loads(await reader.readline())
+        self.assertEqual((first["id"], first["result"]), (2, "fast"))
+        self.assertEqual((second["id"], second["result"]), (1, "slow"))
+
+        writer.write(b"[1,\n")
+        self.assertEqual(json.loads(await reader.readline())["error"]["code"], -32700)
+        writer.close()
+
+    async def test_newline_in_response(self):
+        reader, writer = await self.connect()
+        writer.write(b'{"jsonrpc": "2.0", "method": "raw", "id": 1}\n')
+        response = await asyncio.wait_for(reader.readline(), 1)
+        self.assertEqual(json.loads(response), {"jsonrpc": "2.0", "id": 1, "result": {"a": 1}})
+
+        writer.write(b'{"jsonrpc": "2.0", "method": "sleep", "params": [0, "next"], "id": 2}\n')
+        response = await asyncio.wait_for(reader.readline(), 1)
+        self.assertEqual(json.loads(response)["result"], "next")
+        writer.close()
+
+    async def test_manager_failure(self):
+        reader, writer = await self.connect()
+        with mock.patch.object(self.manager, "get_payload_for_payload", side_effect=RuntimeError), \
+                self.assertLogs("ajsonrpc.transport", "ERROR"):
+            writer.write(b'{"jsonrpc": "2.0", "method": "sleep", "params": [0, 1], "id": 1}\n')
+            response = json.loads(await asyncio.wait_for(reader.readline(), 1))
+        self.assertEqual(response, {
+            "jsonrpc": "2.0", "id": None,
+            "error": {"code": -32603, "message": "Internal error"},
+        })
+        writer.close()
+
+    async def test_length_prefix(self):
+        reader, writer = await self.connect(framing="length")
+        payload = json.dumps([
+            {"jsonrpc": "2.0", "method": "sleep", "params": [0, i], "id": i}
+            for i in range(3)
+        ]).encode()
+        data = struct.pack(">I", len(payload)) + payload
+        for index in range(len(data)):
+            writer.write(data[index:index + 1])
+
+        length, = struct.unpack(">I", await reader.readexactly(4))
+        response = json.loads(await reader.readexactly(length))
+        self.assertEqual(sorted(item["result"] for item in response), [0, 1, 2])
+        writer.close()
+
+    async def test_max_frame_size(self):
+        reader, writer = await self.connect(framing="length", max_frame_size=10)
+        writer.write(struct.pack(">I", 11))
+        self.assertEqual(await reader.read(), b"")
+        writer.close()
+
+        # Oversized frame arriving with its newline in one read
+        reader, writer = await self.connect(max_frame_size=10)
+        writer.write(b" " * 11 + b"\n")
+        self.assertEqual(await asyncio.wait_for(reader.read(), 1), b"")
+        writer.close()
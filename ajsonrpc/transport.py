@@ -0,0 +1,190 @@
+"""Raw TCP transport: JSON-RPC over persistent connections without HTTP.
+
+Every message is a serialized request (or batch) framed either as
+
+* "newline": payload followed by "\\n", for JSON codecs only. Raw newlines
+  are allowed in JSON only as whitespace between tokens: requests have to
+  be sent without them, e.g. compactly encoded. In responses, e.g. from
+  spliced :class:`~ajsonrpc.codec.RawJSON` or indenting encoder, they are
+  replaced with spaces.
+* "length": 4-byte big-endian payload length followed by payload, for any
+  codec including binary ones.
+
+Requests of a connection are handled concurrently and responses are sent as
+soon as they are ready, in any order: clients correlate them by id. Nothing
+is sent for notifications. If manager fails to handle a payload, "Internal
+error" with null id is sent.
+
+>>> loop.create_server(lambda: JSONRPCStreamProtocol(manager), port=8889)
+
+"""
+import asyncio
+import logging
+import socket
+import struct
+
+from .codec import get_mime_type
+from .core import JSONRPC20InternalError
+from .manager import make_error_response
+
+logger = logging.getLogger(__name__)
+
+FRAMINGS = ("newline", "length")
+LENGTH_PREFIX = struct.Struct(">I")
+DEFAULT_MAX_FRAME_SIZE = 16 * 1024 * 1024
+# Stop reading from connection with this number of requests in progress
+DEFAULT_MAX_CONCURRENCY = 100
+
+
+def set_tcp_nodelay(transport, is_enabled=True):
+    """Enable or disable Nagle's algorithm on transport TCP socket."""
+    sock = transport.get_extra_info("socket")
+    if sock is not None and sock.family in (socket.AF_INET, socket.AF_INET6):
+        sock.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, int(is_enabled))
+
+
+class JSONRPCStreamProtocol(asyncio.Protocol):
+
+    """JSON-RPC protocol with newline-delimited or length-prefixed frames.
+
+    Args:
+        manager: :class:`~ajsonrpc.manager.AsyncJSONRPCResponseManager`,
+            its codec (or serialize and deserialize) is used for payloads.
+        framing (str): "newline" or "length", the former requires manager
+            without codec or with a JSON (by content type) one.
+        max_frame_size (int): connection with larger frame is closed.
+        max_concurrency (int): reading pauses while connection has this
+            number of requests in progress.
+        is_tcp_nodelay (bool): disable Nagle's algorithm, so small responses
+            are not delayed.
+
+    """
+
+    def __init__(self, manager, framing: str = "newline", max_frame_size: int = DEFAULT_MAX_FRAME_SIZE,
+                 max_concurrency: int = DEFAULT_MAX_CONCURRENCY, is_tcp_nodelay: bool = True):
+        if framing not in FRAMINGS:
+            raise ValueError("Unknown framing {!r}".format(framing))
+        if framing == "newline" and manager.codec is not None and not manager.codec.is_json \
+                and not get_mime_type(manager.codec.content_type).endswith("json"):
+            # Binary payloads might contain newline bytes
+            raise ValueError("Newline framing requires JSON codec")
+
+        self.manager = manager
+        self.framing = framing
+        self.max_frame_size = max_frame_size
+        self.max_concurrency = max_concurrency
+        self.is_tcp_nodelay = is_tcp_nodelay
+        self.transport = None
+        self.tasks = set()
+        self._buffer = bytearray()
+        self._search_start = 0
+        self._is_reading_paused = False
+        self._is_writing_paused = False
+
+    def connection_made(self, transport):
+        self.transport = transport
+        set_tcp_nodelay(transport, self.is_tcp_nodelay)
+
+    def connection_lost(self, exc):
+        for task in self.tasks:
+            task.cancel()
+        self.tasks.clear()
+
+    def pause_writing(self):
+        self._is_writing_paused = True
+        self._update_reading()
+
+    def resume_writing(self):
+        self._is_writing_paused = False
+        self._update_reading()
+
+    def data_received(self, data):
+        self._buffer += data
+        try:
+            frames = self.parse_newline_frames() if self.framing == "newline" else self.parse_length_frames()
+        except ValueError as e:
+            logger.warning('Close connection: {}'.format(e))
+            self.transport.close()
+            return
+
+        for frame in frames:
+            self.handle_payload(frame)
+
+    def parse_newline_frames(self):
+        frames = []
+        while True:
+            end = self._buffer.find(b"\n", self._search_start)
+            if end < 0:
+                if len(self._buffer) > self.max_frame_size:
+                    raise ValueError("Frame is too large")
+                self._search_start = len(self._buffer)
+                return frames
+            if end > self.max_frame_size:
+                raise ValueError("Frame is too large")
+
+            frame = bytes(self._buffer[:end]).strip()
+            del self._buffer[:end + 1]
+            self._search_start = 0
+            if frame:
+                frames.append(frame)
+
+    def parse_length_frames(self):
+        frames = []
+        while len(self._buffer) >= LENGTH_PREFIX.size:
+            length, = LENGTH_PREFIX.unpack_from(self._buffer)
+            if length > self.max_frame_size:
+                raise ValueError("Frame is too large")
+            end = LENGTH_PREFIX.size + length
+            if len(self._buffer) < end:
+                break
+
+            with memoryview(self._buffer) as view:
+                frames.append(bytes(view[LENGTH_PREFIX.size:end]))
+            del self._buffer[:end]
+
+        return frames
+
+    def handle_payload(self, payload: bytes):
+        task = asyncio.ensure_future(self.manager.get_payload_for_payload(payload))
+        self.tasks.add(task)
+        task.add_done_callback(self.write_response)
+        self._update_reading()
+
+    def write_response(self, task):
+        self.tasks.discard(task)
+        if task.cancelled():
+            return
+
+        if task.exception() is not None:
+            logger.error('Request failed', exc_info=task.exception())
+            # Client could not tell which request failed, but should not wait
+            payload = self.manager.encode_response(
+                make_error_response(JSONRPC20InternalError), self.manager.codec)
+        else:
+            payload = task.result()
+
+        if isinstance(payload, str):
+            payload = payload.encode("utf-8")
+        if payload and not self.transport.is_closing():
+            self.transport.write(self.frame(payload))
+
+        self._update_reading()
+
+    def frame(self, payload: bytes) -> bytes:
+        if self.framing == "newline":
+            if b"\n" in payload:
+                # Raw newlines could only be whitespace in JSON
+                payload = payload.replace(b"\n", b" ")
+            return payload + b"\n"
+        return LENGTH_PREFIX.pack(len(payload)) + payload
+
+    def _update_reading(self):
+        is_paused = self._is_writing_paused or len(self.tasks) >= self.max_concurrency
+        if is_paused == self._is_reading_paused or self.transport.is_closing():
+            return
+
+        self._is_reading_paused = is_paused
+        if is_paused:
+            self.transport.pause_reading()
+        else:
+            self.transport.resume_reading()
@@ -1,6 +1,129 @@
 import inspect
 
 
+class MethodPlan:
+
+    """Pre-computed dispatch information for a single method.
+
+    Introspection of a callable is relatively expensive, so it is done once
+    per method and reused by the manager for every call.
+
+    Attributes:
+        method (callable): method the plan was built for.
+        name (str): name the method is registered with.
+        is_coroutine (bool): whether the method has to be awaited.
+        executor_policy: execution policy the plan was built for, see
+            :mod:`ajsonrpc.dispatcher`.
+        executor (concurrent.futures.Executor): executor to run synchronous
+            method in, None means inline on the event loop.
+        timeout (float): method specific timeout in seconds, None means
+            manager default.
+        cache: result caching setting from dispatcher, True or TTL in
+            seconds, None if results are not cached.
+        reference (tuple): (module, qualname) the method is imported by in
+            process pool workers, None unless executor is a process pool.
+        signature (inspect.Signature): method signature used to bind call
+            arguments, None if the method could not be introspected.
+        is_simple_signature (bool): whether signature consists of plain
+            positional-or-keyword parameters only, so binding positional
+            arguments reduces to the arity check.
+        parameters (tuple): (name, is_required) pairs of method parameters,
+            None if the method could not be introspected.
+        parameter_names (frozenset): names of method parameters.
+        min_args (int): number of required parameters.
+        max_args (int): total number of parameters.
+
+    """
+
+    __slots__ = (
+        "method", "name", "is_coroutine", "executor_policy", "executor",
+        "timeout", "cache", "signature", "parameters", "parameter_names", "min_args",
+        "max_args", "is_simple_signature", "reference",
+    )
+
+    def __init__(self, method, name=None, executor_policy=None, executor=None, timeout=None, cache=None):
+        self.method = method
+        self.name = name
+        self.is_coroutine = inspect.iscoroutinefunction(method)
+        self.executor_policy = executor_policy
+        self.executor = None if self.is_coroutine else executor
+        self.timeout = timeout
+        self.cache = cache
+        self.reference = None
+        self.signature = None
+        self.parameters = None
+        self.parameter_names = frozenset()
+        self.min_args = self.max_args = 0
+        self.is_simple_signature = False
+
+        try:
+            self.signature = inspect.signature(method)
+        except (TypeError, ValueError):
+            # Some builtins and extension callables do not expose signature.
+            pass
+
+        # For builtin functions inspect.getargspec(funct) return error. If
+        # builtin function generates TypeError, it is because of wrong
+        # parameters.
+        if inspect.isfunction(method):
+            self.parameters = tuple(
+                (name, parameter.default is parameter.empty)
+                for name, parameter in self.signature.parameters.items()
+            )
+            self.parameter_names = frozenset(self.signature.parameters)
+            self.max_args = len(self.parameters)
+            self.min_args = sum(
+                1 for _, is_required in self.parameters if is_required)
+            self.is_simple_signature = all(
+                parameter.kind == parameter.POSITIONAL_OR_KEYWORD
+                for parameter in self.signature.parameters.values()
+            )
+
+    def is_bindable(self, args, kwargs):
+        """Check whether arguments match method signature without calling it.
+
+        Unlike :meth:`is_invalid_params`, this follows Python binding rules
+        exactly, so it is safe to reject a call before it is made. Methods
+        without introspectable signature are assumed to be bindable.
+
+        """
+        if self.is_simple_signature and not kwargs:
+            return self.min_args <= len(args) <= self.max_args
+
+        if self.signature is None:
+            return True
+
+        try:
+            self.signature.bind(*args, **kwargs)
+        except TypeError:
+            return False
+
+        return True
+
+    def is_invalid_params(self, args, kwargs):
+        """Check whether method could not be called with given arguments.
+
+        See :func:`is_invalid_params` for the criteria.
+
+        """
+        if self.parameters is None:
+            return True
+
+        if not kwargs:
+            return not (self.min_args <= len(args) <= self.max_args)
+
+        if not self.parameter_names.issuperset(kwargs):
+            return True
+
+        params_count = params_required_count = 0
+        for name, is_required in self.parameters:
+            if name not in kwargs:
+                params_count += 1
+                params_required_count += is_required
+
+        return not (params_required_count <= len(args) <= params_count)
+
+
 def is_invalid_params(func, *args, **kwargs):
     """
     Method:
@@ -11,25 +134,4 @@ def is_invalid_params(func, *args, **kwargs):
         3. number of args should be <= remaining func.parameters
         4. number of args should be >= remaining func.parameters less default
     """
-    # For builtin functions inspect.getargspec(funct) return error. If builtin
-    # function generates TypeError, it is because of wrong parameters.
-    if not inspect.isfunction(func):
-        return True
-
-    signature = inspect.signature(func)
-    parameters = signature.parameters
-
-    unexpected = set(kwargs.keys()) - set(parameters.keys())
-    if len(unexpected) > 0:
-        return True
-
-    params = [
-        parameter for name, parameter in parameters.items()
-        if name not in kwargs
-    ]
-    params_required = [
-        param for param in params
-        if param.default is param.empty
-    ]
-
-    return not (len(params_required) <= len(args) <= len(params))
+    return MethodPlan(func).is_invalid_params(args, kwargs)
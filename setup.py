@@ -29,7 +29,7 @@ setup(
     },
     include_package_data=True,
     platforms="any",
-    python_requires='>=3.5',
+    python_requires='>=3.7',
     description="Async JSON-RPC 2.0 protocol + server powered by asyncio",
     long_description=read("README.md"),
     long_description_content_type="text/markdown",
@@ -42,8 +42,6 @@ setup(
         "Natural Language :: English",
         "Operating System :: OS Independent",
         "Programming Language :: Python :: 3",
-        "Programming Language :: Python :: 3.5",
-        "Programming Language :: Python :: 3.6",
         "Programming Language :: Python :: 3.7",
         "Programming Language :: Python :: 3.8",
         "Programming Language :: Python :: 3.9",